@@ -0,0 +1,3 @@
+"""
+Benchmarks of the price tracker's hot paths against local stand-in services
+"""
@@ -0,0 +1,254 @@
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+WEBHOOK_PATH = "/discord/webhook"
+PAGES_PATH = "/pages/"
+# How product pages publish their price, in the share each format gets
+PAGE_FORMATS = (("json-ld", 0.5), ("microdata", 0.15), ("open-graph", 0.1), ("plain", 0.25))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real services
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = {}
+        status, payload, headers = self.server.services.handle(self.path, body)
+        data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        html = self.server.services.page(self.path)
+        data = b"" if html is None else html.encode("utf-8")
+        self.send_response(200 if html is not None else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeServices:
+    """Local HTTP stand-ins for the Firecrawl API and a Discord webhook.
+
+    `/v1/scrape` and `/v1/extract` answer like Firecrawl, after `latency`
+    seconds (plus up to `jitter`) and failing with a 500 at `error_rate`.
+    Every scrape moves a product's price with probability `change_rate`.
+    The webhook accepts every message, or answers every
+    `discord_rate_limit_every`-th one with a 429. Product pages are served
+    under `/pages/<host>/<path>` (see `fetch_page`) after `page_latency`
+    seconds, with the price in JSON-LD, microdata, OpenGraph tags or only in
+    the visible markup, in the shares of PAGE_FORMATS. Request counts are
+    kept in `counts`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        change_rate: float = 0.2,
+        discord_rate_limit_every: int = 0,
+        page_latency: float = 0.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.change_rate = change_rate
+        self.discord_rate_limit_every = discord_rate_limit_every
+        self.page_latency = page_latency
+        self.counts: Counter = Counter()
+        self._prices: Dict[str, float] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.services = self
+        self._thread: Optional[threading.Thread] = None
+        self._http = requests.Session()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def firecrawl_url(self) -> str:
+        """Pass as `api_url` to `FirecrawlApp` (or set FIRECRAWL_API_URL)"""
+        return self.base_url
+
+    @property
+    def webhook_url(self) -> str:
+        return self.base_url + WEBHOOK_PATH
+
+    def start(self) -> "FakeServices":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeServices":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def fetch_page(self, url: str) -> Optional[str]:
+        """Fetch the stand-in page of a product URL; pass as `fetch` to LocalExtractor"""
+        parsed = urlparse(url)
+        response = self._http.get(f"{self.base_url}{PAGES_PATH}{parsed.netloc}{parsed.path}", timeout=10)
+        return response.text if response.ok else None
+
+    @staticmethod
+    def page_format(url: str) -> str:
+        """How the page of `url` publishes its price"""
+        position = zlib.crc32(url.encode("utf-8")) % 1000 / 1000
+        for name, share in PAGE_FORMATS:
+            if position < share:
+                return name
+            position -= share
+        return PAGE_FORMATS[-1][0]
+
+    def page(self, path: str) -> Optional[str]:
+        """HTML of a product page, showing its current price"""
+        if not path.startswith(PAGES_PATH):
+            return None
+        url = "https://" + path[len(PAGES_PATH):]
+        with self._lock:
+            self.counts["pages"] += 1
+        if self.page_latency:
+            time.sleep(self.page_latency)
+        price = self.price(url)
+        name = f"Product {zlib.crc32(url.encode('utf-8')) % 100000}"
+        page_format = self.page_format(url)
+        head = f"<title>{name}</title>"
+        price_markup = f'<span class="price-now">${price:,.2f}</span>'
+        if page_format == "json-ld":
+            offer = {"@type": "Offer", "price": f"{price:.2f}", "priceCurrency": "USD"}
+            head += (
+                '<script type="application/ld+json">'
+                + json.dumps({"@context": "https://schema.org", "@type": "Product",
+                              "name": name, "image": f"{url}/image.jpg", "offers": offer})
+                + "</script>"
+            )
+        elif page_format == "open-graph":
+            head += (
+                f'<meta property="og:title" content="{name}">'
+                f'<meta property="product:price:amount" content="{price:.2f}">'
+                '<meta property="product:price:currency" content="USD">'
+            )
+        elif page_format == "microdata":
+            price_markup = (
+                f'<span itemprop="price" content="{price:.2f}">${price:,.2f}</span>'
+                '<meta itemprop="priceCurrency" content="USD">'
+            )
+        # Other products' prices, so learned selectors must pick the right element
+        related = "".join(
+            f'<li class="related"><span class="price">${20 + i * 7.5:,.2f}</span></li>'
+            for i in range(4)
+        )
+        return (
+            f"<!doctype html><html><head>{head}</head><body>"
+            f'<nav class="menu"><a href="/">Home</a></nav>'
+            f'<main><h1 class="title">{name}</h1><div class="buy-box">{price_markup}'
+            f'<button class="add">Add to cart</button></div>'
+            f"<ul>{related}</ul></main></body></html>"
+        )
+
+    def price(self, url: str) -> float:
+        """Current price of a product page, drifting on every scrape"""
+        with self._lock:
+            if url not in self._prices:
+                self._prices[url] = 20 + zlib.crc32(url.encode("utf-8")) % 98000 / 100
+            elif self._random.random() < self.change_rate:
+                self._prices[url] = round(
+                    self._prices[url] * self._random.uniform(0.85, 1.05), 2
+                )
+            return self._prices[url]
+
+    def handle(self, path: str, body: dict) -> Tuple[int, Optional[dict], Dict[str, str]]:
+        """Answer one request with (status, JSON payload, headers)"""
+        if path == WEBHOOK_PATH:
+            return self._discord(body)
+
+        with self._lock:
+            self.counts[path] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            with self._lock:
+                self.counts["errors"] += 1
+            return 500, {"success": False, "error": "Simulated failure"}, {}
+
+        if path == "/v1/scrape":
+            return 200, {"success": True, "data": self._scrape(body["url"])}, {}
+        if path == "/v1/extract":
+            return 200, {"success": True, "data": self._extract(body)}, {}
+        return 404, {"success": False, "error": f"Unknown endpoint {path}"}, {}
+
+    def _scrape(self, url: str) -> dict:
+        return {
+            "extract": {"price": self.price(url), "cabin_type": None},
+            "metadata": {"sourceURL": url, "statusCode": 200},
+        }
+
+    def _extract(self, body: dict) -> dict:
+        urls = body.get("urls") or []
+        properties = (body.get("schema") or {}).get("properties") or {}
+        if "products" in properties:
+            # Multi-URL price extraction (see src/services/batch_extractor.py)
+            return {
+                "products": [
+                    {"url": url, "price": self.price(url), "cabin_type": None}
+                    for url in urls
+                ]
+            }
+        url = urls[0]
+        return {
+            "name": f"Product {zlib.crc32(url.encode('utf-8')) % 100000}",
+            "price": self.price(url),
+            "currency": "USD",
+            "main_image_url": f"{url}/image.jpg",
+        }
+
+    def _discord(self, body: dict) -> Tuple[int, Optional[dict], Dict[str, str]]:
+        with self._lock:
+            self.counts["discord_requests"] += 1
+            every = self.discord_rate_limit_every
+            if every and self.counts["discord_requests"] % every == 0:
+                self.counts["discord_rate_limited"] += 1
+                return 429, {"retry_after": 0.01}, {"Retry-After": "0.01"}
+            self.counts["discord_messages"] += 1
+            self.counts["discord_embeds"] += len(body.get("embeds") or [])
+        return 204, None, {}
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Settings are read on import; the benchmarks never reach the real services
+os.environ.setdefault("FIRECRAWL_API_KEY", "benchmark")
+os.environ.setdefault("DISCORD_WEBHOOK_URL", "http://127.0.0.1:9/webhook")
+os.environ.setdefault("POSTGRES_URL", "")
+
+from src.benchmarks.scenarios import NO_DATABASE, SCENARIOS, BenchmarkContext, BenchmarkOptions  # noqa: E402
+from src.benchmarks.synthetic import create_database, populate  # noqa: E402
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Metrics more than `tolerance` worse than in the baseline results.
+
+    Times (`*_ms`, `seconds`) should not grow, rates (`*_per_second`) should
+    not shrink; other metrics are informational.
+    """
+    current, previous = _flatten(results), _flatten(baseline)
+    regressions = []
+    for name, value in current.items():
+        old = previous.get(name)
+        if not old:
+            continue
+        metric = name.rsplit(".", 1)[-1]
+        if metric.endswith("_ms") or metric == "seconds":
+            worse = value > old * (1 + tolerance)
+        elif metric.endswith("_per_second"):
+            worse = value < old * (1 - tolerance)
+        else:
+            continue
+        if worse:
+            regressions.append(f"{name}: {old:.3f} -> {value:.3f}")
+    return regressions
+
+
+def run_benchmarks(
+    scenarios: List[str],
+    products: int,
+    history_rows: int,
+    options: BenchmarkOptions,
+    db_url: Optional[str] = None,
+) -> dict:
+    """Populate a database and run the scenarios; returns the results document"""
+    engine = session_factory = None
+    urls: List[str] = []
+    populate_seconds = 0.0
+    if any(name not in NO_DATABASE for name in scenarios):
+        started = time.perf_counter()
+        engine, session_factory = create_database(db_url)
+        urls = populate(engine, session_factory, products, history_rows, seed=options.seed)
+        populate_seconds = time.perf_counter() - started
+        print(f"Populated {products} products and ~{history_rows} history rows in {populate_seconds:.1f}s")
+
+    context = BenchmarkContext(engine, session_factory, urls, options)
+    results = {}
+    try:
+        for name in scenarios:
+            print(f"Running {name}...")
+            results[name] = SCENARIOS[name](context)
+    finally:
+        if engine is not None:
+            engine.dispose()
+            if db_url is None:
+                shutil.rmtree(os.path.dirname(engine.url.database), ignore_errors=True)
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": engine.dialect.name if engine is not None else None,
+        "parameters": {
+            "products": products,
+            "history_rows": history_rows,
+            **vars(options),
+        },
+        "populate_seconds": populate_seconds,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the price tracker's hot paths")
+    parser.add_argument(
+        "scenarios", nargs="*", help=f"Any of {', '.join(SCENARIOS)}; defaults to all"
+    )
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--history-rows", type=int, default=100_000)
+    parser.add_argument("--db-url", help="Empty scratch database, defaults to a temporary SQLite file")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs the baseline")
+    defaults = BenchmarkOptions()
+    parser.add_argument("--repeat", type=int, default=defaults.repeat)
+    parser.add_argument("--sweep-products", type=int, default=defaults.sweep_products)
+    parser.add_argument("--max-in-flight", type=int, default=defaults.max_in_flight)
+    parser.add_argument("--batch", action="store_true", help="Sweep with multi-URL extraction")
+    parser.add_argument(
+        "--sync-db", action="store_true", help="Sweep through the sync session instead of the async engine"
+    )
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--page-latency", type=float, default=defaults.page_latency)
+    parser.add_argument(
+        "--no-local-extract", action="store_true", help="Send every check to the fake Firecrawl API"
+    )
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    options = BenchmarkOptions(
+        repeat=args.repeat,
+        sweep_products=args.sweep_products,
+        max_in_flight=args.max_in_flight,
+        batch=args.batch,
+        async_db=not args.sync_db,
+        latency=args.latency,
+        page_latency=args.page_latency,
+        local_extract=not args.no_local_extract,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    document = run_benchmarks(
+        args.scenarios or list(SCENARIOS), args.products, args.history_rows, options, args.db_url
+    )
+    output = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(document["results"], baseline["results"], args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
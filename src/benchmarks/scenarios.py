@@ -0,0 +1,280 @@
+import asyncio
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from firecrawl import FirecrawlApp
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from src.benchmarks.fake_services import FakeServices
+from src.benchmarks.startup import startup_report
+from src.domain.models import PriceHistoryCreate
+from src.infrastructure.metrics import metrics
+from src.infrastructure.repositories.product_repository import ProductRepository
+from src.presentation.data_loader import fetch_dashboard_data
+from src.services.analytics import compute_analytics, load_history_columns
+from src.services.check_engine import CheckEngine
+from src.services.export import write_csv, write_parquet
+from src.services.local_extractor import LocalExtractor
+from src.services.notifications import DiscordNotifier
+from src.services.price_service import PriceService
+from src.services.rate_limit import KeyedRateLimiter
+
+# Rate limits high enough to never be the bottleneck of a sweep
+UNLIMITED_PER_MINUTE = 1e9
+
+
+@dataclass
+class BenchmarkOptions:
+    """Knobs shared by all scenarios"""
+
+    repeat: int = 20  # Timed runs per measured operation
+    sweep_products: int = 200  # Products checked by the sweep scenario
+    max_in_flight: int = 8
+    batch: bool = False  # Multi-URL extraction in the sweep
+    async_db: bool = True  # Sweep reads and writes through the async engine
+    latency: float = 0.05  # Seconds per fake Firecrawl request
+    page_latency: float = 0.01  # Seconds per product page fetch
+    local_extract: bool = True  # Read prices from the page markup before Firecrawl
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_per_minute: float = UNLIMITED_PER_MINUTE  # Per API key and per domain
+    seed: int = 0
+
+
+@dataclass
+class BenchmarkContext:
+    """A populated database plus the options of this run"""
+
+    engine: Optional[Engine]
+    session_factory: Optional[sessionmaker]
+    product_urls: List[str]
+    options: BenchmarkOptions = field(default_factory=BenchmarkOptions)
+
+    def repository(self) -> ProductRepository:
+        return ProductRepository(self.session_factory())
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency statistics, in milliseconds, of samples in seconds"""
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "runs": len(samples),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Time `repeat` calls of `fn`"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def sweep(context: BenchmarkContext) -> Dict[str, object]:
+    """Check prices of `sweep_products` products against the fake Firecrawl API.
+
+    Per-stage timings of the sweep (in seconds) are reported under `stages`.
+    """
+    options = context.options
+    repository = context.repository()
+    was_enabled = metrics.enabled
+    metrics.reset()
+    metrics.enabled = True
+    try:
+        products = repository.get_sweep_products(context.product_urls[: options.sweep_products])
+        with FakeServices(
+            latency=options.latency,
+            jitter=options.jitter,
+            error_rate=options.error_rate,
+            page_latency=options.page_latency,
+            seed=options.seed,
+        ) as services:
+            local_extractor = LocalExtractor(fetch=services.fetch_page) if options.local_extract else None
+            firecrawl = FirecrawlApp(api_key="benchmark", api_url=services.firecrawl_url)
+            price_service = PriceService(repository, firecrawl)
+
+            async def run():
+                async with AsyncExitStack() as stack:
+                    if options.async_db:
+                        await stack.enter_async_context(price_service.use_async_repository())
+                    notifier = await stack.enter_async_context(
+                        DiscordNotifier(webhook_url=services.webhook_url)
+                    )
+                    engine = CheckEngine(
+                        price_service,
+                        max_in_flight=options.max_in_flight,
+                        max_retries=0,
+                        notifier=notifier,
+                        local_extractor=local_extractor,
+                        key_limiter=KeyedRateLimiter(options.rate_per_minute, options.max_in_flight),
+                        domain_limiter=KeyedRateLimiter(options.rate_per_minute, options.max_in_flight),
+                    )
+                    return await engine.run(products, batch=options.batch)
+
+            result = asyncio.run(run())
+            counts = dict(services.counts)
+    finally:
+        metrics.enabled = was_enabled
+        repository.session.close()
+
+    return {
+        "products": len(products),
+        "checked": result.checked,
+        "failed": len(result.failed),
+        "seconds": result.elapsed,
+        "products_per_second": result.products_per_second,
+        "firecrawl_requests": counts.get("/v1/scrape", 0) + counts.get("/v1/extract", 0),
+        "discord_messages": counts.get("discord_messages", 0),
+        "local_hits": result.local_hits,
+        "templates": len(local_extractor.templates) if local_extractor else 0,
+        "page_fetches": counts.get("pages", 0),
+        "stages": metrics.snapshot()["spans"],
+    }
+
+
+def repository_latency(context: BenchmarkContext) -> Dict[str, object]:
+    """Latency of the repository reads and writes the app and sweeps rely on"""
+    options = context.options
+    rng = random.Random(options.seed)
+    urls = context.product_urls
+    repository = context.repository()
+    try:
+        def add_one():
+            url = rng.choice(urls)
+            repository.add_price_history(
+                PriceHistoryCreate(product_url=url, price=rng.uniform(10, 500), product_name="Bench")
+            )
+
+        def apply_batch():
+            repository.apply_price_updates(
+                [
+                    PriceHistoryCreate(product_url=url, price=rng.uniform(10, 500), product_name="Bench")
+                    for url in rng.sample(urls, min(100, len(urls)))
+                ]
+            )
+
+        return {
+            "get": measure(lambda: repository.get(rng.choice(urls)), options.repeat),
+            "get_all": measure(repository.get_all, options.repeat),
+            "get_price_history": measure(
+                lambda: repository.get_price_history(rng.choice(urls)), options.repeat
+            ),
+            "get_recent_price_history": measure(
+                lambda: repository.get_recent_price_history(50), options.repeat
+            ),
+            "get_all_price_stats": measure(repository.get_all_price_stats, options.repeat),
+            "add_price_history": measure(add_one, options.repeat),
+            "apply_price_updates_100": measure(apply_batch, options.repeat),
+        }
+    finally:
+        repository.session.close()
+
+
+def export(context: BenchmarkContext) -> Dict[str, object]:
+    """Stream the full price history to CSV and Parquet files"""
+    repository = context.repository()
+    results = {}
+    directory = tempfile.mkdtemp(prefix="price-bench-export-")
+    try:
+        rows = sum(len(chunk) for chunk in repository.iter_price_history_rows())
+        for name, writer in (("csv", write_csv), ("parquet", write_parquet)):
+            path = os.path.join(directory, f"history.{name}")
+            started = time.perf_counter()
+            writer(repository, path)
+            seconds = time.perf_counter() - started
+            results[name] = {
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+                "megabytes": os.path.getsize(path) / 1e6,
+            }
+            os.remove(path)
+        # The download button builds the CSV in memory
+        results["csv_in_memory"] = measure(lambda: write_csv(repository, io.StringIO()), 1)
+    finally:
+        repository.session.close()
+        os.rmdir(directory)
+    return results
+
+
+def dashboard(context: BenchmarkContext) -> Dict[str, object]:
+    """Load what the dashboard renders, without Streamlit's caches"""
+    repository = context.repository()
+    try:
+        return {
+            "dashboard_data": measure(
+                lambda: fetch_dashboard_data(repository), context.options.repeat
+            ),
+            "price_analytics": measure(
+                lambda: compute_analytics(load_history_columns(repository)),
+                max(1, context.options.repeat // 5),
+            ),
+        }
+    finally:
+        repository.session.close()
+
+
+def sweep_state(context: BenchmarkContext) -> Dict[str, object]:
+    """Memory and load time of the products a sweep holds, per representation.
+
+    `pydantic` is what sweeps loaded before (ORM objects converted to
+    Product models), `compact` is SweepProduct rows with their minimum price.
+    """
+    repository = context.repository()
+    loaders = {
+        "pydantic": repository.get_all,
+        "compact": repository.get_sweep_products,
+    }
+    results = {}
+    try:
+        for name, load in loaders.items():
+            repository.session.expunge_all()
+            tracemalloc.start()
+            started = time.perf_counter()
+            products = load()
+            seconds = time.perf_counter() - started
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            count = max(1, len(products))
+            results[name] = {
+                "products": len(products),
+                "seconds": seconds,
+                "retained_bytes_per_product": retained / count,
+                "peak_bytes_per_product": peak / count,
+            }
+            del products
+    finally:
+        repository.session.close()
+    return results
+
+
+def startup(context: BenchmarkContext) -> Dict[str, object]:
+    """Cold import time of the entry points and what importing them loads"""
+    return startup_report(repeat=max(3, context.options.repeat // 4))
+
+
+SCENARIOS: Dict[str, Callable[[BenchmarkContext], Dict[str, object]]] = {
+    "sweep": sweep,
+    "repository": repository_latency,
+    "export": export,
+    "dashboard": dashboard,
+    "sweep_state": sweep_state,
+    "startup": startup,
+}
+# Scenarios that run without the populated database
+NO_DATABASE = {"startup"}
@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+# Entry points whose cold start matters: cron sweeps, workers, imports and the app
+ENTRY_POINTS = ("src.check_prices", "src.worker", "src.import_products", "src.presentation.app")
+# Modules the sweep path must not load just by being imported
+HEAVY_MODULES = ("pandas", "plotly", "streamlit", "numpy", "aiohttp", "pyarrow", "apscheduler")
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def _run(code: str, cwd: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    env.setdefault("FIRECRAWL_API_KEY", "benchmark")
+    env.setdefault("DISCORD_WEBHOOK_URL", "http://127.0.0.1:9/webhook")
+    env.setdefault("POSTGRES_URL", "")
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def import_report(module: str) -> Dict[str, object]:
+    """What importing `module` in a fresh interpreter loads and touches.
+
+    Runs in an empty directory, so a database file or folder created on
+    import shows up in `created_files`.
+    """
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - started\n"
+        "from src.infrastructure.database import session\n"
+        f"heavy = [m for m in {list(HEAVY_MODULES)!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': elapsed, 'heavy_modules': heavy,"
+        " 'engine_created': session._engine is not None}))\n"
+    )
+    with tempfile.TemporaryDirectory(prefix="price-bench-startup-") as cwd:
+        result = json.loads(_run(code, cwd).stdout.strip().splitlines()[-1])
+        result["created_files"] = sorted(os.listdir(cwd))
+    return result
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict[str, float]:
+    """Median wall time of a fresh interpreter importing `module`, in milliseconds.
+
+    `import_ms` excludes the interpreter's own start, measured the same way.
+    """
+
+    def wall_times(code: str) -> List[float]:
+        samples = []
+        with tempfile.TemporaryDirectory(prefix="price-bench-startup-") as cwd:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                _run(code, cwd)
+                samples.append(time.perf_counter() - started)
+        return sorted(samples)
+
+    baseline = wall_times("pass")[repeat // 2]
+    process = wall_times(f"import {module}")[repeat // 2]
+    return {
+        "runs": repeat,
+        "process_ms": process * 1000,
+        "import_ms": max(process - baseline, 0.0) * 1000,
+    }
+
+
+def startup_report(modules: Sequence[str] = ENTRY_POINTS, repeat: int = 5) -> Dict[str, object]:
+    """Import time and side effects of each entry point"""
+    return {
+        module: {**measure_import(module, repeat), **import_report(module)}
+        for module in modules
+    }
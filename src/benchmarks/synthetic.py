@@ -0,0 +1,132 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.infrastructure.database.migrations import run_migrations
+from src.infrastructure.database.models import (
+    Base,
+    PriceHistory as DBPriceHistory,
+    Product as DBProduct,
+)
+from src.infrastructure.repositories.product_repository import ProductRepository
+
+CHUNK_SIZE = 10_000
+
+
+def make_products(count: int, domains: int = 50, seed: int = 0) -> List[dict]:
+    """Rows for the products table, spread over `domains` shop domains"""
+    rng = np.random.default_rng(seed)
+    prices = np.round(rng.lognormal(mean=4.5, sigma=1.0, size=count), 2)
+    check_date = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    products = []
+    for i in range(count):
+        domain = f"shop-{i % max(domains, 1)}.example.com"
+        products.append(
+            {
+                "url": f"https://{domain}/products/{i}",
+                "name": f"Synthetic product {i}",
+                "price": float(prices[i]),
+                "currency": "USD",
+                "check_date": check_date,
+                "main_image_url": f"https://{domain}/images/{i}.jpg",
+                "prompt": None,
+            }
+        )
+    return products
+
+
+def iter_price_history(
+    products: List[dict],
+    points_per_product: int,
+    interval: timedelta = timedelta(hours=6),
+    end: Optional[datetime] = None,
+    change_rate: float = 0.2,
+    seed: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[List[dict]]:
+    """Yield price_history rows in chunks, a random walk per product.
+
+    Each point moves the price with probability `change_rate`. The walk
+    ends at the product's current price, so products and history agree.
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.utcnow()
+    offsets = [interval * (points_per_product - 1 - i) for i in range(points_per_product)]
+    chunk = []
+    for product in products:
+        moves = np.where(
+            rng.random(points_per_product) < change_rate,
+            rng.normal(0.0, 0.05, points_per_product),
+            0.0,
+        )
+        # Walk backwards from the current price
+        factors = np.exp(np.cumsum(moves[::-1]))[::-1]
+        prices = np.round(product["price"] * factors / factors[-1], 2)
+        for offset, price in zip(offsets, prices.tolist()):
+            chunk.append(
+                {
+                    "product_url": product["url"],
+                    "price": price,
+                    "timestamp": end - offset,
+                    "product_name": product["name"],
+                    "cabin_type": None,
+                    "is_lowest": False,
+                }
+            )
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def create_database(db_url: Optional[str] = None) -> Tuple[Engine, sessionmaker]:
+    """Engine and session factory on a fresh schema.
+
+    Without `db_url` a throwaway SQLite file is used. Other databases must
+    be empty scratch databases, since populating them adds rows.
+    """
+    if db_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="price-bench-"), "bench.db")
+        db_url = f"sqlite:///{path}"
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    return engine, sessionmaker(bind=engine)
+
+
+def populate(
+    engine: Engine,
+    session_factory: sessionmaker,
+    product_count: int,
+    history_rows: int,
+    domains: int = 50,
+    seed: int = 0,
+) -> List[str]:
+    """Fill the database with products and about `history_rows` price entries.
+
+    Rollups and price stats are rebuilt afterwards, like after an upgrade.
+    Returns the product URLs.
+    """
+    products = make_products(product_count, domains, seed)
+    points = max(1, history_rows // max(product_count, 1))
+    with engine.begin() as conn:
+        for start in range(0, len(products), CHUNK_SIZE):
+            conn.execute(insert(DBProduct), products[start : start + CHUNK_SIZE])
+        for chunk in iter_price_history(products, points, seed=seed):
+            conn.execute(insert(DBPriceHistory), chunk)
+
+    session: Session = session_factory()
+    try:
+        repository = ProductRepository(session)
+        repository.rebuild_rollups()
+        repository.backfill_price_stats()
+    finally:
+        session.close()
+    return [product["url"] for product in products]
@@ -1,23 +1,50 @@
+import argparse
 import asyncio
 import warnings
+from datetime import timedelta
 
-from src.infrastructure.database import get_session
+from src.infrastructure.database import get_session, init_db
+from src.infrastructure.metrics import metrics
 from src.infrastructure.repositories.product_repository import ProductRepository
 from src.services.price_service import PriceService
 
 
-async def main():
+async def main(adaptive_hours: float = None, metrics_json: str = None):
+    if metrics_json:
+        metrics.enabled = True
+    init_db()
     session = next(get_session())
     repository = ProductRepository(session)
     price_service = PriceService(repository)
     try:
-        updated_products = await price_service.check_prices()
+        # Scheduled sweeps use multi-URL extraction to cut request count
+        if adaptive_hours:
+            updated_products = await price_service.check_due_prices(
+                window=timedelta(hours=adaptive_hours), batch=True
+            )
+        else:
+            updated_products = await price_service.check_prices(batch=True)
         print(f"Successfully checked prices for {len(updated_products)} products")
     except Exception as e:
         print(f"Error checking prices: {e}")
     finally:
         session.close()
+        if metrics_json:
+            metrics.dump(metrics_json)
+            print(f"Timings written to {metrics_json}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Check product prices")
+    parser.add_argument(
+        "--adaptive",
+        type=float,
+        metavar="HOURS",
+        help="Only check products the adaptive scheduler finds due, "
+        "within the scrape budget of HOURS until the next run",
+    )
+    parser.add_argument(
+        "--metrics-json", metavar="PATH", help="Write per-stage timings of the sweep to PATH"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.adaptive, args.metrics_json))
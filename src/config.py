@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,7 +9,78 @@ class Settings(BaseSettings):
     PRICE_DROP_THRESHOLD: float = 0.05  # Minimum price drop percentage
     POSTGRES_URL: str
 
+    # Price check engine
+    CHECK_MAX_IN_FLIGHT: int = 8  # Concurrent scrapes per sweep
+    CHECK_MAX_RETRIES: int = 3  # Retries per product on scrape failure
+    CHECK_RETRY_BACKOFF: float = 2.0  # Seconds, doubled on every retry
+    FIRECRAWL_RATE_PER_MINUTE: float = 10.0  # Requests per minute per API key
+    FIRECRAWL_BURST: int = 5
+    DOMAIN_RATE_PER_MINUTE: float = 6.0  # Requests per minute per target domain
+    DOMAIN_BURST: int = 2
+    CHECK_BATCH_MODE: bool = False  # Group products into multi-URL extracts
+    CHECK_BATCH_SIZE: int = 10  # URLs per extract request
+    CHECK_WRITE_BATCH_SIZE: int = 500  # Price updates per database transaction
+    CHECK_ASYNC_DB: bool = True  # Sweeps use the async engine (aiosqlite/asyncpg)
+
+    # Scrape cache: skip the extraction when a plain fetch shows an unchanged page
+    SCRAPE_CACHE_ENABLED: bool = True
+    SCRAPE_CACHE_PATH: str = "data/scrape_cache.json"
+    SCRAPE_CACHE_TTL_HOURS: float = 24.0  # Re-extract at least this often
+    SCRAPE_CACHE_MAX_ENTRIES: int = 10000
+    FIRECRAWL_CREDITS_PER_SCRAPE: int = 1  # Adjust to your plan's extraction pricing
+
+    # Local extraction: read prices from the page markup before asking Firecrawl
+    LOCAL_EXTRACT_ENABLED: bool = True
+    LOCAL_EXTRACT_TEMPLATES_PATH: str = "data/extraction_templates.json"  # Learned per domain and layout
+    LOCAL_EXTRACT_TEMPLATES_PER_DOMAIN: int = 5  # Layouts kept per shop
+    LOCAL_EXTRACT_TEMPLATE_MAX_AGE_DAYS: float = 30.0  # Drop templates unused this long
+
+    # Bulk import: rows looked up, scraped and inserted together
+    IMPORT_CHUNK_SIZE: int = 100
+
+    # Adaptive scheduling: check volatile products more often within a fixed budget
+    CHECK_BUDGET_PER_HOUR: float = 10.0  # Scrapes per hour across all products
+    CHECK_MIN_INTERVAL_HOURS: float = 1.0
+    CHECK_MAX_INTERVAL_HOURS: float = 7 * 24.0
+    SCHEDULER_TICK_MINUTES: int = 15  # How often the adaptive job looks for due products
+    SCHEDULER_HISTORY_POINTS: int = 50  # Recent prices per product used for signals
+
+    # Check workers (src/worker.py) sharing the database job queue
+    WORKER_BATCH_SIZE: int = 10  # Jobs claimed at once
+    WORKER_LEASE_SECONDS: int = 120  # A job is handed to another worker if not renewed
+    WORKER_POLL_SECONDS: float = 5.0  # Wait when the queue is empty
+    WORKER_MAX_ATTEMPTS: int = 3
+    WORKER_RETRY_DELAY: float = 60.0  # Seconds, doubled on every attempt
+    WORKER_KEEP_FINISHED_HOURS: float = 7 * 24.0
+
+    # History storage: raw entries are compacted into hourly and daily rollups
+    PRICE_HISTORY_RETENTION_DAYS: int = 0  # Raw entries kept, 0 keeps them forever
+    HOURLY_ROLLUP_RETENTION_DAYS: int = 0  # Hourly rollups kept, 0 keeps them forever
+    HISTORY_RAW_MAX_DAYS: float = 14.0  # Longest range read from raw entries
+    HISTORY_HOURLY_MAX_DAYS: float = 180.0  # Longest range read from hourly rollups
+    PARTITION_PRICE_HISTORY: bool = False  # Postgres: convert price_history to monthly partitions on start
+
+    # Instrumentation: per-stage timings and counters (src/infrastructure/metrics.py)
+    METRICS_ENABLED: bool = False
+    METRICS_PORT: int = 0  # Serve /metrics and /metrics.json from the app, 0 to disable
+
+    # Dashboard
+    DASHBOARD_CACHE_TTL: int = 300  # Seconds before cached reads are refreshed
+    UI_BACKGROUND_WORKERS: int = 4  # "Scrape now" / "Add Product" actions running at once
+    UI_JOB_POLL_SECONDS: float = 1.0  # Refresh interval of the background job status
+
     model_config = SettingsConfigDict(env_file=".env")
 
 
-settings = Settings()
+class _LazySettings:
+    """Reads the environment and .env on first attribute access, not on import"""
+
+    _settings: Optional[Settings] = None
+
+    def __getattr__(self, name):
+        if self._settings is None:
+            self._settings = Settings()
+        return getattr(self._settings, name)
+
+
+settings = _LazySettings()
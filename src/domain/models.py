@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
@@ -31,6 +32,25 @@ class Product(ProductCreate):
     pass
 
 
+@dataclass(slots=True)
+class SweepProduct:
+    """What a price check needs of a product, without pydantic's per-object cost.
+
+    Sweeps load one per product straight from a Core SELECT (see
+    `ProductRepository.get_sweep_products`); pydantic models stay at the
+    UI and API boundaries.
+    """
+
+    url: str
+    name: str
+    price: float
+    currency: str
+    main_image_url: str
+    prompt: Optional[str] = None
+    min_price: Optional[float] = None  # Lowest recorded price when loaded
+    last_checked: Optional[datetime] = None  # Time of the last recorded price
+
+
 class PriceHistoryCreate(BaseModel):
     """Schema for creating a price history entry"""
 
@@ -48,4 +68,63 @@ class PriceHistory(PriceHistoryCreate):
     """Schema for reading a price history entry"""
 
     id: int
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+
+
+class PriceRollup(BaseModel):
+    """Schema for reading the aggregated prices of one product over one time bucket"""
+
+    product_url: str
+    bucket_start: datetime
+    open_price: float
+    close_price: float
+    min_price: float
+    max_price: float
+    count: int
+    price_sum: float
+
+    class Config:
+        from_attributes = True
+
+    # Read like a price history entry: the bucket's closing price at its start
+    @property
+    def price(self) -> float:
+        return self.close_price
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.bucket_start
+
+    @property
+    def mean_price(self) -> float:
+        return self.price_sum / self.count
+
+
+class PriceStats(BaseModel):
+    """Schema for reading the running price aggregates of a product"""
+
+    product_url: str
+    min_price: float
+    max_price: float
+    last_price: float
+    price_count: int
+    last_timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CheckJob(BaseModel):
+    """Schema for reading a queued price check"""
+
+    id: int
+    job_key: str
+    product_url: str
+    status: str
+    attempts: int
+    worker_id: Optional[str] = None
+    lease_token: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
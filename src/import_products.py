@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import os
+
+from src.config import settings
+from src.infrastructure.database import get_session, init_db
+from src.infrastructure.metrics import metrics
+from src.infrastructure.repositories.product_repository import ProductRepository
+from src.services.bulk_import import BulkImporter, read_rows
+from src.services.local_extractor import LocalExtractor
+from src.services.product_service import ProductService
+
+
+async def main(
+    path: str,
+    url_column: str = None,
+    prompt_column: str = "prompt",
+    chunk_size: int = None,
+    resume: bool = True,
+    metrics_json: str = None,
+):
+    if metrics_json:
+        metrics.enabled = True
+    checkpoint_path = f"{path}.checkpoint.json"
+    if not resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    init_db()
+    session = next(get_session())
+    local_extractor = LocalExtractor.from_settings(settings)
+    product_service = ProductService(ProductRepository(session), local_extractor=local_extractor)
+    importer = BulkImporter(product_service, chunk_size=chunk_size)
+    try:
+        result = await importer.run(
+            read_rows(path, url_column, prompt_column), checkpoint_path=checkpoint_path
+        )
+        for url, error in result.failed:
+            print(f"Failed: {url}: {error}")
+    except Exception as e:
+        print(f"Error importing products: {e}")
+        if os.path.exists(checkpoint_path):
+            print("Run the same command again to resume")
+    finally:
+        session.close()
+        if metrics_json:
+            metrics.dump(metrics_json)
+            print(f"Timings written to {metrics_json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add products from a CSV or JSONL file")
+    parser.add_argument("path", help="CSV file with a header row, or JSONL of objects or URLs")
+    parser.add_argument(
+        "--url-column",
+        help="Column holding the product URLs (default: the first column named like 'url')",
+    )
+    parser.add_argument(
+        "--prompt-column", default="prompt", help="Column holding custom extraction prompts"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, help="Rows looked up, scraped and inserted together"
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint of an interrupted import and start over",
+    )
+    parser.add_argument(
+        "--metrics-json", metavar="PATH", help="Write per-stage timings of the import to PATH"
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.path,
+            args.url_column,
+            args.prompt_column,
+            args.chunk_size,
+            not args.restart,
+            args.metrics_json,
+        )
+    )
@@ -1,4 +1,27 @@
-from .models import Base, Product, PriceHistory
-from .session import SessionLocal, get_session
+from .models import (
+    Base,
+    CheckJob,
+    DailyPriceRollup,
+    HourlyPriceRollup,
+    PriceHistory,
+    PriceStats,
+    Product,
+)
+from .async_session import create_async_db_engine, get_async_db_url
+from .session import SessionLocal, get_engine, get_session, init_db
 
-__all__ = ["Base", "Product", "PriceHistory", "SessionLocal", "get_session"]
+__all__ = [
+    "Base",
+    "CheckJob",
+    "DailyPriceRollup",
+    "HourlyPriceRollup",
+    "PriceHistory",
+    "PriceStats",
+    "Product",
+    "SessionLocal",
+    "create_async_db_engine",
+    "get_async_db_url",
+    "get_engine",
+    "get_session",
+    "init_db",
+]
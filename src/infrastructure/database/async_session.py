@@ -0,0 +1,59 @@
+from typing import Optional, Union
+from uuid import uuid4
+
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .session import CONNECT_TIMEOUT, MAX_OVERFLOW, POOL_SIZE, get_connect_args, get_db_url
+
+
+def get_async_db_url(db_url: Union[str, URL]) -> URL:
+    """The same database addressed through aiosqlite or asyncpg"""
+    url = make_url(db_url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    # asyncpg takes libpq's sslmode as ssl
+    query = dict(url.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername="postgresql+asyncpg", query=query)
+
+
+def supports_async(db_url: Union[str, URL]) -> bool:
+    """Whether a second (async) engine sees the same data as `db_url`"""
+    url = make_url(db_url)
+    # Every connection to an in-memory SQLite database gets its own database
+    return not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"))
+
+
+def create_async_db_engine(db_url: Optional[Union[str, URL]] = None) -> AsyncEngine:
+    """An async engine with the same pool sizing as the sync one.
+
+    Async connections belong to the event loop that opened them, so callers
+    create one engine per loop and dispose of it before the loop ends.
+    """
+    db_url = db_url or get_db_url()
+    # Creates the local database folder for SQLite
+    get_connect_args(str(db_url))
+    async_url = get_async_db_url(db_url)
+    # aiosqlite and asyncpg both call it timeout
+    connect_args = {"timeout": CONNECT_TIMEOUT}
+    if async_url.get_backend_name() == "postgresql":
+        # Transaction-mode poolers (pgbouncer, the Supabase pooler) hand each
+        # transaction a different server connection, where asyncpg's cached
+        # prepared statements don't exist or clash by name
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+    return create_async_engine(
+        async_url,
+        # aiosqlite would default to opening a connection per checkout
+        poolclass=AsyncAdaptedQueuePool,
+        pool_pre_ping=True,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        connect_args=connect_args,
+    )
@@ -0,0 +1,22 @@
+from sqlalchemy import func
+
+
+def dialect_insert(dialect_name: str, table):
+    """INSERT construct with ON CONFLICT support for Postgres or SQLite.
+
+    The dialect module is imported on first use, so SQLite deployments never
+    load the (comparatively slow to import) Postgres dialect.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def least_greatest(dialect_name: str):
+    """The (least, greatest) SQL functions of two or more arguments"""
+    if dialect_name == "postgresql":
+        return func.least, func.greatest
+    # SQLite's multi-argument min()/max() are scalar functions
+    return func.min, func.max
@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
+from src.config import settings
+
+from .models import PriceStats, SchemaMigration
+from .partitions import is_partitioned, partition_price_history
+from .rollups import ROLLUPS, rebuild_price_stats, rebuild_rollups
+
+# Tables that don't exist yet are created by `Base.metadata.create_all`; these
+# migrations only bring databases created by older versions up to date.
+
+
+def _add_price_history_url_timestamp_index(engine: Engine) -> None:
+    """Replace the product_url index with a (product_url, timestamp) index"""
+    if engine.dialect.name == "postgresql":
+        # CONCURRENTLY keeps the table writable while the index builds, but
+        # it can't run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(
+                text(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                    "ix_price_history_product_url_timestamp "
+                    "ON price_history (product_url, timestamp)"
+                )
+            )
+            conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_price_history_product_url"))
+        return
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_price_history_product_url_timestamp "
+                "ON price_history (product_url, timestamp)"
+            )
+        )
+        conn.execute(text("DROP INDEX IF EXISTS ix_price_history_product_url"))
+
+
+def _partition_price_history_by_month(engine: Engine) -> Optional[bool]:
+    """Turn price_history into a table range-partitioned by month (Postgres only).
+
+    The conversion rewrites the whole table, so it waits for
+    PARTITION_PRICE_HISTORY to be turned on.
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    if not settings.PARTITION_PRICE_HISTORY:
+        return False
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            partition_price_history(conn)
+    return None
+
+
+def _backfill_price_rollups(engine: Engine) -> None:
+    """Build the hourly and daily rollups of the existing price history"""
+    for model, _ in ROLLUPS:
+        model.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        rebuild_rollups(conn)
+
+
+def _backfill_price_stats(engine: Engine) -> None:
+    """Build the running price aggregates of the existing history from the daily rollups"""
+    PriceStats.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        rebuild_price_stats(conn)
+
+
+# A migration returning False is not applied yet and is retried on the next run
+MIGRATIONS: List[Tuple[str, Callable[[Engine], Optional[bool]]]] = [
+    ("0001_price_history_url_timestamp_index", _add_price_history_url_timestamp_index),
+    ("0002_partition_price_history_by_month", _partition_price_history_by_month),
+    ("0003_backfill_price_rollups", _backfill_price_rollups),
+    ("0004_backfill_price_stats", _backfill_price_stats),
+]
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply pending migrations in order and return the names applied"""
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(SchemaMigration.name)).scalars())
+
+    newly_applied = []
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        # Migrations are idempotent, so a process racing us to the same
+        # migration is harmless; only one of us gets to record it
+        if migrate(engine) is False:
+            continue
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    SchemaMigration.__table__.insert().values(name=name, applied_at=datetime.utcnow())
+                )
+        except IntegrityError:
+            continue
+        print(f"Applied migration {name}")
+        newly_applied.append(name)
+    return newly_applied
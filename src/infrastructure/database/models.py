@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import Boolean, create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import Boolean, create_engine, Column, Index, Integer, String, Float, DateTime
 from sqlalchemy.orm import sessionmaker, declarative_base
 from datetime import datetime
 from urllib.parse import urlparse
@@ -22,11 +22,84 @@ class Product(Base):
 
 class PriceHistory(Base):
     __tablename__ = "price_history"
+    __table_args__ = (
+        # Every history query filters by product and orders by time
+        Index("ix_price_history_product_url_timestamp", "product_url", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True)
-    product_url = Column(String, index=True)
+    product_url = Column(String)
     price = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
     product_name = Column(String)
     cabin_type = Column(String)  # New column
-    is_lowest = Column(Boolean, default=False)  # New column
\ No newline at end of file
+    is_lowest = Column(Boolean, default=False)  # New column
+
+
+class _PriceRollupColumns:
+    """Aggregates of one product's prices over one time bucket"""
+
+    product_url = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    first_timestamp = Column(DateTime)
+    last_timestamp = Column(DateTime)
+    open_price = Column(Float)
+    close_price = Column(Float)
+    min_price = Column(Float)
+    max_price = Column(Float)
+    count = Column(Integer, default=0)
+    price_sum = Column(Float, default=0)
+
+
+class HourlyPriceRollup(_PriceRollupColumns, Base):
+    __tablename__ = "price_history_hourly"
+
+
+class DailyPriceRollup(_PriceRollupColumns, Base):
+    __tablename__ = "price_history_daily"
+
+
+class PriceStats(Base):
+    """Running price aggregates per product, kept in step with price_history"""
+
+    __tablename__ = "product_price_stats"
+
+    product_url = Column(String, primary_key=True)
+    min_price = Column(Float)
+    max_price = Column(Float)
+    last_price = Column(Float)
+    price_count = Column(Integer, default=0)
+    last_timestamp = Column(DateTime)
+
+
+class SchemaMigration(Base):
+    """Migrations already applied to this database"""
+
+    __tablename__ = "schema_migrations"
+
+    name = Column(String, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CheckJob(Base):
+    """A queued price check of one product, claimed by workers under a lease"""
+
+    __tablename__ = "check_jobs"
+    __table_args__ = (
+        # Workers look for claimable jobs by status and due time
+        Index("ix_check_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_key = Column(String, unique=True, nullable=False)  # Enqueueing the same key twice is a no-op
+    product_url = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String)
+    lease_token = Column(String, index=True)
+    lease_expires_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    last_error = Column(String)
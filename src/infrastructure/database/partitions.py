@@ -0,0 +1,168 @@
+import re
+from datetime import date, datetime
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# price_history is range-partitioned by month on Postgres; other databases
+# keep a plain table
+PARTITION_NAME = re.compile(r"^price_history_y(\d{4})m(\d{2})$")
+# Partitions are created this many months before rows need them
+MONTHS_AHEAD = 3
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"price_history_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    kind = conn.scalar(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('price_history')")
+    )
+    return kind == "p"
+
+
+def list_partitions(conn: Connection) -> List[Tuple[date, str]]:
+    """Monthly partitions of price_history as (month, table name), oldest first"""
+    names = conn.scalars(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('price_history')"
+        )
+    )
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def create_month_partition(conn: Connection, month: date) -> None:
+    """Add the partition of one month, moving its rows out of the default partition.
+
+    Rows land in the default partition when no partition was created ahead of
+    time; attaching the new partition fails while they are still there.
+    """
+    name, start, end = partition_name(month), month.isoformat(), next_month(month).isoformat()
+    conn.execute(text(f"CREATE TABLE {name} (LIKE price_history INCLUDING DEFAULTS)"))
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM price_history_default "
+            f"WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"start": start, "end": end},
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE price_history ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    )
+
+
+def ensure_partitions(conn: Connection, months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    """Create missing monthly partitions up to `months_ahead` months from now"""
+    if not is_partitioned(conn):
+        return []
+    existing = {month for month, _ in list_partitions(conn)}
+    month = min(existing) if existing else month_start(datetime.utcnow())
+    last = month_start(datetime.utcnow())
+    for _ in range(months_ahead):
+        last = next_month(last)
+    created = []
+    while month <= last:
+        if month not in existing:
+            create_month_partition(conn, month)
+            created.append(partition_name(month))
+        month = next_month(month)
+    return created
+
+
+def drop_partitions_before(conn: Connection, cutoff: datetime) -> int:
+    """Drop the monthly partitions entirely older than `cutoff`; returns rows dropped"""
+    dropped = 0
+    for month, name in list_partitions(conn):
+        if datetime.combine(next_month(month), datetime.min.time()) > cutoff:
+            break
+        dropped += conn.scalar(text(f"SELECT count(*) FROM {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+    return dropped
+
+
+def partition_price_history(conn: Connection, months_ahead: int = MONTHS_AHEAD) -> None:
+    """Rebuild a plain price_history table as a table partitioned by month"""
+    conn.execute(text("LOCK TABLE price_history IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text("ALTER TABLE price_history RENAME TO price_history_unpartitioned"))
+    conn.execute(
+        text(
+            "ALTER TABLE price_history_unpartitioned "
+            "RENAME CONSTRAINT price_history_pkey TO price_history_unpartitioned_pkey"
+        )
+    )
+    conn.execute(
+        text(
+            "ALTER INDEX IF EXISTS ix_price_history_product_url_timestamp "
+            "RENAME TO ix_price_history_unpartitioned_product_url_timestamp"
+        )
+    )
+    # The partition key has to be part of the primary key
+    conn.execute(
+        text(
+            "CREATE TABLE price_history ("
+            "id INTEGER NOT NULL DEFAULT nextval('price_history_id_seq'), "
+            "product_url VARCHAR, "
+            "price DOUBLE PRECISION, "
+            "timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'), "
+            "product_name VARCHAR, "
+            "cabin_type VARCHAR, "
+            "is_lowest BOOLEAN, "
+            "PRIMARY KEY (id, timestamp)"
+            ") PARTITION BY RANGE (timestamp)"
+        )
+    )
+    # Keep the id sequence when the old table goes away
+    conn.execute(text("ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id"))
+    conn.execute(
+        text(
+            "CREATE INDEX ix_price_history_product_url_timestamp "
+            "ON price_history (product_url, timestamp)"
+        )
+    )
+    conn.execute(text("CREATE TABLE price_history_default PARTITION OF price_history DEFAULT"))
+
+    oldest, newest = conn.execute(
+        text("SELECT min(timestamp), max(timestamp) FROM price_history_unpartitioned")
+    ).one()
+    now = datetime.utcnow()
+    month = month_start(oldest or now)
+    last = month_start(max(newest or now, now))
+    for _ in range(months_ahead):
+        last = next_month(last)
+    while month <= last:
+        create_month_partition(conn, month)
+        month = next_month(month)
+
+    conn.execute(
+        text(
+            "INSERT INTO price_history "
+            "SELECT id, product_url, price, "
+            "COALESCE(timestamp, now() AT TIME ZONE 'utc'), "
+            "product_name, cabin_type, is_lowest "
+            "FROM price_history_unpartitioned"
+        )
+    )
+    conn.execute(text("DROP TABLE price_history_unpartitioned"))
@@ -0,0 +1,165 @@
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, delete, func, insert, select, update
+from sqlalchemy.engine import Connection
+
+from .dialects import dialect_insert, least_greatest
+from .models import DailyPriceRollup, HourlyPriceRollup, PriceHistory, PriceStats
+
+
+def hour_bucket(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(timestamp: datetime) -> datetime:
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Rollup tables, finest first, with the bucket each timestamp falls in
+ROLLUPS: List[Tuple[type, Callable[[datetime], datetime]]] = [
+    (HourlyPriceRollup, hour_bucket),
+    (DailyPriceRollup, day_bucket),
+]
+
+
+def aggregate(rows: Iterable[dict], bucket: Callable[[datetime], datetime]) -> List[dict]:
+    """Fold (product_url, price, timestamp) rows into one rollup row per bucket"""
+    buckets: Dict[Tuple[str, datetime], dict] = {}
+    for row in rows:
+        key = (row["product_url"], bucket(row["timestamp"]))
+        rollup = buckets.get(key)
+        if rollup is None:
+            buckets[key] = {
+                "product_url": key[0],
+                "bucket_start": key[1],
+                "first_timestamp": row["timestamp"],
+                "last_timestamp": row["timestamp"],
+                "open_price": row["price"],
+                "close_price": row["price"],
+                "min_price": row["price"],
+                "max_price": row["price"],
+                "count": 1,
+                "price_sum": row["price"],
+            }
+            continue
+        if row["timestamp"] < rollup["first_timestamp"]:
+            rollup["first_timestamp"], rollup["open_price"] = row["timestamp"], row["price"]
+        if row["timestamp"] >= rollup["last_timestamp"]:
+            rollup["last_timestamp"], rollup["close_price"] = row["timestamp"], row["price"]
+        rollup["min_price"] = min(rollup["min_price"], row["price"])
+        rollup["max_price"] = max(rollup["max_price"], row["price"])
+        rollup["count"] += 1
+        rollup["price_sum"] += row["price"]
+    return list(buckets.values())
+
+
+def merge_rollups(conn: Connection, history_rows: List[dict]) -> None:
+    """Fold new price history rows into the hourly and daily rollups.
+
+    One executemany INSERT ... ON CONFLICT DO UPDATE per rollup table, run in
+    the caller's transaction.
+    """
+    if not history_rows:
+        return
+    least, greatest = least_greatest(conn.dialect.name)
+    for model, bucket in ROLLUPS:
+        stmt = dialect_insert(conn.dialect.name, model)
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.product_url, model.bucket_start],
+            set_={
+                "open_price": case(
+                    (new.first_timestamp < model.first_timestamp, new.open_price),
+                    else_=model.open_price,
+                ),
+                "close_price": case(
+                    (new.last_timestamp >= model.last_timestamp, new.close_price),
+                    else_=model.close_price,
+                ),
+                "first_timestamp": least(model.first_timestamp, new.first_timestamp),
+                "last_timestamp": greatest(model.last_timestamp, new.last_timestamp),
+                "min_price": least(model.min_price, new.min_price),
+                "max_price": greatest(model.max_price, new.max_price),
+                "count": model.count + new.count,
+                "price_sum": model.price_sum + new.price_sum,
+            },
+        )
+        conn.execute(stmt, aggregate(history_rows, bucket))
+
+
+def rebuild_rollups(
+    conn: Connection, before: Optional[datetime] = None, chunk_size: int = 5000
+) -> int:
+    """Recompute rollups from the raw price history still stored.
+
+    Only buckets from each product's oldest raw point on are rebuilt, so
+    rollups of already compacted history are kept. `before` must fall on a
+    day boundary. Returns the number of raw rows read.
+    """
+    table = PriceHistory.__table__
+    window = [table.c.timestamp < before] if before is not None else []
+    oldest = conn.execute(
+        select(table.c.product_url, func.min(table.c.timestamp))
+        .where(*window)
+        .group_by(table.c.product_url)
+    ).all()
+    if not oldest:
+        return 0
+
+    for model, bucket in ROLLUPS:
+        stmt = delete(model).where(
+            model.product_url == bindparam("url"),
+            model.bucket_start >= bindparam("start"),
+        )
+        if before is not None:
+            stmt = stmt.where(model.bucket_start < before)
+        conn.execute(stmt, [{"url": url, "start": bucket(first)} for url, first in oldest])
+
+    result = conn.execute(
+        select(table.c.product_url, table.c.price, table.c.timestamp)
+        .where(*window)
+        .order_by(table.c.product_url, table.c.timestamp),
+        execution_options={"stream_results": True, "yield_per": chunk_size},
+    )
+    count = 0
+    try:
+        for rows in result.partitions():
+            merge_rollups(conn, [row._asdict() for row in rows])
+            count += len(rows)
+    finally:
+        result.close()
+    return count
+
+
+def rebuild_price_stats(conn: Connection) -> int:
+    """Recompute the running price aggregates of all products from the daily rollups.
+
+    The rollups also cover history that was compacted away from
+    price_history; run `rebuild_rollups` first if they may be stale.
+    Returns the number of products with stats.
+    """
+    daily = DailyPriceRollup
+    latest = (
+        select(daily.close_price)
+        .where(daily.product_url == PriceStats.product_url)
+        .order_by(daily.bucket_start.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    aggregates = select(
+        daily.product_url,
+        func.min(daily.min_price),
+        func.max(daily.max_price),
+        func.sum(daily.count),
+        func.max(daily.last_timestamp),
+    ).group_by(daily.product_url)
+    conn.execute(delete(PriceStats))
+    conn.execute(
+        insert(PriceStats).from_select(
+            ["product_url", "min_price", "max_price", "price_count", "last_timestamp"],
+            aggregates,
+        )
+    )
+    conn.execute(update(PriceStats).values(last_price=latest))
+    return conn.scalar(select(func.count()).select_from(PriceStats))
@@ -1,14 +1,22 @@
 import os
+import threading
+from typing import Optional
 from urllib.parse import urlparse
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
 from .models import Base
 
 load_dotenv()
 
+# Connection pool sizing, shared by the sync and the async engine
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+CONNECT_TIMEOUT = 30  # Seconds
+
 
 def get_db_url():
     """Get database URL with fallback to SQLite for local development"""
@@ -35,18 +43,71 @@ def get_db_url():
     return "sqlite:///data/price_history.db"
 
 
-engine = create_engine(
-    get_db_url(),
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    connect_args={"connect_timeout": 30},  # Add connection timeout
-)
+def get_connect_args(db_url: str) -> dict:
+    """Driver specific connection arguments"""
+    if db_url.startswith("sqlite"):
+        # Make sure the local database folder exists
+        os.makedirs("data", exist_ok=True)
+        return {"timeout": CONNECT_TIMEOUT}
+    return {"connect_timeout": CONNECT_TIMEOUT}  # Add connection timeout
+
+
+class _SessionFactory(sessionmaker):
+    """A sessionmaker that creates the engine when the first session is made"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            get_engine()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _SessionFactory()
+
+_engine: Optional[Engine] = None
+_initialized = False
+_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """The engine of this process, created on first use without connecting"""
+    global _engine
+    with _lock:
+        if _engine is None:
+            db_url = get_db_url()
+            _engine = create_engine(
+                db_url,
+                pool_pre_ping=True,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                connect_args=get_connect_args(db_url),
+            )
+            SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def init_db() -> Engine:
+    """Create missing tables, apply migrations and keep partitions ahead.
 
-SessionLocal = sessionmaker(bind=engine)
+    Entry points call this once before their first query; later calls in the
+    same process return right away.
+    """
+    global _initialized
+    engine = get_engine()
+    with _lock:
+        if _initialized:
+            return engine
+        from .migrations import run_migrations
+        from .partitions import ensure_partitions
 
-# Create tables if they don't exist
-Base.metadata.create_all(engine)
+        # Create tables if they don't exist and bring older schemas up to date
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        if engine.dialect.name == "postgresql":
+            # Keep monthly price_history partitions ahead of incoming rows
+            with engine.begin() as conn:
+                ensure_partitions(conn)
+        _initialized = True
+    return engine
 
 
 def get_session():
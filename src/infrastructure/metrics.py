@@ -0,0 +1,258 @@
+import bisect
+import functools
+import inspect
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from src.config import settings
+
+PREFIX = "price_tracker"
+# Histogram bucket upper bounds in seconds: 0.1ms to ~2 minutes, 25% apart
+BUCKETS = tuple(0.0001 * 1.25**i for i in range(64))
+QUANTILES = (0.5, 0.95, 0.99)
+
+_UNSAFE_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Histogram:
+    """Span durations in fixed exponential buckets, plus count, sum, min and max"""
+
+    __slots__ = ("counts", "count", "sum", "min", "max", "errors")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                value = lower + (upper - lower) * (rank - seen) / count
+                return min(max(value, self.min), self.max)
+            seen += count
+        return self.max
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.metrics.observe(
+            self.name, time.perf_counter() - self.started, error=exc_type is not None
+        )
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Metrics:
+    """Duration histograms of named spans and plain counters.
+
+    Spans time a block (`with metrics.span("name")`) or a function
+    (`@metrics.timed("name")`). While disabled, a span is a shared no-op
+    object and a timed function costs one attribute check per call.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        # None defers to METRICS_ENABLED, read on first use
+        self._enabled = enabled
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        # Scrapes run in worker threads and record spans concurrently
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = settings.METRICS_ENABLED
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        self._enabled = value
+
+    def span(self, name: str):
+        """Context manager timing its block under `name`"""
+        return _Span(self, name) if self.enabled else _NO_SPAN
+
+    def timed(self, name: str) -> Callable:
+        """Decorator timing every call of a function or coroutine function"""
+
+        def decorator(fn: Callable) -> Callable:
+            if inspect.iscoroutinefunction(fn):
+
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await fn(*args, **kwargs)
+                    with _Span(self, name):
+                        return await fn(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def observe(self, name: str, seconds: float, error: bool = False) -> None:
+        """Record one duration of span `name`"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+            if error:
+                histogram.errors += 1
+
+    def increment(self, name: str, value: float = 1.0) -> None:
+        """Add to counter `name`; a no-op while disabled"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """Span statistics (in seconds) and counters as plain data"""
+        with self._lock:
+            spans = {
+                name: {
+                    "count": h.count,
+                    "errors": h.errors,
+                    "sum": h.sum,
+                    "mean": h.sum / h.count,
+                    **{f"p{round(q * 100)}": h.quantile(q) for q in QUANTILES},
+                    "max": h.max,
+                }
+                for name, h in sorted(self._histograms.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+        return {"spans": spans, "counters": counters}
+
+    def dump(self, path: str) -> None:
+        """Write the snapshot to a JSON file"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Everything recorded, in the Prometheus text exposition format"""
+        histogram_name = f"{PREFIX}_span_seconds"
+        errors_name = f"{PREFIX}_span_errors_total"
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+            lines.append(f"# HELP {histogram_name} Time spent in instrumented spans")
+            lines.append(f"# TYPE {histogram_name} histogram")
+            for name, h in histograms:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h.counts):
+                    cumulative += count
+                    lines.append(f'{histogram_name}_bucket{{span="{name}",le="{bound:.6g}"}} {cumulative}')
+                lines.append(f'{histogram_name}_bucket{{span="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'{histogram_name}_sum{{span="{name}"}} {h.sum!r}')
+                lines.append(f'{histogram_name}_count{{span="{name}"}} {h.count}')
+
+            lines.append(f"# HELP {errors_name} Spans that ended with an exception")
+            lines.append(f"# TYPE {errors_name} counter")
+            for name, h in histograms:
+                lines.append(f'{errors_name}{{span="{name}"}} {h.errors}')
+
+            for name, value in counters:
+                metric = f"{PREFIX}_{_UNSAFE_NAME.sub('_', name)}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        registry = self.server.metrics
+        if self.path == "/metrics":
+            body = registry.to_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(registry.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(
+    port: int, host: str = "0.0.0.0", registry: Optional[Metrics] = None
+) -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread.
+
+    Serving turns recording on.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = registry or metrics
+    server.metrics.enabled = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
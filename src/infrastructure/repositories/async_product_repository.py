@@ -0,0 +1,108 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from sqlalchemy import select
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.domain.models import Product, ProductCreate, PriceHistoryCreate, PriceStats
+from .base import AsyncBaseRepository
+from .product_repository import ProductRepository
+from ..database.async_session import create_async_db_engine
+from ..database.models import PriceStats as DBPriceStats, Product as DBProduct
+from ..metrics import metrics
+
+
+class AsyncProductRepository(AsyncBaseRepository[Product]):
+    """Product repository on SQLAlchemy's async engine (aiosqlite or asyncpg).
+
+    Every call runs in its own session, so calls from concurrent tasks use
+    separate pooled connections and never block the event loop. Writes run
+    ProductRepository's statements through `run_sync`, so both repositories
+    keep the price stats and rollups up to date the same way.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker):
+        self.session_factory = session_factory
+
+    @metrics.timed("async_repository.add")
+    async def add(self, product: ProductCreate) -> Product:
+        """Add a new product"""
+        async with self.session_factory() as session:
+            return await session.run_sync(lambda s: ProductRepository(s).add(product))
+
+    @metrics.timed("async_repository.get")
+    async def get(self, id: str) -> Optional[Product]:
+        """Get a product by URL (our ID)"""
+        async with self.session_factory() as session:
+            db_product = await session.get(DBProduct, id)
+            return Product.model_validate(db_product) if db_product else None
+
+    @metrics.timed("async_repository.get_all")
+    async def get_all(self) -> List[Product]:
+        """Get all products"""
+        async with self.session_factory() as session:
+            return [Product.model_validate(p) for p in await session.scalars(select(DBProduct))]
+
+    @metrics.timed("async_repository.get_many")
+    async def get_many(self, urls: List[str]) -> List[Product]:
+        """Get the products with these URLs in one query"""
+        if not urls:
+            return []
+        async with self.session_factory() as session:
+            db_products = await session.scalars(select(DBProduct).where(DBProduct.url.in_(urls)))
+            return [Product.model_validate(p) for p in db_products]
+
+    @metrics.timed("async_repository.delete")
+    async def delete(self, id: str) -> None:
+        """Delete a product and its price history"""
+        async with self.session_factory() as session:
+            await session.run_sync(lambda s: ProductRepository(s).delete(id))
+
+    @metrics.timed("async_repository.update")
+    async def update(self, product: Product) -> Product:
+        """Update a product in the database"""
+        async with self.session_factory() as session:
+            return await session.run_sync(lambda s: ProductRepository(s).update(product))
+
+    @metrics.timed("async_repository.get_price_stats")
+    async def get_price_stats(self, product_url: str) -> Optional[PriceStats]:
+        """Get the running price aggregates of a product"""
+        async with self.session_factory() as session:
+            db_stats = await session.get(DBPriceStats, product_url)
+            return PriceStats.model_validate(db_stats) if db_stats else None
+
+    @metrics.timed("async_repository.get_all_price_stats")
+    async def get_all_price_stats(self) -> Dict[str, PriceStats]:
+        """Get the running price aggregates of all products, keyed by URL"""
+        async with self.session_factory() as session:
+            return {
+                db_stats.product_url: PriceStats.model_validate(db_stats)
+                for db_stats in await session.scalars(select(DBPriceStats))
+            }
+
+    @metrics.timed("async_repository.apply_price_updates")
+    async def apply_price_updates(self, batch: List[PriceHistoryCreate]) -> int:
+        """Insert price history rows and update product prices in one transaction"""
+        if not batch:
+            return 0
+        async with self.session_factory() as session:
+            return await session.run_sync(lambda s: ProductRepository(s).apply_price_updates(batch))
+
+
+@asynccontextmanager
+async def open_async_repository(
+    db_url: Optional[Union[str, URL]] = None,
+) -> AsyncIterator[AsyncProductRepository]:
+    """An AsyncProductRepository on its own engine, disposed of on exit.
+
+    Must be opened and closed on the event loop that uses it. A probe query
+    runs first, so connection and driver errors surface here rather than on
+    the first write.
+    """
+    engine = create_async_db_engine(db_url)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(select(1))
+        yield AsyncProductRepository(async_sessionmaker(engine, expire_on_commit=False))
+    finally:
+        await engine.dispose()
@@ -26,3 +26,27 @@ class BaseRepository(ABC, Generic[T]):
     def delete(self, id: str) -> None:
         """Delete an entity"""
         pass
+
+
+class AsyncBaseRepository(ABC, Generic[T]):
+    """Base repository interface for repositories on the async engine"""
+
+    @abstractmethod
+    async def add(self, entity: T) -> T:
+        """Add a new entity"""
+        pass
+
+    @abstractmethod
+    async def get(self, id: str) -> Optional[T]:
+        """Get an entity by id"""
+        pass
+
+    @abstractmethod
+    async def get_all(self) -> List[T]:
+        """Get all entities"""
+        pass
+
+    @abstractmethod
+    async def delete(self, id: str) -> None:
+        """Delete an entity"""
+        pass
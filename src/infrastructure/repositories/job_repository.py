@@ -0,0 +1,206 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, and_, cast, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+from src.domain.models import CheckJob
+from ..database.dialects import dialect_insert
+from ..database.models import CheckJob as DBCheckJob
+from ..metrics import metrics
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobRepository:
+    """Durable queue of price check jobs shared by any number of workers.
+
+    Workers claim jobs under a lease they renew with heartbeats; a job whose
+    lease runs out is handed to the next worker. On Postgres claims use
+    SELECT ... FOR UPDATE SKIP LOCKED so workers never wait on each other;
+    SQLite serializes writers, so the same single UPDATE is safe there.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    @metrics.timed("jobs.enqueue")
+    def enqueue(self, jobs: Iterable[Tuple[str, str]], run_after: Optional[datetime] = None) -> int:
+        """Queue (job_key, product_url) pairs, skipping keys already queued.
+
+        Returns the number of new jobs.
+        """
+        run_after = run_after or datetime.utcnow()
+        rows = [
+            {"job_key": key, "product_url": url, "status": QUEUED, "run_after": run_after,
+             "attempts": 0, "created_at": datetime.utcnow()}
+            for key, url in dict(jobs).items()
+        ]
+        if not rows:
+            return 0
+        stmt = dialect_insert(self.session.get_bind().dialect.name, DBCheckJob)
+        stmt = stmt.on_conflict_do_nothing(index_elements=[DBCheckJob.job_key]).returning(
+            DBCheckJob.id
+        )
+        try:
+            added = len(self.session.execute(stmt, rows).all())
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return added
+
+    @metrics.timed("jobs.claim")
+    def claim(
+        self, worker_id: str, limit: int, lease: timedelta, max_attempts: int
+    ) -> Tuple[str, List[CheckJob]]:
+        """Lease up to `limit` due jobs; returns the lease token and the jobs"""
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        claimable = (
+            select(DBCheckJob.id)
+            .where(
+                or_(
+                    and_(DBCheckJob.status == QUEUED, DBCheckJob.run_after <= now),
+                    # Jobs of workers that stopped sending heartbeats
+                    and_(DBCheckJob.status == RUNNING, DBCheckJob.lease_expires_at < now),
+                ),
+                DBCheckJob.attempts < max_attempts,
+            )
+            .order_by(DBCheckJob.run_after, DBCheckJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        try:
+            # Abandoned jobs that used up their attempts won't be picked again
+            self.session.execute(
+                self._finish_failed(
+                    and_(
+                        DBCheckJob.status == RUNNING,
+                        DBCheckJob.lease_expires_at < now,
+                        DBCheckJob.attempts >= max_attempts,
+                    ),
+                    "Lease expired too many times",
+                )
+            )
+            self.session.execute(
+                update(DBCheckJob)
+                .where(DBCheckJob.id.in_(claimable.scalar_subquery()))
+                .values(
+                    status=RUNNING,
+                    worker_id=worker_id,
+                    lease_token=token,
+                    lease_expires_at=now + lease,
+                    heartbeat_at=now,
+                    attempts=DBCheckJob.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        jobs = self.session.scalars(
+            select(DBCheckJob).where(DBCheckJob.lease_token == token).order_by(DBCheckJob.id)
+        ).all()
+        return token, [CheckJob.model_validate(job) for job in jobs]
+
+    @metrics.timed("jobs.heartbeat")
+    def heartbeat(self, token: str, lease: timedelta) -> int:
+        """Extend the lease of running jobs; returns how many are still ours"""
+        now = datetime.utcnow()
+        return self._update_leased(
+            token, lease_expires_at=now + lease, heartbeat_at=now
+        )
+
+    @metrics.timed("jobs.complete")
+    def complete(self, token: str, job_ids: List[int]) -> int:
+        """Mark leased jobs done"""
+        if not job_ids:
+            return 0
+        return self._update_leased(
+            token,
+            DBCheckJob.id.in_(job_ids),
+            status=DONE,
+            finished_at=datetime.utcnow(),
+            lease_expires_at=None,
+        )
+
+    @metrics.timed("jobs.fail")
+    def fail(
+        self, token: str, job_id: int, error: str, retry_at: Optional[datetime] = None
+    ) -> None:
+        """Requeue a leased job for `retry_at`, or give up on it when None"""
+        leased = and_(
+            DBCheckJob.id == job_id,
+            DBCheckJob.lease_token == token,
+            DBCheckJob.status == RUNNING,
+        )
+        if retry_at is not None:
+            stmt = (
+                update(DBCheckJob)
+                .where(leased)
+                .values(status=QUEUED, run_after=retry_at, lease_expires_at=None, last_error=error)
+            )
+        else:
+            stmt = self._finish_failed(leased, error)
+        try:
+            self.session.execute(stmt.execution_options(synchronize_session=False))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        rows = self.session.execute(
+            select(DBCheckJob.status, func.count(DBCheckJob.id)).group_by(DBCheckJob.status)
+        )
+        return {status: count for status, count in rows}
+
+    def purge_finished(self, older_than: datetime) -> int:
+        """Delete done and failed jobs that finished before `older_than`"""
+        try:
+            result = self.session.execute(
+                delete(DBCheckJob).where(
+                    DBCheckJob.status.in_([DONE, FAILED]),
+                    DBCheckJob.finished_at < older_than,
+                )
+            )
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return result.rowcount
+
+    def _finish_failed(self, condition, error: str):
+        # Failed jobs give up their key so the product can be queued again
+        return (
+            update(DBCheckJob)
+            .where(condition)
+            .values(
+                status=FAILED,
+                finished_at=datetime.utcnow(),
+                lease_expires_at=None,
+                last_error=error,
+                job_key=DBCheckJob.job_key + ":failed:" + cast(DBCheckJob.id, String),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def _update_leased(self, token: str, *conditions, **values) -> int:
+        try:
+            result = self.session.execute(
+                update(DBCheckJob)
+                .where(DBCheckJob.lease_token == token, DBCheckJob.status == RUNNING, *conditions)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return result.rowcount
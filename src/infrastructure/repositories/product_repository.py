@@ -1,18 +1,63 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
-from sqlalchemy import desc
+from sqlalchemy import Float, String, bindparam, column, delete, desc, func, insert, select, tuple_, update, values
 from sqlalchemy.orm import Session
-from sqlalchemy.inspection import inspect
-from src.domain.models import Product, ProductCreate, PriceHistory, PriceHistoryCreate
+from src.config import settings
+from src.domain.models import (
+    Product,
+    ProductCreate,
+    PriceHistory,
+    PriceHistoryCreate,
+    PriceRollup,
+    PriceStats,
+    SweepProduct,
+)
 from .base import BaseRepository
-from ..database.models import Product as DBProduct, PriceHistory as DBPriceHistory
-import pandas as pd
+from ..database.dialects import dialect_insert, least_greatest
+from ..database.models import (
+    DailyPriceRollup as DBDailyPriceRollup,
+    HourlyPriceRollup as DBHourlyPriceRollup,
+    PriceHistory as DBPriceHistory,
+    PriceStats as DBPriceStats,
+    Product as DBProduct,
+)
+from ..database.partitions import drop_partitions_before, ensure_partitions, is_partitioned
+from ..database.rollups import day_bucket, merge_rollups, rebuild_price_stats, rebuild_rollups
+from ..metrics import metrics
+
+# Column order of exported price history
+PRICE_HISTORY_EXPORT_COLUMNS = [
+    "id",
+    "product_url",
+    "price",
+    "timestamp",
+    "product_name",
+    "cabin_type",
+    "is_lowest",
+]
+
+# Granularities of `get_price_history`
+RAW = "raw"
+HOURLY = "hourly"
+DAILY = "daily"
+ROLLUP_MODELS = {HOURLY: DBHourlyPriceRollup, DAILY: DBDailyPriceRollup}
+
 
 class ProductRepository(BaseRepository[Product]):
+    # Bumped on every commit made through any repository in this process, so
+    # read caches can tell when their data went stale
+    write_generation = 0
+
     def __init__(self, session: Session):
         self.session = session
 
+    @metrics.timed("repository.commit")
+    def _commit(self) -> None:
+        self.session.commit()
+        ProductRepository.write_generation += 1
+
+    @metrics.timed("repository.to_domain")
     def _to_domain(self, db_product: DBProduct) -> Product:
         """Convert DB model to domain model"""
         return Product.model_validate(db_product)
@@ -29,31 +74,129 @@ class ProductRepository(BaseRepository[Product]):
             prompt=product.prompt,  # Include the prompt field
         )
 
+    @metrics.timed("repository.add")
     def add(self, product: ProductCreate) -> Product:
         """Add a new product"""
         db_product = self._to_db(product)
         self.session.add(db_product)
-        self.session.commit()
+        self._commit()
         return self._to_domain(db_product)
 
+    @metrics.timed("repository.add_many")
+    def add_many(self, products: List[ProductCreate]) -> int:
+        """Insert products and their initial price history in one transaction.
+
+        Products already in the database (e.g. added concurrently) keep their
+        details; the price seen is still recorded in their history. Returns
+        the number of products given.
+        """
+        if not products:
+            return 0
+        product_rows = [
+            {
+                "url": product.url,
+                "name": product.name,
+                "price": product.price,
+                "currency": product.currency,
+                "main_image_url": product.main_image_url,
+                "check_date": product.check_date,
+                "prompt": product.prompt,
+            }
+            for product in products
+        ]
+        timestamp = datetime.utcnow()
+        history_rows = [
+            {
+                "product_url": product.url,
+                "price": product.price,
+                "product_name": product.name,
+                "cabin_type": None,
+                "is_lowest": False,
+                "timestamp": timestamp,
+            }
+            for product in products
+        ]
+        dialect_name = self.session.get_bind().dialect.name
+        try:
+            self.session.execute(
+                dialect_insert(dialect_name, DBProduct.__table__).on_conflict_do_nothing(
+                    index_elements=["url"]
+                ),
+                product_rows,
+            )
+            self._insert_history_rows(history_rows)
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return len(products)
+
+    @metrics.timed("repository.existing_urls")
+    def existing_urls(self, urls: Sequence[str]) -> Set[str]:
+        """Which of these URLs are tracked already, in one query"""
+        if not urls:
+            return set()
+        return set(self.session.scalars(select(DBProduct.url).where(DBProduct.url.in_(urls))))
+
+    @metrics.timed("repository.get")
     def get(self, id: str) -> Optional[Product]:
         """Get a product by URL (our ID)"""
         db_product = self.session.query(DBProduct).filter_by(url=id).first()
         return self._to_domain(db_product) if db_product else None
 
+    @metrics.timed("repository.get_all")
     def get_all(self) -> List[Product]:
         """Get all products"""
         db_products = self.session.query(DBProduct).all()
         return [self._to_domain(p) for p in db_products]
 
+    @metrics.timed("repository.get_many")
+    def get_many(self, urls: List[str]) -> List[Product]:
+        """Get the products with these URLs in one query"""
+        if not urls:
+            return []
+        return [
+            self._to_domain(p)
+            for p in self.session.query(DBProduct).filter(DBProduct.url.in_(urls)).all()
+        ]
+
+    @metrics.timed("repository.get_sweep_products")
+    def get_sweep_products(self, urls: Optional[Sequence[str]] = None) -> List[SweepProduct]:
+        """Products to check, with their lowest price and last check time.
+
+        One Core SELECT of products joined with their stats, read straight into
+        slotted dataclasses: no ORM identity map and no pydantic validation.
+        Only the products with these `urls`, if given.
+        """
+        query = select(
+            DBProduct.url,
+            DBProduct.name,
+            DBProduct.price,
+            DBProduct.currency,
+            DBProduct.main_image_url,
+            DBProduct.prompt,
+            DBPriceStats.min_price,
+            DBPriceStats.last_timestamp,
+        ).outerjoin(DBPriceStats, DBPriceStats.product_url == DBProduct.url)
+        if urls is not None:
+            if not urls:
+                return []
+            query = query.where(DBProduct.url.in_(urls))
+        return [SweepProduct(*row) for row in self.session.execute(query)]
+
+    @metrics.timed("repository.delete")
     def delete(self, id: str) -> None:
         """Delete a product and its price history"""
         product = self.session.query(DBProduct).filter_by(url=id).first()
         if product:
             self.session.query(DBPriceHistory).filter_by(product_url=id).delete()
+            self.session.query(DBPriceStats).filter_by(product_url=id).delete()
+            for model in ROLLUP_MODELS.values():
+                self.session.query(model).filter_by(product_url=id).delete()
             self.session.delete(product)
-            self.session.commit()
+            self._commit()
 
+    @metrics.timed("repository.to_domain")
     def _to_price_history_domain(
         self, db_price_history: DBPriceHistory
     ) -> PriceHistory:
@@ -69,45 +212,389 @@ class ProductRepository(BaseRepository[Product]):
             cabin_type=price_history.cabin_type,  # Include cabin_type if applicable
             is_lowest=price_history.is_lowest,  # Include is_lowest if applicable
         )
-    def get_csv_prices(self,product_url):
-        """Convert Price history to csv file"""
+    def iter_price_history_rows(
+        self,
+        product_url: Optional[str] = None,
+        chunk_size: int = 1000,
+        columns: Sequence[str] = PRICE_HISTORY_EXPORT_COLUMNS,
+    ) -> Iterator[list]:
+        """Stream price history rows in chunks from a server-side cursor.
 
-        db_histories = (
-            self.session.query(DBPriceHistory)
-            .filter_by(product_url=product_url)
-            .order_by(DBPriceHistory.timestamp.asc())
-            .all()
+        Rows are plain tuples of `columns`, ordered by product and time.
+        Without a `product_url` the history of all products is streamed.
+        """
+        table = DBPriceHistory.__table__
+        stmt = select(*(table.c[name] for name in columns))
+        if product_url is not None:
+            stmt = stmt.where(table.c.product_url == product_url)
+        stmt = stmt.order_by(table.c.product_url, table.c.timestamp, table.c.id)
+        result = self.session.execute(
+            stmt, execution_options={"stream_results": True, "yield_per": chunk_size}
+        )
+        try:
+            for rows in result.partitions():
+                yield rows
+        finally:
+            result.close()
+
+    @metrics.timed("repository.get_recent_price_history")
+    def get_recent_price_history(
+        self, points_per_product: Optional[int] = None, since: Optional[datetime] = None
+    ) -> List[tuple]:
+        """Get the latest price history of all products in one query.
+
+        Keeps at most `points_per_product` newest entries per product and/or
+        those from `since` on. Rows are (product_url, timestamp, price,
+        cabin_type) tuples ordered by product and time.
+        """
+        table = DBPriceHistory.__table__
+        ranked = select(
+            table.c.id,
+            table.c.product_url,
+            table.c.timestamp,
+            table.c.price,
+            table.c.cabin_type,
+            func.row_number()
+            .over(
+                partition_by=table.c.product_url,
+                order_by=(table.c.timestamp.desc(), table.c.id.desc()),
+            )
+            .label("position"),
+        )
+        if since is not None:
+            ranked = ranked.where(table.c.timestamp >= since)
+        ranked = ranked.subquery()
+
+        stmt = select(
+            ranked.c.product_url, ranked.c.timestamp, ranked.c.price, ranked.c.cabin_type
+        )
+        if points_per_product is not None:
+            stmt = stmt.where(ranked.c.position <= points_per_product)
+        stmt = stmt.order_by(ranked.c.product_url, ranked.c.timestamp, ranked.c.id)
+        return [tuple(row) for row in self.session.execute(stmt)]
+
+    @metrics.timed("repository.get_price_history")
+    def get_price_history(
+        self,
+        product_url: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        granularity: Optional[str] = None,
+    ) -> List[Union[PriceHistory, PriceRollup]]:
+        """Get price history for a product between `start` and `end`.
+
+        Short ranges return raw entries, longer ones hourly or daily rollups
+        (see `pick_granularity`) unless a `granularity` is given. Rollups read
+        like entries: their `price` is the bucket's closing price.
+        """
+        granularity = granularity or self.pick_granularity(product_url, start, end)
+        if granularity == RAW:
+            return self.get_price_history_range(product_url, start, end)
+
+        model = ROLLUP_MODELS[granularity]
+        query = self.session.query(model).filter(model.product_url == product_url)
+        if start is not None:
+            query = query.filter(model.bucket_start >= start)
+        if end is not None:
+            query = query.filter(model.bucket_start < end)
+        return [PriceRollup.model_validate(r) for r in query.order_by(model.bucket_start).all()]
+
+    def pick_granularity(
+        self,
+        product_url: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> str:
+        """The finest granularity that is still stored for the range and not too dense"""
+        now = datetime.utcnow()
+        end = end or now
+        if start is None:
+            start = self._first_timestamp(product_url) or end
+        span = end - start
+
+        tiers = [
+            (RAW, settings.HISTORY_RAW_MAX_DAYS, settings.PRICE_HISTORY_RETENTION_DAYS),
+            (HOURLY, settings.HISTORY_HOURLY_MAX_DAYS, settings.HOURLY_ROLLUP_RETENTION_DAYS),
+        ]
+        for granularity, max_days, retention_days in tiers:
+            # A retention of 0 keeps the tier forever
+            kept_from = now - timedelta(days=retention_days) if retention_days else None
+            if span <= timedelta(days=max_days) and (kept_from is None or start >= kept_from):
+                return granularity
+        return DAILY
+
+    def _first_timestamp(self, product_url: str) -> Optional[datetime]:
+        # Compacted history only survives in the rollups
+        first_raw = self.session.scalar(
+            select(func.min(DBPriceHistory.timestamp)).where(
+                DBPriceHistory.product_url == product_url
+            )
         )
-    
-        # Convert the list of SQLAlchemy objects to a list of dictionaries.
-        # This assumes your DBPriceHistory model has a to_dict() method.
-        histories = [self.model_to_dict(history) for history in db_histories]
-        df = pd.DataFrame(histories)
-        csv_data = df.to_csv(index=False)
-        return csv_data
-    
-    def model_to_dict(self,instance):
-       """Convert a SQLAlchemy model instance into a dictionary."""
-       return {c.key: getattr(instance, c.key) for c in inspect(instance).mapper.column_attrs}
-    
-
-    def get_price_history(self, product_url: str) -> List[PriceHistory]:
-        """Get price history for a product"""
+        first_daily = self.session.scalar(
+            select(func.min(DBDailyPriceRollup.bucket_start)).where(
+                DBDailyPriceRollup.product_url == product_url
+            )
+        )
+        return min((t for t in (first_raw, first_daily) if t is not None), default=None)
+
+    @metrics.timed("repository.get_price_history_page")
+    def get_price_history_page(
+        self,
+        product_url: str,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 500,
+    ) -> List[PriceHistory]:
+        """Get one page of price history in time order.
+
+        `after` is the (timestamp, id) of the last entry of the previous page;
+        the id breaks ties between entries written in the same sweep.
+        """
+        query = self.session.query(DBPriceHistory).filter(
+            DBPriceHistory.product_url == product_url
+        )
+        if after is not None:
+            query = query.filter(
+                tuple_(DBPriceHistory.timestamp, DBPriceHistory.id) > tuple_(*after)
+            )
         db_histories = (
-            self.session.query(DBPriceHistory)
-            .filter_by(product_url=product_url)
-            .order_by(DBPriceHistory.timestamp.asc())
+            query.order_by(DBPriceHistory.timestamp.asc(), DBPriceHistory.id.asc())
+            .limit(limit)
             .all()
         )
         return [self._to_price_history_domain(h) for h in db_histories]
 
+    @metrics.timed("repository.get_price_history_range")
+    def get_price_history_range(
+        self,
+        product_url: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[PriceHistory]:
+        """Get price history between `start` (inclusive) and `end` (exclusive)"""
+        query = self.session.query(DBPriceHistory).filter(
+            DBPriceHistory.product_url == product_url
+        )
+        if start is not None:
+            query = query.filter(DBPriceHistory.timestamp >= start)
+        if end is not None:
+            query = query.filter(DBPriceHistory.timestamp < end)
+        query = query.order_by(DBPriceHistory.timestamp.asc(), DBPriceHistory.id.asc())
+        if limit is not None:
+            query = query.limit(limit)
+        return [self._to_price_history_domain(h) for h in query.all()]
+
+    @metrics.timed("repository.add_price_history")
     def add_price_history(self, price_history: PriceHistoryCreate) -> PriceHistory:
         """Add a new price history entry"""
         db_price_history = self._to_price_history_db(price_history)
+        db_price_history.timestamp = datetime.utcnow()
         self.session.add(db_price_history)
-        self.session.commit()
+        history_rows = [
+            {"product_url": db_price_history.product_url, "price": db_price_history.price, "timestamp": db_price_history.timestamp}
+        ]
+        self._upsert_price_stats(history_rows)
+        merge_rollups(self.session.connection(), history_rows)
+        self._commit()
         return self._to_price_history_domain(db_price_history)
 
+    @metrics.timed("repository.get_price_stats")
+    def get_price_stats(self, product_url: str) -> Optional[PriceStats]:
+        """Get the running price aggregates of a product"""
+        db_stats = self.session.get(DBPriceStats, product_url)
+        return PriceStats.model_validate(db_stats) if db_stats else None
+
+    @metrics.timed("repository.get_history_version")
+    def get_history_version(self) -> Tuple:
+        """Fingerprint of price_history that changes whenever rows are added or removed.
+
+        New rows raise the highest id; deletes, including compaction, lower
+        the row count.
+        """
+        return tuple(
+            self.session.execute(
+                select(func.max(DBPriceHistory.id), func.count(DBPriceHistory.id))
+            ).one()
+        )
+
+    @metrics.timed("repository.get_all_price_stats")
+    def get_all_price_stats(self) -> Dict[str, PriceStats]:
+        """Get the running price aggregates of all products, keyed by URL"""
+        return {
+            db_stats.product_url: PriceStats.model_validate(db_stats)
+            for db_stats in self.session.query(DBPriceStats).all()
+        }
+
+    def _upsert_price_stats(self, history_rows: List[dict]) -> None:
+        """Fold new price history rows into the running aggregates.
+
+        Rows are pre-aggregated per product so a batch becomes one executemany
+        INSERT ... ON CONFLICT DO UPDATE, run in the caller's transaction.
+        """
+        batch_stats: Dict[str, dict] = {}
+        for row in history_rows:
+            stats = batch_stats.get(row["product_url"])
+            if stats is None:
+                batch_stats[row["product_url"]] = {
+                    "product_url": row["product_url"],
+                    "min_price": row["price"],
+                    "max_price": row["price"],
+                    "last_price": row["price"],
+                    "price_count": 1,
+                    "last_timestamp": row["timestamp"],
+                }
+                continue
+            stats["min_price"] = min(stats["min_price"], row["price"])
+            stats["max_price"] = max(stats["max_price"], row["price"])
+            stats["last_price"] = row["price"]
+            stats["price_count"] += 1
+            stats["last_timestamp"] = row["timestamp"]
+
+        dialect_name = self.session.get_bind().dialect.name
+        stmt = dialect_insert(dialect_name, DBPriceStats)
+        least, greatest = least_greatest(dialect_name)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DBPriceStats.product_url],
+            set_={
+                "min_price": least(DBPriceStats.min_price, stmt.excluded.min_price),
+                "max_price": greatest(DBPriceStats.max_price, stmt.excluded.max_price),
+                "last_price": stmt.excluded.last_price,
+                "price_count": DBPriceStats.price_count + stmt.excluded.price_count,
+                "last_timestamp": stmt.excluded.last_timestamp,
+            },
+        )
+        self.session.execute(stmt, list(batch_stats.values()))
+
+    @metrics.timed("repository.backfill_price_stats")
+    def backfill_price_stats(self) -> int:
+        """Rebuild the running aggregates of all products from the daily rollups.
+
+        The rollups also cover history that was compacted away from
+        price_history; run `rebuild_rollups` first if they may be stale.
+        """
+        try:
+            count = rebuild_price_stats(self.session.connection())
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return count
+
+    @metrics.timed("repository.rebuild_rollups")
+    def rebuild_rollups(self) -> int:
+        """Recompute the hourly and daily rollups from the stored raw history"""
+        try:
+            count = rebuild_rollups(self.session.connection())
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return count
+
+    @metrics.timed("repository.compact_price_history")
+    def compact_price_history(self, older_than: datetime) -> int:
+        """Fold raw entries older than `older_than` into the rollups and delete them.
+
+        The cutoff is rounded down to midnight so no rollup bucket is split.
+        On Postgres whole monthly partitions are dropped instead of deleted
+        row by row. Returns the number of raw entries removed.
+        """
+        cutoff = day_bucket(older_than)
+        try:
+            connection = self.session.connection()
+            # Rollups are kept up to date on write; rebuilding them from the
+            # rows about to go makes compaction safe on older databases too
+            rebuild_rollups(connection, before=cutoff)
+            removed = 0
+            if is_partitioned(connection):
+                removed += drop_partitions_before(connection, cutoff)
+                ensure_partitions(connection)
+            removed += self.session.execute(
+                delete(DBPriceHistory).where(DBPriceHistory.timestamp < cutoff)
+            ).rowcount
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return removed
+
+    @metrics.timed("repository.expire_hourly_rollups")
+    def expire_hourly_rollups(self, older_than: datetime) -> int:
+        """Delete hourly rollups older than `older_than`; daily rollups are kept"""
+        try:
+            removed = self.session.execute(
+                delete(DBHourlyPriceRollup).where(
+                    DBHourlyPriceRollup.bucket_start < day_bucket(older_than)
+                )
+            ).rowcount
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return removed
+
+    @metrics.timed("repository.apply_price_updates")
+    def apply_price_updates(self, batch: List[PriceHistoryCreate]) -> int:
+        """Insert price history rows and update product prices in one transaction"""
+        if not batch:
+            return 0
+
+        timestamp = datetime.utcnow()
+        history_rows = [
+            {
+                "product_url": price_history.product_url,
+                "price": price_history.price,
+                "product_name": price_history.product_name,
+                "cabin_type": price_history.cabin_type,
+                "is_lowest": price_history.is_lowest,
+                "timestamp": timestamp,
+            }
+            for price_history in batch
+        ]
+        # The last entry of a product wins if it appears more than once
+        latest_prices = {ph.product_url: ph.price for ph in batch}
+
+        try:
+            self._insert_history_rows(history_rows)
+            self._bulk_update_prices(latest_prices, datetime.now().isoformat())
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return len(batch)
+
+    def _insert_history_rows(self, history_rows: List[dict]) -> None:
+        """Insert price history rows and fold them into the stats and rollups"""
+        self.session.execute(insert(DBPriceHistory), history_rows)
+        self._upsert_price_stats(history_rows)
+        merge_rollups(self.session.connection(), history_rows)
+
+    def _bulk_update_prices(self, latest_prices: dict, check_date: str) -> None:
+        """Update the price of many products with as few statements as possible"""
+        if self.session.get_bind().dialect.name == "postgresql":
+            # A single UPDATE ... FROM (VALUES ...) round trip
+            new_prices = values(
+                column("url", String), column("price", Float), name="new_prices"
+            ).data(list(latest_prices.items()))
+            self.session.execute(
+                update(DBProduct)
+                .where(DBProduct.url == new_prices.c.url)
+                .values(price=new_prices.c.price, check_date=check_date)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            # SQLite has no VALUES aliases in UPDATE ... FROM, use a Core
+            # executemany UPDATE instead. Unlike the ORM bulk update by
+            # primary key it skips products deleted mid-sweep, as above.
+            products = DBProduct.__table__
+            self.session.execute(
+                update(products)
+                .where(products.c.url == bindparam("b_url"))
+                .values(price=bindparam("b_price"), check_date=check_date),
+                [{"b_url": url, "b_price": price} for url, price in latest_prices.items()],
+            )
+
+    @metrics.timed("repository.update")
     def update(self, product: Product) -> Product:
         """Update a product in the database"""
         db_product = (
@@ -120,6 +607,6 @@ class ProductRepository(BaseRepository[Product]):
             db_product.main_image_url = product.main_image_url
             db_product.check_date = datetime.now().isoformat()
             db_product.prompt = product.prompt  # Update the prompt field
-            self.session.commit()
+            self._commit()
             return product
         raise ValueError(f"Product with URL {product.url} not found")
\ No newline at end of file
@@ -3,8 +3,15 @@ import sys
 
 import streamlit as st
 
-from src.infrastructure.database import get_session
-from src.infrastructure.repositories.product_repository import ProductRepository
+from src.presentation.cache import (
+    get_background_jobs,
+    get_dashboard_data,
+    get_price_summary,
+    get_services,
+    release_session,
+    start_metrics_server,
+)
+from src.presentation.components.job_status import JobStatus
 from src.presentation.components.product_list import ProductList
 from src.presentation.components.sidebar import Sidebar
 from src.services.price_service import PriceService
@@ -12,12 +19,8 @@ from src.services.product_service import ProductService
 
 
 def init_services():
-    """Initialize services with dependencies"""
-    session = next(get_session())
-    repository = ProductRepository(session)
-    product_service = ProductService(repository)
-    price_service = PriceService(repository)
-    return product_service, price_service
+    """Initialize services with dependencies, reused across reruns"""
+    return get_services()
 
 
 def render_dashboard(product_service: ProductService, price_service: PriceService):
@@ -32,18 +35,19 @@ def render_dashboard(product_service: ProductService, price_service: PriceServic
     # Render sidebar
     sidebar = Sidebar(product_service,price_service)
     sidebar.render()
+    JobStatus(get_background_jobs()).render()
 
     # Main content
     st.header("Tracked Products")
     st.markdown("---")
 
-    products = product_service.repository.get_all()
+    data = get_dashboard_data()
 
-    if not products:
+    if not data.products:
         st.info("No products are being tracked. Add some using the sidebar!")
     else:
         product_list = ProductList(product_service,price_service)
-        product_list.render(products)
+        product_list.render(data, get_price_summary())
 
 
 def main():
@@ -55,9 +59,13 @@ def main():
 
     # Initialize services
     product_service, price_service = init_services()
+    start_metrics_server()
 
     # Render dashboard
-    render_dashboard(product_service, price_service)
+    try:
+        render_dashboard(product_service, price_service)
+    finally:
+        release_session()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class BackgroundJob:
+    """A UI action running off the script thread"""
+
+    id: str
+    key: str  # Jobs with the same key don't run twice at once
+    label: str
+    status: str = RUNNING
+    message: Optional[str] = None
+    started_at: float = 0.0
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != RUNNING
+
+
+class BackgroundJobs:
+    """Runs slow UI actions in a thread pool and tracks them by job ID.
+
+    A job's function returns the message to show when it is done; raising
+    marks the job failed with the error as message. `thread_cleanup` runs in
+    the worker thread after every job, e.g. to release its database session.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        thread_cleanup: Optional[Callable[[], None]] = None,
+        keep_finished: int = 100,
+    ):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ui-job")
+        self._thread_cleanup = thread_cleanup
+        self._keep_finished = keep_finished
+        self._jobs: Dict[str, BackgroundJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, label: str, fn: Callable[..., Any], *args) -> str:
+        """Start `fn(*args)` unless a job with this key is running; returns the job ID"""
+        with self._lock:
+            running = self._running_with_key(key)
+            if running is not None:
+                return running.id
+            job = BackgroundJob(id=uuid.uuid4().hex, key=key, label=label, started_at=time.time())
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[BackgroundJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def is_running(self, key: str) -> bool:
+        with self._lock:
+            return self._running_with_key(key) is not None
+
+    def forget(self, job_ids: List[str]) -> None:
+        """Drop finished jobs once their result was shown"""
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is not None and job.finished:
+                    del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _running_with_key(self, key: str) -> Optional[BackgroundJob]:
+        for job in self._jobs.values():
+            if job.key == key and not job.finished:
+                return job
+        return None
+
+    def _run(self, job: BackgroundJob, fn: Callable[..., Any], args: tuple) -> None:
+        try:
+            message, status = fn(*args), DONE
+        except Exception as e:
+            message, status = str(e), FAILED
+        finally:
+            if self._thread_cleanup is not None:
+                self._thread_cleanup()
+        with self._lock:
+            job.message = message
+            job.status = status
+            job.finished_at = time.time()
+            self._prune()
+
+    def _prune(self) -> None:
+        # Results nobody came back for are dropped, oldest first
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at
+        )
+        for job in finished[: max(0, len(finished) - self._keep_finished)]:
+            del self._jobs[job.id]
@@ -0,0 +1,121 @@
+import os
+from typing import Tuple
+
+import pandas as pd
+import streamlit as st
+from apscheduler.schedulers.background import BackgroundScheduler
+from firecrawl import FirecrawlApp
+from sqlalchemy.orm import scoped_session
+
+from src.config import settings
+from src.infrastructure.database import SessionLocal, init_db
+from src.infrastructure.metrics import serve_metrics
+from src.infrastructure.repositories.job_repository import JobRepository
+from src.infrastructure.repositories.product_repository import ProductRepository
+from src.presentation.background import BackgroundJobs
+from src.presentation.data_loader import (
+    DEFAULT_POINTS_PER_PRODUCT,
+    DashboardData,
+    fetch_dashboard_data,
+)
+from src.services.analytics import get_price_analytics
+from src.services.local_extractor import LocalExtractor
+from src.services.price_service import PriceService
+from src.services.product_service import ProductService
+
+
+@st.cache_resource
+def get_firecrawl() -> FirecrawlApp:
+    """One Firecrawl client for the whole server.
+
+    Only saves constructing a client per rerun: FirecrawlApp sends every
+    request through module-level `requests` calls, so no HTTP connections
+    are kept alive between them.
+    """
+    return FirecrawlApp(api_key=os.getenv("FIRECRAWL_API_KEY"))
+
+
+@st.cache_resource
+def get_services() -> Tuple[ProductService, PriceService]:
+    """Services shared by all reruns and browser sessions.
+
+    The repository sits on a thread-local scoped session, so concurrent
+    reruns (and the background scheduler) never share a Session.
+    """
+    init_db()
+    repository = ProductRepository(scoped_session(SessionLocal))
+    firecrawl = get_firecrawl()
+    local_extractor = LocalExtractor.from_settings(settings)
+    return (
+        ProductService(repository, firecrawl, local_extractor),
+        PriceService(repository, firecrawl),
+    )
+
+
+@st.cache_resource
+def get_job_repository() -> JobRepository:
+    """The check job queue, on its own thread-local session"""
+    init_db()
+    return JobRepository(scoped_session(SessionLocal))
+
+
+@st.cache_resource
+def get_scheduler() -> BackgroundScheduler:
+    """One scheduler per server, however many browser sessions are open"""
+    scheduler = BackgroundScheduler()
+    scheduler.start()
+    return scheduler
+
+
+@st.cache_resource
+def start_metrics_server():
+    """Serve per-stage timings once per server if METRICS_PORT is set"""
+    if settings.METRICS_PORT:
+        return serve_metrics(settings.METRICS_PORT)
+    return None
+
+
+@st.cache_resource
+def get_background_jobs() -> BackgroundJobs:
+    """Thread pool for slow UI actions, shared by all browser sessions"""
+    product_service, _ = get_services()
+    # Each job thread returns its scoped session to the pool when done
+    return BackgroundJobs(
+        settings.UI_BACKGROUND_WORKERS, thread_cleanup=product_service.repository.session.remove
+    )
+
+
+def release_session() -> None:
+    """Give this thread's connection back to the pool at the end of a rerun"""
+    product_service, _ = get_services()
+    product_service.repository.session.remove()
+
+
+@st.cache_data(ttl=settings.DASHBOARD_CACHE_TTL, show_spinner=False)
+def _load_dashboard_data(generation: int, points_per_product: int) -> DashboardData:
+    # `generation` is only part of the cache key: a write in this process
+    # makes the next rerun miss, the TTL catches writes from other processes
+    product_service, _ = get_services()
+    return fetch_dashboard_data(product_service.repository, points_per_product)
+
+
+def get_dashboard_data(points_per_product: int = DEFAULT_POINTS_PER_PRODUCT) -> DashboardData:
+    """Dashboard data, served from the cache unless something was written"""
+    return _load_dashboard_data(ProductRepository.write_generation, points_per_product)
+
+
+@st.cache_data(ttl=settings.DASHBOARD_CACHE_TTL, show_spinner=False)
+def _load_price_summary(generation: int) -> pd.DataFrame:
+    product_service, _ = get_services()
+    return get_price_analytics(product_service.repository).summary
+
+
+def get_price_summary() -> pd.DataFrame:
+    """Per-product analytics over the full history, indexed by product URL"""
+    return _load_price_summary(ProductRepository.write_generation)
+
+
+def invalidate_read_caches() -> None:
+    """Drop all cached reads after a write"""
+    _load_dashboard_data.clear()
+    _load_price_summary.clear()
@@ -0,0 +1,65 @@
+import streamlit as st
+
+from src.config import settings
+from src.presentation.background import FAILED, BackgroundJobs
+from src.presentation.cache import invalidate_read_caches
+
+
+class JobStatus:
+    """Progress of the background actions started from this browser session"""
+
+    def __init__(self, jobs: BackgroundJobs):
+        self.jobs = jobs
+
+    @staticmethod
+    def track(job_id: str) -> None:
+        """Show a submitted job's progress in this session"""
+        job_ids = st.session_state.setdefault("background_jobs", [])
+        if job_id not in job_ids:
+            job_ids.append(job_id)
+
+    def render(self):
+        if not st.session_state.get("background_jobs"):
+            return
+        running = any(
+            job is not None and not job.finished
+            for job in map(self.jobs.get, st.session_state.background_jobs)
+        )
+        # Poll only while something is running; the rest of the page stays idle
+        poll = settings.UI_JOB_POLL_SECONDS if running else None
+        with st.sidebar:
+            st.fragment(run_every=poll)(self._render_jobs)()
+
+    def _render_jobs(self):
+        st.header("Background Jobs")
+        seen = st.session_state.setdefault("seen_background_jobs", set())
+        job_ids = st.session_state.background_jobs
+        newly_finished = False
+
+        for job_id in list(job_ids):
+            job = self.jobs.get(job_id)
+            if job is None:
+                job_ids.remove(job_id)
+                continue
+            if not job.finished:
+                st.info(f"⏳ {job.label}…")
+                continue
+            if job_id not in seen:
+                seen.add(job_id)
+                newly_finished = True
+            if job.status == FAILED:
+                st.error(f"{job.label}: {job.message}")
+            else:
+                st.success(f"{job.label}: {job.message}")
+
+        if st.button("Clear finished jobs"):
+            finished = [job_id for job_id in job_ids if job_id in seen]
+            self.jobs.forget(finished)
+            st.session_state.background_jobs = [i for i in job_ids if i not in seen]
+            seen.difference_update(finished)
+            st.rerun(scope="app")
+
+        if newly_finished:
+            # Redraw the dashboard with what the jobs wrote
+            invalidate_read_caches()
+            st.rerun(scope="app")
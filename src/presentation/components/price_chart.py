@@ -1,18 +1,41 @@
 import plotly.express as px
 
+from src.presentation.downsampling import DEFAULT_RESOLUTIONS, downsample, resolution_for_span
+
 
 class PriceChart:
-    def create(self, price_history, cabin_type=None):
+    def __init__(self, resolutions=None, method="lttb"):
+        """
+        Args:
+            resolutions (list, optional): (max time span, points) pairs picking how
+                many points to draw for a series. Defaults to DEFAULT_RESOLUTIONS.
+            method (str): Downsampling method, "lttb" or "minmax".
+        """
+        self.resolutions = resolutions or DEFAULT_RESOLUTIONS
+        self.method = method
+
+    def create(self, price_history, cabin_type=None, max_points=None):
         """
         Create a price history chart with the lowest price highlighted.
 
         Args:
-            price_history (pd.DataFrame): Price history data.
+            price_history (pd.DataFrame): Price history data, sorted by timestamp.
             cabin_type (str, optional): Type of cabin (e.g., Economy, Business). Defaults to None.
+            max_points (int, optional): Points to draw. Defaults to the resolution for the
+                time span of the data.
         """
-        # Find the lowest price
-        lowest_price = price_history["price"].min()
-        lowest_timestamp = price_history.loc[price_history["price"].idxmin(), "timestamp"]
+        # Find the lowest price on the full series
+        lowest_position = int(price_history["price"].to_numpy().argmin())
+        lowest_price = price_history["price"].iloc[lowest_position]
+        lowest_timestamp = price_history["timestamp"].iloc[lowest_position]
+
+        # Draw a reduced series that still contains the lowest point
+        if max_points is None:
+            span = price_history["timestamp"].iloc[-1] - price_history["timestamp"].iloc[0]
+            max_points = resolution_for_span(span, self.resolutions)
+        price_history = downsample(
+            price_history, max_points, method=self.method, keep_index=lowest_position
+        )
 
         # Create the line chart
         fig = px.line(price_history, x="timestamp", y="price", title=None)
@@ -41,4 +64,4 @@ class PriceChart:
         if cabin_type:
             fig.update_layout(title=f"Cabin Type: {cabin_type}")
 
-        return fig
\ No newline at end of file
+        return fig
@@ -1,7 +1,9 @@
-import pandas as pd
 import streamlit as st
-from sqlalchemy import desc
 
+from src.presentation.cache import get_background_jobs, invalidate_read_caches
+from src.presentation.components.job_status import JobStatus
+from src.presentation.data_loader import DashboardData
+from src.services.analytics import DEFAULT_LOW_DAYS
 from src.services.product_service import ProductService
 from src.services.price_service import PriceService
 from .price_chart import PriceChart
@@ -12,9 +14,15 @@ class ProductList:
         self.product_service = product_service
         self.priceService=priceService
         self.price_chart = PriceChart()
+        self.jobs = get_background_jobs()
 
-    def render(self, products):
-        for product in products:
+    def scrape(self, product) -> str:
+        """Background job refreshing one product's price"""
+        product = self.priceService.update_price(product)
+        return f"New price ${product.price:.2f}"
+
+    def render(self, data: DashboardData, summary=None):
+        for product in data.products:
             with st.container():
                 st.markdown(f"#### {product.name}")
                 col1, col2, col3 = st.columns([1, 3, 3])    
@@ -24,50 +32,66 @@ class ProductList:
                 except Exception as e:
                     col1.error("Image could not be loaded for this product.")
 
-                # Get price history
-                price_history = self.product_service.repository.get_price_history(
-                    product.url
-                )
-
-                if price_history:
-                    # Convert to DataFrame for plotting
-                    df = pd.DataFrame(
-                        [
-                            {"timestamp": ph.timestamp, "price": ph.price}
-                            for ph in price_history
-                        ]
-                    )
+                # Recent price history, already loaded for all products
+                df = data.history.get(product.url)
 
-                    # Find the lowest price and cabin type
-                    lowest_price = df["price"].min()
-                    cabin_type = price_history[-1].cabin_type if hasattr(price_history[-1], "cabin_type") else "N/A"
+                if df is not None and not df.empty:
+                    # Find the cabin type
+                    cabin_type = df["cabin_type"].iloc[-1]
 
                     # Create and display chart
                     fig = self.price_chart.create(df, cabin_type=cabin_type)
                     col2.plotly_chart(fig, use_container_width=True)
 
-                    # Show current price and lowest price
-                    latest_price = price_history[-1].price
-                    col3.metric("Current Price", f"${latest_price:.2f}", delta=None)
-                    col3.metric("Lowest Price", f"${lowest_price:.2f}", delta=None)
+                    # Show current price and lowest price from the running stats
+                    stats = data.stats.get(product.url)
+                    if stats:
+                        col3.metric("Current Price", f"${stats.last_price:.2f}", delta=None)
+                        col3.metric("Lowest Price", f"${stats.min_price:.2f}", delta=None)
+                    if summary is not None and product.url in summary.index:
+                        analytics = summary.loc[product.url]
+                        col3.metric(
+                            "Average Price",
+                            f"${analytics['time_weighted_price']:.2f}",
+                            help="Time-weighted over the full price history",
+                        )
+                        if analytics["at_n_day_low"]:
+                            col3.caption(f"🔻 At its {DEFAULT_LOW_DAYS}-day low")
                 else:
                     col2.info("No price history available")
 
                 # Add visit product button
                 col3.link_button("Visit Product", product.url)
                 
-                if col3.button("Scrape now",key=f"scrape_{product.url}"):
-                    self.priceService.update_price(product)
-                col3.download_button(
+                scrape_key = f"scrape_{product.url}"
+                if col3.button(
+                    "Scrape now", key=scrape_key, disabled=self.jobs.is_running(scrape_key)
+                ):
+                    JobStatus.track(
+                        self.jobs.submit(scrape_key, f"Scraping {product.name}", self.scrape, product)
+                    )
+                    st.rerun()
+
+                # Export only when asked for, not on every rerun
+                export_key = f"csv_{product.url}"
+                if col3.button("Export History", key=f"export_{product.url}"):
+                    st.session_state[export_key] = self.product_service.get_csv_file(product.url)
+                if export_key in st.session_state:
+                    col3.download_button(
                         label="Download History as CSV",
-                        data=self.product_service.get_csv_file(product.url),
+                        data=st.session_state[export_key],
                         file_name=f"{product.name}_history.csv",
-                        mime="text/csv",)
+                        mime="text/csv",
+                        key=f"download_{product.url}",
+                        on_click=st.session_state.pop,
+                        args=(export_key, None),
+                    )
 
                 
 
                 if st.button("Remove from tracking", key=f"remove_{product.url}"):
                     self.product_service.remove_product(product.url)
+                    invalidate_read_caches()
                     st.success("Product removed from tracking!")
                     st.rerun()
             st.markdown("--------")
\ No newline at end of file
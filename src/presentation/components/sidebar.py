@@ -1,8 +1,11 @@
 import streamlit as st
 import asyncio
+from src.config import settings
+from src.presentation.cache import get_background_jobs, get_job_repository, get_scheduler
+from src.presentation.components.job_status import JobStatus
+from src.services.check_worker import CheckWorker, enqueue_checks, enqueue_due_checks
 from src.services.product_service import ProductService
 from src.services.price_service import PriceService
-from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
 import time
 
@@ -10,13 +13,34 @@ class Sidebar:
     def __init__(self, product_service: ProductService,price_service :PriceService):
         self.product_service = product_service
         self.price_service=price_service
-        
+        self.jobs = get_background_jobs()
+
+    def add_product(self, url: str, prompt: str) -> str:
+        """Background job adding a product"""
+        success, message = asyncio.run(
+            self.product_service.add_product(url, prompt)  # Pass the prompt
+        )
+        if not success:
+            raise RuntimeError(message)
+        return message
+
+    def run_scheduled_checks(self, adaptive: bool):
+        """Queue the checks that are due and work through the queue.
+
+        Going through the job queue means other tabs, other app servers and
+        standalone workers (src/worker.py) never scrape the same product twice.
+        """
+        jobs = get_job_repository()
+        if adaptive:
+            enqueue_due_checks(self.price_service, jobs)
+        else:
+            enqueue_checks(
+                self.price_service, jobs, self.price_service.repository.get_sweep_products()
+            )
+        asyncio.run(CheckWorker(self.price_service, jobs).run_until_empty())
 
     def render(self):
-        if 'scheduler' not in st.session_state:
-            st.session_state.scheduler = BackgroundScheduler()
-            st.session_state.scheduler.start()
-            st.session_state.job_id = None
+        scheduler = get_scheduler()
 
         st.sidebar.header("Add New Product")
         new_url = st.sidebar.text_input("Product URL")
@@ -26,34 +50,69 @@ class Sidebar:
         )
 
         if st.sidebar.button("Add Product") and new_url:
-            success, message = asyncio.run(
-                self.product_service.add_product(new_url,prompt)  # Pass the prompt
+            JobStatus.track(
+                self.jobs.submit(
+                    f"add_{new_url}", f"Adding {new_url}", self.add_product, new_url, prompt
+                )
             )
-            if success:
-                st.sidebar.success(message)
-                st.rerun()
+            st.rerun()
+
+        st.sidebar.header("Export Price History")
+        export_format = st.sidebar.selectbox("Format", ["Parquet", "CSV"])
+        if st.sidebar.button("Export All Products"):
+            if export_format == "Parquet":
+                data = self.product_service.get_parquet_file()
             else:
-                st.sidebar.error(message)
+                data = self.product_service.get_csv_file()
+            st.session_state.export_all = (export_format, data)
+        if "export_all" in st.session_state:
+            export_format, data = st.session_state.export_all
+            extension = "parquet" if export_format == "Parquet" else "csv"
+            st.sidebar.download_button(
+                label=f"Download {export_format}",
+                data=data,
+                file_name=f"price_history.{extension}",
+                mime="application/octet-stream" if extension == "parquet" else "text/csv",
+                # Don't keep the whole export in the session once it is downloaded
+                on_click=st.session_state.pop,
+                args=("export_all", None),
+            )
 
-        frequency_days = st.sidebar.number_input("Select scraping frequency (in days):", min_value=1, value=4, step=1)
+        adaptive = st.sidebar.checkbox(
+            "Adaptive scheduling",
+            help="Check volatile products more often within a scrapes-per-hour budget",
+        )
+        if not adaptive:
+            frequency_days = st.sidebar.number_input("Select scraping frequency (in days):", min_value=1, value=4, step=1)
         if st.sidebar.button("Schedule Scraping Job"):
-            # If a job is already scheduled, remove it.
-            if st.session_state.job_id:
-                try:
-                    st.session_state.scheduler.remove_job(st.session_state.job_id)
-                except Exception as e:
-                    st.sidebar.write("Error removing previous job:", e)
-
-            job = st.session_state.scheduler.add_job(
-                self.price_service.check_prices,
-                trigger="interval",
-                days=frequency_days,
-                # Set next_run_time to a few seconds from now to verify it works
-                next_run_time=datetime.now() + timedelta(seconds=5),
-                id=f"scrape_job",
-            )
-            st.session_state.job_id = job.id
-            st.sidebar.write(f"Scraping job scheduled to run every {frequency_days} day(s).")
-        if st.session_state.job_id:
-            job = st.session_state.scheduler.get_job(st.session_state.job_id)
-            st.sidebar.write("Next run time:", job.next_run_time)
\ No newline at end of file
+            # Replace the job if one is already scheduled
+            if adaptive:
+                # Frequent ticks that only scrape the products that are due
+                job = scheduler.add_job(
+                    self.run_scheduled_checks,
+                    args=[True],
+                    trigger="interval",
+                    minutes=settings.SCHEDULER_TICK_MINUTES,
+                    next_run_time=datetime.now() + timedelta(seconds=5),
+                    id="scrape_job",
+                    replace_existing=True,
+                )
+                st.sidebar.write(
+                    f"Adaptive scraping scheduled with a budget of "
+                    f"{settings.CHECK_BUDGET_PER_HOUR:g} scrapes per hour."
+                )
+            else:
+                job = scheduler.add_job(
+                    self.run_scheduled_checks,
+                    args=[False],
+                    trigger="interval",
+                    days=frequency_days,
+                    # Set next_run_time to a few seconds from now to verify it works
+                    next_run_time=datetime.now() + timedelta(seconds=5),
+                    id="scrape_job",
+                    replace_existing=True,
+                )
+                st.sidebar.write(f"Scraping job scheduled to run every {frequency_days} day(s).")
+        job = scheduler.get_job("scrape_job")
+        if job:
+            st.sidebar.write("Next run time:", job.next_run_time)
@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src.domain.models import PriceStats, Product
+from src.infrastructure.repositories.product_repository import ProductRepository
+
+# Points per product shown on the dashboard charts
+DEFAULT_POINTS_PER_PRODUCT = 500
+
+
+@dataclass
+class DashboardData:
+    """Everything the dashboard renders, loaded with a fixed number of queries"""
+
+    products: List[Product]
+    history: Dict[str, pd.DataFrame]
+    stats: Dict[str, PriceStats]
+
+
+def fetch_dashboard_data(
+    repository: ProductRepository,
+    points_per_product: Optional[int] = DEFAULT_POINTS_PER_PRODUCT,
+    since: Optional[datetime] = None,
+) -> DashboardData:
+    """Load products, their recent history and price stats.
+
+    Three queries regardless of the number of products.
+    """
+    return DashboardData(
+        products=repository.get_all(),
+        history=_group_history(
+            repository.get_recent_price_history(points_per_product, since)
+        ),
+        stats=repository.get_all_price_stats(),
+    )
+
+
+def _group_history(rows: List[tuple]) -> Dict[str, pd.DataFrame]:
+    """Split (product_url, timestamp, price, cabin_type) rows into one frame per product"""
+    frame = pd.DataFrame(
+        rows, columns=["product_url", "timestamp", "price", "cabin_type"]
+    )
+    return {
+        url: group.drop(columns="product_url").reset_index(drop=True)
+        for url, group in frame.groupby("product_url", sort=False)
+    }
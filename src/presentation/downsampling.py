@@ -0,0 +1,98 @@
+from datetime import timedelta
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# (largest time span, points to draw); the first matching span wins
+DEFAULT_RESOLUTIONS: List[Tuple[timedelta, int]] = [
+    (timedelta(days=7), 1000),
+    (timedelta(days=90), 600),
+    (timedelta.max, 400),
+]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the shape"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Buckets over the inner points; the first and last points are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1] : edges[i + 2]].mean()
+            next_y = y[edges[i + 1] : edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        # Twice the triangle area between the previous pick, each candidate
+        # and the average of the next bucket
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_buckets(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the minimum and maximum of each of `n_out // 2` buckets"""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = y[start:end]
+        selected.append(start + int(bucket.argmin()))
+        selected.append(start + int(bucket.argmax()))
+    return np.unique(selected)
+
+
+def resolution_for_span(
+    span: timedelta, resolutions: Sequence[Tuple[timedelta, int]] = DEFAULT_RESOLUTIONS
+) -> int:
+    """Number of points to draw for a series covering `span`"""
+    for max_span, points in resolutions:
+        if span <= max_span:
+            return points
+    return resolutions[-1][1]
+
+
+def downsample(
+    price_history: pd.DataFrame,
+    max_points: int,
+    method: str = "lttb",
+    keep_index: Optional[int] = None,
+) -> pd.DataFrame:
+    """Reduce a time-sorted price series to about `max_points` rows.
+
+    The row at position `keep_index` (e.g. the lowest price) is always kept so
+    annotations still point at a real value.
+    """
+    if len(price_history) <= max_points:
+        return price_history
+
+    y = price_history["price"].to_numpy(dtype=np.float64)
+    if method == "lttb":
+        timestamps = pd.to_datetime(price_history["timestamp"]).to_numpy(dtype="int64")
+        # Relative seconds keep the triangle areas well inside float precision
+        x = (timestamps - timestamps[0]) / 1e9
+        selected = lttb(x, y, max_points)
+    elif method == "minmax":
+        selected = minmax_buckets(y, max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    if keep_index is not None:
+        selected = np.union1d(selected, [keep_index])
+    return price_history.iloc[selected]
@@ -0,0 +1,22 @@
+from src.infrastructure.database import get_session, init_db
+from src.infrastructure.repositories.product_repository import ProductRepository
+
+
+def backfill_price_stats():
+    """Rebuild the price rollups and running price aggregates from the stored history"""
+    init_db()
+    session = next(get_session())
+    try:
+        repository = ProductRepository(session)
+        rows = repository.rebuild_rollups()
+        print(f"Rebuilt price rollups from {rows} price history entries")
+        count = repository.backfill_price_stats()
+        print(f"Backfilled price stats for {count} products")
+    except Exception as e:
+        print(f"Error backfilling price stats: {e}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    backfill_price_stats()
@@ -1,10 +1,11 @@
 import asyncio
 from sqlalchemy import text
-from src.infrastructure.database import get_session
+from src.infrastructure.database import get_session, init_db
 
 
 async def cleanup_database():
     """Clean up all data from the database"""
+    init_db()
     session = next(get_session())
     try:
         # Delete price history first to avoid foreign key constraint violations
@@ -0,0 +1,45 @@
+import argparse
+from datetime import datetime, timedelta
+
+from src.config import settings
+from src.infrastructure.database import get_session, init_db
+from src.infrastructure.repositories.product_repository import ProductRepository
+
+
+def compact_history(raw_days: int, hourly_days: int):
+    """Fold old raw price history into rollups and expire old hourly rollups"""
+    init_db()
+    session = next(get_session())
+    try:
+        repository = ProductRepository(session)
+        now = datetime.utcnow()
+        if raw_days:
+            removed = repository.compact_price_history(now - timedelta(days=raw_days))
+            print(f"Compacted {removed} price history entries older than {raw_days} days")
+        if hourly_days:
+            removed = repository.expire_hourly_rollups(now - timedelta(days=hourly_days))
+            print(f"Removed {removed} hourly rollups older than {hourly_days} days")
+        if not raw_days and not hourly_days:
+            print("No retention configured, nothing to compact")
+    except Exception as e:
+        print(f"Error compacting price history: {e}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply price history retention")
+    parser.add_argument(
+        "--raw-days",
+        type=int,
+        default=settings.PRICE_HISTORY_RETENTION_DAYS,
+        help="Keep raw entries this many days (default: PRICE_HISTORY_RETENTION_DAYS)",
+    )
+    parser.add_argument(
+        "--hourly-days",
+        type=int,
+        default=settings.HOURLY_ROLLUP_RETENTION_DAYS,
+        help="Keep hourly rollups this many days (default: HOURLY_ROLLUP_RETENTION_DAYS)",
+    )
+    args = parser.parse_args()
+    compact_history(args.raw_days, args.hourly_days)
@@ -0,0 +1,31 @@
+import argparse
+
+from src.infrastructure.database import get_session, init_db
+from src.infrastructure.repositories.product_repository import ProductRepository
+from src.services.export import write_csv, write_parquet
+
+
+def export_history(path: str, file_format: str, product_url: str = None):
+    """Stream the price history of one or all products into a file"""
+    init_db()
+    session = next(get_session())
+    try:
+        repository = ProductRepository(session)
+        if file_format == "parquet":
+            write_parquet(repository, path, product_url)
+        else:
+            write_csv(repository, path, product_url)
+        print(f"Price history exported to {path}")
+    except Exception as e:
+        print(f"Error exporting price history: {e}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export price history")
+    parser.add_argument("path", help="Output file")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--url", help="Only export this product")
+    args = parser.parse_args()
+    export_history(args.path, args.format, args.url)
@@ -0,0 +1,28 @@
+import argparse
+
+from src.infrastructure.database import get_session, init_db
+from src.infrastructure.repositories.product_repository import ProductRepository
+from src.services.analytics import DEFAULT_LOW_DAYS, DEFAULT_WINDOW_DAYS, get_price_analytics
+
+
+def price_report(path: str, window_days: float, low_days: float):
+    """Write per-product price analytics over the full history to a CSV file"""
+    init_db()
+    session = next(get_session())
+    try:
+        analytics = get_price_analytics(ProductRepository(session), window_days, low_days)
+        analytics.summary.to_csv(path)
+        print(f"Price report for {len(analytics.summary)} products written to {path}")
+    except Exception as e:
+        print(f"Error building price report: {e}")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Price analytics report")
+    parser.add_argument("path", help="Output CSV file")
+    parser.add_argument("--window-days", type=float, default=DEFAULT_WINDOW_DAYS)
+    parser.add_argument("--low-days", type=float, default=DEFAULT_LOW_DAYS)
+    args = parser.parse_args()
+    price_report(args.path, args.window_days, args.low_days)
@@ -0,0 +1,213 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+from src.infrastructure.repositories.product_repository import ProductRepository
+
+# Rolling statistics window and the "N-day low" horizon, in days
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_LOW_DAYS = 30
+CHUNK_SIZE = 50_000
+
+NS_PER_SECOND = 10**9
+
+
+@dataclass
+class HistoryColumns:
+    """Price history of all products as arrays, sorted by product and time"""
+
+    urls: np.ndarray  # Product URL of each code
+    codes: np.ndarray  # Product code of each row
+    timestamps: np.ndarray  # datetime64[ns]
+    prices: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @classmethod
+    def from_rows(cls, rows) -> "HistoryColumns":
+        """Build from (product_url, timestamp, price) rows ordered by product and time"""
+        urls, timestamps, prices = zip(*rows) if rows else ((), (), ())
+        return cls._build(
+            [np.array(urls, dtype=object)],
+            [np.array(timestamps, dtype="datetime64[ns]")],
+            [np.array(prices, dtype=np.float64)],
+        )
+
+    @classmethod
+    def _build(cls, url_chunks, timestamp_chunks, price_chunks) -> "HistoryColumns":
+        if not url_chunks:
+            return cls.from_rows([])
+        codes, urls = pd.factorize(np.concatenate(url_chunks))
+        return cls(
+            urls=np.asarray(urls, dtype=object),
+            codes=codes.astype(np.int64),
+            timestamps=np.concatenate(timestamp_chunks),
+            prices=np.concatenate(price_chunks),
+        )
+
+
+@dataclass
+class PriceAnalytics:
+    """Per-observation metrics and a per-product summary"""
+
+    history: pd.DataFrame
+    summary: pd.DataFrame  # Indexed by product_url
+
+
+class _WindowBounds(BaseIndexer):
+    """Precomputed [start, end) bounds for pandas rolling aggregations"""
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        return self.start, self.end
+
+
+def load_history_columns(
+    repository: ProductRepository, chunk_size: int = CHUNK_SIZE
+) -> HistoryColumns:
+    """Stream the full price history into columnar arrays"""
+    url_chunks, timestamp_chunks, price_chunks = [], [], []
+    for rows in repository.iter_price_history_rows(
+        chunk_size=chunk_size, columns=("product_url", "timestamp", "price")
+    ):
+        urls, timestamps, prices = zip(*rows)
+        url_chunks.append(np.array(urls, dtype=object))
+        timestamp_chunks.append(np.array(timestamps, dtype="datetime64[ns]"))
+        price_chunks.append(np.array(prices, dtype=np.float64))
+    return HistoryColumns._build(url_chunks, timestamp_chunks, price_chunks)
+
+
+def _window_starts(codes: np.ndarray, seconds: np.ndarray, window: int) -> np.ndarray:
+    """Index of the first row of each row's (t - window, t] window within its product.
+
+    Offsetting every product by more than the whole time span makes one
+    sorted key for all products, so a single searchsorted finds all windows.
+    """
+    stride = int(seconds.max()) + window + 1
+    key = codes * stride + seconds
+    return np.searchsorted(key, key - window, side="right")
+
+
+def _rolling(prices: pd.Series, starts: np.ndarray, ends: np.ndarray):
+    rolling = prices.rolling(_WindowBounds(start=starts, end=ends), min_periods=1)
+    return rolling.min().to_numpy(), rolling.max().to_numpy(), rolling.mean().to_numpy()
+
+
+def compute_analytics(
+    columns: HistoryColumns,
+    window_days: float = DEFAULT_WINDOW_DAYS,
+    low_days: float = DEFAULT_LOW_DAYS,
+) -> PriceAnalytics:
+    """Compute price metrics of all products in one vectorized pass.
+
+    History rows get rolling min/max/mean over `window_days`, the change
+    from the previous price, the drawdown from the running peak and whether
+    the price is the lowest of the last `low_days`. The summary has one row
+    per product with its time-weighted average price among others.
+    """
+    codes, prices = columns.codes, columns.prices
+    n = len(prices)
+    if n == 0:
+        return PriceAnalytics(history=pd.DataFrame(), summary=pd.DataFrame())
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lasts = np.r_[starts[1:] - 1, n - 1]
+    first_of_product = np.zeros(n, dtype=bool)
+    first_of_product[starts] = True
+
+    timestamps_ns = columns.timestamps.astype(np.int64)
+    seconds = (timestamps_ns - timestamps_ns.min()) // NS_PER_SECOND
+    ends = np.arange(1, n + 1)
+    price_series = pd.Series(prices)
+
+    window_starts = _window_starts(codes, seconds, int(window_days * 86400))
+    rolling_min, rolling_max, rolling_mean = _rolling(price_series, window_starts, ends)
+    low_starts = _window_starts(codes, seconds, int(low_days * 86400))
+    low_min, _, _ = _rolling(price_series, low_starts, ends)
+
+    previous = np.r_[np.nan, prices[:-1]]
+    previous[first_of_product] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_change = prices / previous - 1
+        peak = price_series.groupby(codes).cummax().to_numpy()
+        drawdown = np.where(peak > 0, prices / peak - 1, 0.0)
+    at_low = prices <= low_min
+
+    history = pd.DataFrame(
+        {
+            "product_url": pd.Categorical.from_codes(codes, categories=columns.urls),
+            "timestamp": columns.timestamps,
+            "price": prices,
+            "rolling_min": rolling_min,
+            "rolling_max": rolling_max,
+            "rolling_mean": rolling_mean,
+            "pct_change": pct_change,
+            "drawdown": drawdown,
+            "at_n_day_low": at_low,
+        }
+    )
+
+    # Each price holds until the next observation of the same product
+    durations = np.r_[np.diff(timestamps_ns), 0].astype(np.float64)
+    durations[lasts] = 0.0
+    weighted = np.add.reduceat(prices * durations, starts)
+    spans = np.add.reduceat(durations, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        twap = np.where(spans > 0, weighted / spans, prices[lasts])
+        window_change = prices[lasts] / prices[window_starts[lasts]] - 1
+
+    counts = np.diff(np.r_[starts, n])
+    summary = pd.DataFrame(
+        {
+            "last_timestamp": columns.timestamps[lasts],
+            "last_price": prices[lasts],
+            "min_price": np.minimum.reduceat(prices, starts),
+            "max_price": np.maximum.reduceat(prices, starts),
+            "mean_price": np.add.reduceat(prices, starts) / counts,
+            "time_weighted_price": twap,
+            "rolling_min": rolling_min[lasts],
+            "rolling_max": rolling_max[lasts],
+            "rolling_mean": rolling_mean[lasts],
+            "window_change": window_change,
+            "current_drawdown": drawdown[lasts],
+            "max_drawdown": np.minimum.reduceat(drawdown, starts),
+            "at_n_day_low": at_low[lasts],
+            "observations": counts,
+        },
+        index=pd.Index(columns.urls[codes[starts]], name="product_url"),
+    )
+    return PriceAnalytics(history=history, summary=summary)
+
+
+_cache: Dict[Tuple, Tuple[Tuple, PriceAnalytics]] = {}
+
+
+def get_price_analytics(
+    repository: ProductRepository,
+    window_days: float = DEFAULT_WINDOW_DAYS,
+    low_days: float = DEFAULT_LOW_DAYS,
+) -> PriceAnalytics:
+    """Analytics over the full history, recomputed only when the history changed.
+
+    A sweep adds rows, so results are reused until the next sweep, in this
+    process or another one.
+    """
+    key = (window_days, low_days)
+    version = repository.get_history_version()
+    cached = _cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    started = time.perf_counter()
+    columns = load_history_columns(repository)
+    analytics = compute_analytics(columns, window_days, low_days)
+    print(
+        f"Computed price analytics for {len(analytics.summary)} products "
+        f"({len(columns)} rows) in {time.perf_counter() - started:.1f}s"
+    )
+    _cache[key] = (version, analytics)
+    return analytics
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.domain.models import Product
+
+DEFAULT_BATCH_PROMPT = (
+    "For every product page listed, extract the current price of the product "
+    "and the cabin type if the page is a cruise or flight itinerary."
+)
+
+
+class BatchPriceItem(BaseModel):
+    """One product price in a multi-URL extraction"""
+
+    url: str = Field(description="The exact URL of the product page the price was read from")
+    price: Optional[float] = Field(default=None, description="The current price of the product")
+    cabin_type: Optional[str] = Field(default=None, description="Type of cabin (e.g., Economy, Business)")
+
+
+class BatchPriceExtract(BaseModel):
+    """Schema for a multi-URL price extraction"""
+
+    products: List[BatchPriceItem] = Field(description="One entry per product page")
+
+
+def _url_key(url: str) -> str:
+    return url.strip().rstrip("/").lower()
+
+
+def group_products(products: List[Product], batch_size: int) -> List[List[Product]]:
+    """Group products that share a prompt into batches of at most `batch_size`"""
+    groups: "OrderedDict[str, List[Product]]" = OrderedDict()
+    for product in products:
+        groups.setdefault(product.prompt or "", []).append(product)
+
+    batches = []
+    for group in groups.values():
+        for start in range(0, len(group), batch_size):
+            batches.append(group[start : start + batch_size])
+    return batches
+
+
+def extract_prices(firecrawl, products: List[Product]) -> Dict[str, dict]:
+    """Extract prices for a batch of products with a single Firecrawl request.
+
+    Products must share the same prompt (see `group_products`). The result maps
+    each product URL to a payload shaped like a `scrape_url` response, so it can
+    go through `PriceService.parse_scrape` unchanged. URLs missing from the
+    response or without a usable price are left out, for the caller to scrape
+    one by one.
+    """
+    prompt = products[0].prompt or DEFAULT_BATCH_PROMPT
+    params = {
+        "prompt": prompt,
+        "schema": BatchPriceExtract,
+    }
+    data = firecrawl.extract([product.url for product in products], params)
+    extracted = BatchPriceExtract.model_validate(data.get("data") or {"products": []})
+
+    wanted = {_url_key(product.url): product.url for product in products}
+    results = {}
+    for item in extracted.products:
+        url = wanted.get(_url_key(item.url))
+        if url is None or url in results or not item.price:
+            continue
+        results[url] = {"extract": {"price": item.price, "cabin_type": item.cabin_type}}
+    return results
@@ -0,0 +1,243 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from src.config import settings
+from src.domain.models import ProductCreate
+from src.infrastructure.metrics import metrics
+from src.services.product_service import ProductService
+from src.services.rate_limit import KeyedRateLimiter
+
+
+@dataclass
+class ImportRow:
+    line: int  # 1-based data row of the source file
+    url: str
+    prompt: Optional[str] = None
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    added: int = 0
+    existing: int = 0  # Already tracked
+    duplicates: int = 0  # Repeated within the file
+    invalid: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)  # (url, error)
+    resumed_rows: int = 0  # Skipped because a checkpoint covered them
+    elapsed: float = 0.0
+
+    @property
+    def products_per_second(self) -> float:
+        return self.added / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _url_column(columns: Iterable[str]) -> Optional[str]:
+    """The first column named like a URL ("url", "product_url", "Itinerary-Operator-URL")"""
+    return next((column for column in columns if "url" in column.lower()), None)
+
+
+def read_rows(
+    path: str, url_column: Optional[str] = None, prompt_column: str = "prompt"
+) -> Iterator[ImportRow]:
+    """Stream the products of a CSV or JSONL file.
+
+    JSONL lines are objects or bare URL strings. Without `url_column`, the
+    first column whose name contains "url" holds the URLs. A malformed
+    JSONL line is reported and yields a row without a URL, which the
+    import counts as invalid.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            line = 0
+            for number, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                line += 1
+                try:
+                    record = json.loads(text)
+                    error = None
+                except ValueError as e:
+                    record, error = None, str(e)
+                if not isinstance(record, (str, dict)):
+                    error = error or f"expected an object or a URL string, not {type(record).__name__}"
+                    print(f"Skipping malformed line {number} of {path}: {error}")
+                    yield ImportRow(line, "")
+                    continue
+                if isinstance(record, str):
+                    yield ImportRow(line, record.strip())
+                    continue
+                column = url_column or _url_column(record)
+                yield ImportRow(
+                    line, str(record.get(column) or "").strip(), record.get(prompt_column) or None
+                )
+        else:
+            reader = csv.DictReader(f)
+            column = url_column or _url_column(reader.fieldnames or [])
+            if column is None:
+                raise ValueError(f"No URL column in {path}; pass one explicitly")
+            for line, record in enumerate(reader, start=1):
+                yield ImportRow(
+                    line, (record.get(column) or "").strip(), record.get(prompt_column) or None
+                )
+
+
+class BulkImporter:
+    """Adds many products at once.
+
+    Rows are read in chunks. Each chunk is checked against the database in
+    one query, its new URLs are scraped concurrently under the Firecrawl and
+    per-domain rate limits, and the products and their initial prices are
+    inserted in one transaction. After every chunk, the position in the file
+    is written to a checkpoint, so an interrupted import resumes where it
+    stopped.
+    """
+
+    def __init__(
+        self,
+        product_service: ProductService,
+        max_in_flight: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        key_limiter: Optional[KeyedRateLimiter] = None,
+        domain_limiter: Optional[KeyedRateLimiter] = None,
+    ):
+        self.product_service = product_service
+        self.repository = product_service.repository
+        self.max_in_flight = max_in_flight or settings.CHECK_MAX_IN_FLIGHT
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+        self.key_limiter = key_limiter or KeyedRateLimiter(
+            settings.FIRECRAWL_RATE_PER_MINUTE, settings.FIRECRAWL_BURST
+        )
+        self.domain_limiter = domain_limiter or KeyedRateLimiter(
+            settings.DOMAIN_RATE_PER_MINUTE, settings.DOMAIN_BURST
+        )
+
+    async def run(
+        self, rows: Iterable[ImportRow], checkpoint_path: Optional[str] = None
+    ) -> ImportResult:
+        """Import all rows, resuming from `checkpoint_path` if it exists.
+
+        The checkpoint is removed once the import completes.
+        """
+        result, done = self._load_checkpoint(checkpoint_path)
+        started = time.perf_counter() - result.elapsed
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        # URLs seen in this run; earlier chunks are deduplicated by the database
+        seen = set()
+        position = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            position += len(chunk)
+            if position <= done:
+                continue
+            # A checkpoint may end inside this chunk if the chunk size changed
+            chunk = chunk[max(0, done - (position - len(chunk))):]
+            await self._import_chunk(chunk, seen, in_flight, result)
+            result.elapsed = time.perf_counter() - started
+            self._save_checkpoint(checkpoint_path, result, position)
+        result.elapsed = time.perf_counter() - started
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        metrics.increment("imported_products", result.added)
+        print(
+            f"Imported {result.added} of {result.rows} rows in {result.elapsed:.1f}s "
+            f"({result.products_per_second:.2f} products/sec): {result.existing} already tracked, "
+            f"{result.duplicates} duplicates, {result.invalid} invalid, {len(result.failed)} failed"
+        )
+        return result
+
+    async def _import_chunk(
+        self,
+        chunk: List[ImportRow],
+        seen: set,
+        in_flight: asyncio.Semaphore,
+        result: ImportResult,
+    ) -> None:
+        result.rows += len(chunk)
+        new_rows = []
+        for row in chunk:
+            parsed = urlparse(row.url)
+            if parsed.scheme not in ("http", "https") or not parsed.netloc:
+                result.invalid += 1
+            elif row.url in seen:
+                result.duplicates += 1
+            else:
+                seen.add(row.url)
+                new_rows.append(row)
+
+        existing = self.repository.existing_urls([row.url for row in new_rows])
+        result.existing += len(existing)
+        new_rows = [row for row in new_rows if row.url not in existing]
+
+        products = await asyncio.gather(
+            *(self._scrape(row, in_flight, result) for row in new_rows)
+        )
+        products = [product for product in products if product is not None]
+        with metrics.span("import.insert"):
+            result.added += self.repository.add_many(products)
+        if self.product_service.local_extractor is not None:
+            self.product_service.local_extractor.save()
+
+    async def _scrape(
+        self, row: ImportRow, in_flight: asyncio.Semaphore, result: ImportResult
+    ) -> Optional[ProductCreate]:
+        """The product of one row, or None if it could not be scraped"""
+        service = self.product_service
+        domain = urlparse(row.url).netloc.lower()
+        try:
+            html = product = None
+            if not row.prompt and service.local_extractor is not None:
+                await self.domain_limiter.acquire(domain)
+                async with in_flight:
+                    html, product = await asyncio.to_thread(service.extract_locally, row.url)
+            if product is None:
+                # Wait for the slower per-domain bucket first, as sweeps do
+                await self.domain_limiter.acquire(domain)
+                await self.key_limiter.acquire(service.api_key)
+                async with in_flight:
+                    product = await asyncio.to_thread(
+                        service.extract_with_firecrawl, row.url, row.prompt, html
+                    )
+            # The extraction may report a canonical URL; keep the one imported
+            return product.model_copy(update={"url": row.url})
+        except Exception as e:
+            print(f"Error importing {row.url} (row {row.line}): {e}")
+            result.failed.append((row.url, str(e)))
+            return None
+
+    @staticmethod
+    def _load_checkpoint(path: Optional[str]) -> Tuple[ImportResult, int]:
+        """(counts so far, rows done) of an interrupted import"""
+        if not path or not os.path.exists(path):
+            return ImportResult(), 0
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            counts = state["result"]
+            counts["failed"] = [tuple(failure) for failure in counts["failed"]]
+            result = ImportResult(**counts)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable import checkpoint {path}: {e}")
+            return ImportResult(), 0
+        result.resumed_rows = state["rows_done"]
+        print(f"Resuming import after row {state['rows_done']}")
+        return result, state["rows_done"]
+
+    @staticmethod
+    def _save_checkpoint(path: Optional[str], result: ImportResult, rows_done: int) -> None:
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"rows_done": rows_done, "result": asdict(result)}, f)
+        os.replace(tmp_path, path)
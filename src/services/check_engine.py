@@ -0,0 +1,406 @@
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from src.config import settings
+from src.domain.models import PriceHistoryCreate, Product, SweepProduct
+from src.infrastructure.metrics import metrics
+from src.services.batch_extractor import group_products
+from src.services.local_extractor import LocalExtractor
+from src.services.money import parse_price
+from src.services.notifications import DiscordNotifier
+from src.services.rate_limit import KeyedRateLimiter
+from src.services.scrape_cache import PageFingerprint, ScrapeCache
+
+
+@dataclass
+class SweepResult:
+    """Outcome of one price check sweep"""
+
+    updated_products: List[Union[Product, SweepProduct]] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    local_hits: int = 0  # Prices read from the page markup, without Firecrawl
+    local_misses: int = 0
+
+    @property
+    def checked(self) -> int:
+        return len(self.updated_products) + len(self.failed)
+
+    @property
+    def products_per_second(self) -> float:
+        return self.checked / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    @property
+    def local_hit_rate(self) -> float:
+        lookups = self.local_hits + self.local_misses
+        return self.local_hits / lookups if lookups else 0.0
+
+    @property
+    def credits_saved(self) -> int:
+        return (self.cache_hits + self.local_hits) * settings.FIRECRAWL_CREDITS_PER_SCRAPE
+
+
+class CheckEngine:
+    """Runs price checks concurrently under per-key and per-domain rate limits.
+
+    Scrapes run in worker threads (the Firecrawl client is blocking) while
+    parsing, notifications and database writes stay on the event loop thread,
+    so the repository session is never shared across threads. Batches of
+    price updates are written in the background, one transaction at a time,
+    while scraping goes on; with an async repository those writes don't
+    block the event loop either.
+    """
+
+    def __init__(
+        self,
+        price_service,
+        max_in_flight: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        write_batch_size: Optional[int] = None,
+        notifier: Optional[DiscordNotifier] = None,
+        scrape_cache: Optional[ScrapeCache] = None,
+        local_extractor: Optional[LocalExtractor] = None,
+        key_limiter: Optional[KeyedRateLimiter] = None,
+        domain_limiter: Optional[KeyedRateLimiter] = None,
+    ):
+        self.price_service = price_service
+        self.max_in_flight = max_in_flight or settings.CHECK_MAX_IN_FLIGHT
+        self.max_retries = (
+            settings.CHECK_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.retry_backoff = (
+            settings.CHECK_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        )
+        self.batch_size = batch_size or settings.CHECK_BATCH_SIZE
+        self.write_batch_size = write_batch_size or settings.CHECK_WRITE_BATCH_SIZE
+        self._pending: List[PriceHistoryCreate] = []
+        # Background writes of full batches, one transaction at a time
+        self._writes: List[asyncio.Task] = []
+        self._write_lock = asyncio.Lock()
+        self.notifier = notifier
+        self.scrape_cache = scrape_cache
+        self.local_extractor = local_extractor
+        self.key_limiter = key_limiter or KeyedRateLimiter(
+            settings.FIRECRAWL_RATE_PER_MINUTE, settings.FIRECRAWL_BURST
+        )
+        self.domain_limiter = domain_limiter or KeyedRateLimiter(
+            settings.DOMAIN_RATE_PER_MINUTE, settings.DOMAIN_BURST
+        )
+
+    async def run(self, products: List[Product], batch: bool = False) -> SweepResult:
+        """Check all products and return the sweep result.
+
+        With `batch` set, products sharing a prompt are extracted together in
+        multi-URL requests and only the ones a batch misses are scraped singly.
+        """
+        result = SweepResult()
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        started = time.perf_counter()
+        self._writes = []
+        self._write_lock = asyncio.Lock()
+        owns_notifier = self.notifier is None
+        if owns_notifier:
+            self.notifier = DiscordNotifier()
+
+        try:
+            if batch:
+                checks = (
+                    self._check_batch(group, in_flight, result)
+                    for group in group_products(products, self.batch_size)
+                )
+            else:
+                checks = (self._check(product, in_flight, result) for product in products)
+            await asyncio.gather(*checks)
+            self._flush(result)
+            await asyncio.gather(*self._writes)
+            # Then the alerts that didn't fill a whole message
+            with metrics.span("check.notify"):
+                await self.notifier.flush()
+        finally:
+            if owns_notifier:
+                await self.notifier.close()
+                self.notifier = None
+            if self.scrape_cache is not None:
+                self.scrape_cache.save()
+            if self.local_extractor is not None:
+                self.local_extractor.save()
+
+        result.elapsed = time.perf_counter() - started
+        metrics.increment("checks", result.checked)
+        metrics.increment("check_failures", len(result.failed))
+        metrics.increment("scrape_cache_hits", result.cache_hits)
+        metrics.increment("scrape_cache_misses", result.cache_misses)
+        metrics.increment("local_extract_hits", result.local_hits)
+        metrics.increment("local_extract_misses", result.local_misses)
+        print(
+            f"Checked {result.checked} products in {result.elapsed:.1f}s "
+            f"({result.products_per_second:.2f} products/sec, "
+            f"{len(result.failed)} failed)"
+        )
+        if self.scrape_cache is not None:
+            print(
+                f"Scrape cache: {result.cache_hits} hits, {result.cache_misses} misses "
+                f"({result.cache_hit_rate:.0%} hit rate, "
+                f"~{result.credits_saved} Firecrawl credits saved)"
+            )
+        if self.local_extractor is not None:
+            print(
+                f"Local extraction: {result.local_hits} hits, {result.local_misses} misses "
+                f"({result.local_hit_rate:.0%} hit rate)"
+            )
+        return result
+
+    async def _check_batch(
+        self, group: List[Product], in_flight: asyncio.Semaphore, result: SweepResult
+    ) -> None:
+        extracted: Dict[str, dict] = {}
+        fingerprints: Dict[str, PageFingerprint] = {}
+        if self.scrape_cache is not None or self.local_extractor is not None:
+            prefetched = await asyncio.gather(
+                *(self._prefetch(product, in_flight, result) for product in group)
+            )
+            for product, (found, fingerprint) in zip(group, prefetched):
+                fingerprints[product.url] = fingerprint
+                if found is not None:
+                    extracted[product.url] = found
+        to_extract = [product for product in group if product.url not in extracted]
+
+        if to_extract:
+            domains = Counter(urlparse(product.url).netloc.lower() for product in to_extract)
+            for domain, count in domains.items():
+                await self.domain_limiter.acquire(domain, count)
+            await self.key_limiter.acquire(self.price_service.api_key)
+            try:
+                async with in_flight:
+                    batch_extracted = await asyncio.to_thread(
+                        self.price_service.extract_batch, to_extract
+                    )
+            except Exception as e:
+                metrics.increment("batch_extract_failures")
+                print(f"Batch extract failed for {len(to_extract)} products: {e}")
+                batch_extracted = {}
+            for product in to_extract:
+                if product.url in batch_extracted:
+                    extracted[product.url] = batch_extracted[product.url]
+                    await self._remember(
+                        product, extracted[product.url], fingerprints.get(product.url)
+                    )
+
+        missed = len(group) - len(extracted)
+        if missed:
+            print(f"Falling back to single scrapes for {missed} of {len(group)} products")
+        await asyncio.gather(
+            *(
+                self._check(
+                    product,
+                    in_flight,
+                    result,
+                    extracted.get(product.url),
+                    fingerprints.get(product.url),
+                )
+                for product in group
+            )
+        )
+
+    async def _check(
+        self,
+        product: Product,
+        in_flight: asyncio.Semaphore,
+        result: SweepResult,
+        scraped_data: Optional[dict] = None,
+        fingerprint: Optional[PageFingerprint] = None,
+    ) -> None:
+        try:
+            if scraped_data is None:
+                scraped_data = await self._scrape_cached(
+                    product, in_flight, result, fingerprint
+                )
+            new_price, cabin_type, error = self.price_service.parse_scrape(
+                product, scraped_data
+            )
+            if error:
+                self.notifier.add_price_error(
+                    product.name, product.url, f"No price Found : {error}"
+                )
+            if new_price < product.price:
+                self.notifier.add_price_alert(
+                    product.name, product.price, new_price, product.url
+                )
+            update = await self.price_service.build_price_update_async(
+                product, new_price, cabin_type
+            )
+            # Appended only after the await, since a flush may swap the list meanwhile
+            self._pending.append(update)
+            result.updated_products.append(product)
+        except Exception as e:
+            result.failed[product.url] = str(e)
+            self.notifier.add_price_error(product.name, product.url, e)
+            print(f"Error checking price for {product.url}: {e}")
+            return
+        if len(self._pending) >= self.write_batch_size:
+            self._flush(result)
+
+    def _flush(self, result: SweepResult) -> None:
+        """Start writing all pending price updates in one transaction"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._writes.append(asyncio.create_task(self._write(pending, result)))
+
+    async def _write(self, pending: List[PriceHistoryCreate], result: SweepResult) -> None:
+        # Concurrent transactions upserting the same rollup rows could deadlock
+        async with self._write_lock:
+            try:
+                await self.price_service.save_price_updates_async(pending)
+            except Exception as e:
+                print(f"Error saving {len(pending)} price updates: {e}")
+                failed_urls = {price_history.product_url for price_history in pending}
+                result.updated_products = [
+                    product
+                    for product in result.updated_products
+                    if product.url not in failed_urls
+                ]
+                for url in failed_urls:
+                    result.failed[url] = str(e)
+        # Alerts go out in full messages as they build up, outside the write lock
+        await self.notifier.send_full_batches()
+
+    async def _revalidate(
+        self, product: Product, in_flight: asyncio.Semaphore, result: SweepResult
+    ) -> Tuple[Optional[dict], PageFingerprint]:
+        """Look the product up in the scrape cache with a cheap page fetch"""
+        await self.domain_limiter.acquire(urlparse(product.url).netloc.lower())
+        key = self.price_service.scrape_cache_key(product)
+        async with in_flight:
+            cached, fingerprint = await asyncio.to_thread(
+                self.scrape_cache.revalidate, key, product.url
+            )
+        if cached is not None:
+            result.cache_hits += 1
+        else:
+            result.cache_misses += 1
+        return cached, fingerprint
+
+    async def _prefetch(
+        self, product: Product, in_flight: asyncio.Semaphore, result: SweepResult
+    ) -> Tuple[Optional[dict], PageFingerprint]:
+        """Answer a product from the scrape cache or its page's own markup.
+
+        Returns (scrape-like result or None, fingerprint of the fetched page);
+        None means Firecrawl has to extract the price.
+        """
+        fingerprint = PageFingerprint()
+        if self.scrape_cache is not None:
+            cached, fingerprint = await self._revalidate(product, in_flight, result)
+            if cached is not None:
+                return cached, fingerprint
+        # A custom prompt asks for something the page markup can't tell
+        if self.local_extractor is None or product.prompt:
+            return None, fingerprint
+
+        # The scrape cache already tried fetching the page
+        if fingerprint.html is None and self.scrape_cache is None:
+            await self.domain_limiter.acquire(urlparse(product.url).netloc.lower())
+            async with in_flight:
+                with metrics.span("check.page_fetch"):
+                    fingerprint.html = await asyncio.to_thread(
+                        self.local_extractor.fetch, product.url
+                    )
+        found = None
+        if fingerprint.html is not None:
+            with metrics.span("check.local_extract"):
+                found = await asyncio.to_thread(
+                    self.local_extractor.extract, product.url, fingerprint.html
+                )
+        currency = (found or {}).get("extract", {}).get("currency")
+        if found is not None and currency and currency.upper() != product.currency.upper():
+            # Served in another currency, e.g. after a geo redirect
+            found = None
+        if found is None:
+            result.local_misses += 1
+        else:
+            result.local_hits += 1
+        return found, fingerprint
+
+    async def _remember(
+        self, product: Product, scraped_data: dict, fingerprint: Optional[PageFingerprint]
+    ) -> None:
+        """Cache a fresh extraction that found a price, and learn where the page shows it"""
+        if fingerprint is None:
+            return
+        extracted = scraped_data.get("extract") or {}
+        price = parse_price(extracted.get("price"))
+        if price is None:
+            return
+        if self.scrape_cache is not None:
+            self.scrape_cache.put(
+                self.price_service.scrape_cache_key(product), scraped_data, fingerprint
+            )
+        if self.local_extractor is not None and fingerprint.html and not product.prompt:
+            details = {
+                "price": price,
+                "name": extracted.get("name") or product.name,
+                "currency": extracted.get("currency") or product.currency,
+                "main_image_url": extracted.get("main_image_url") or product.main_image_url,
+            }
+            await asyncio.to_thread(
+                self.local_extractor.learn, product.url, fingerprint.html, details
+            )
+
+    async def _scrape_cached(
+        self,
+        product: Product,
+        in_flight: asyncio.Semaphore,
+        result: SweepResult,
+        fingerprint: Optional[PageFingerprint] = None,
+    ) -> dict:
+        """Scrape a product unless the cache or the page markup already has its price.
+
+        A `fingerprint` means the page was already prefetched (and missed).
+        """
+        if fingerprint is None and (
+            self.scrape_cache is not None or self.local_extractor is not None
+        ):
+            found, fingerprint = await self._prefetch(product, in_flight, result)
+            if found is not None:
+                return found
+        scraped_data = await self._scrape_with_retries(product, in_flight)
+        await self._remember(product, scraped_data, fingerprint)
+        return scraped_data
+
+    async def _scrape_with_retries(
+        self, product: Product, in_flight: asyncio.Semaphore
+    ) -> dict:
+        domain = urlparse(product.url).netloc.lower()
+        for attempt in range(self.max_retries + 1):
+            # Wait for the slower per-domain bucket first so a busy domain
+            # does not hold on to a token of the shared API key bucket
+            with metrics.span("check.rate_limit_wait"):
+                await self.domain_limiter.acquire(domain)
+                await self.key_limiter.acquire(self.price_service.api_key)
+            try:
+                async with in_flight:
+                    return await asyncio.to_thread(self.price_service.scrape, product)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * 2**attempt
+                metrics.increment("scrape_retries")
+                print(
+                    f"Scrape failed for {product.url} ({e}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
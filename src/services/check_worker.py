@@ -0,0 +1,153 @@
+import asyncio
+import os
+import socket
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from src.config import settings
+from src.domain.models import CheckJob, SweepProduct
+from src.infrastructure.repositories.job_repository import JobRepository
+from src.services.check_engine import SweepResult
+
+
+def job_key(product_url: str, last_checked: Optional[datetime]) -> str:
+    """Key of the check that follows the price recorded at `last_checked`.
+
+    Every producer computes the same key until the check lands a new price,
+    so queueing a product twice, from two tabs or two nodes, is a no-op.
+    """
+    return f"check:{product_url}:{last_checked.isoformat() if last_checked else 'new'}"
+
+
+def enqueue_checks(price_service, jobs: JobRepository, products: List[SweepProduct]) -> int:
+    """Queue a check of each product; returns how many were not queued already"""
+    return jobs.enqueue((job_key(p.url, p.last_checked), p.url) for p in products)
+
+
+def enqueue_due_checks(
+    price_service, jobs: JobRepository, window: Optional[timedelta] = None
+) -> int:
+    """Queue the products the adaptive scheduler finds due"""
+    return enqueue_checks(price_service, jobs, price_service.due_products(window))
+
+
+class CheckWorker:
+    """Takes check jobs off the queue and runs them through the check engine.
+
+    Any number of workers, in any number of processes or hosts, can share one
+    queue: a job is leased to a single worker, and a lease that isn't renewed
+    by heartbeats runs out so another worker picks the job up.
+    """
+
+    def __init__(
+        self,
+        price_service,
+        jobs: JobRepository,
+        worker_id: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        lease: Optional[timedelta] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        batch: Optional[bool] = None,
+        **engine_options,
+    ):
+        self.price_service = price_service
+        self.jobs = jobs
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size or settings.WORKER_BATCH_SIZE
+        self.lease = lease or timedelta(seconds=settings.WORKER_LEASE_SECONDS)
+        self.max_attempts = max_attempts or settings.WORKER_MAX_ATTEMPTS
+        self.retry_delay = settings.WORKER_RETRY_DELAY if retry_delay is None else retry_delay
+        self.poll_interval = poll_interval or settings.WORKER_POLL_SECONDS
+        self.batch = batch
+        self.engine_options = engine_options
+
+    async def run_once(self) -> int:
+        """Claim and check one batch of jobs; returns the number claimed"""
+        token, claimed = self.jobs.claim(
+            self.worker_id, self.batch_size, self.lease, self.max_attempts
+        )
+        if not claimed:
+            return 0
+
+        # Jobs of products removed since they were queued just complete
+        products = self.price_service.repository.get_sweep_products(
+            [job.product_url for job in claimed]
+        )
+        heartbeat = asyncio.create_task(self._heartbeat(token))
+        try:
+            result = await self.price_service.run_checks(
+                products, batch=self.batch, **self.engine_options
+            )
+        except Exception as e:
+            print(f"Worker {self.worker_id} failed a batch: {e}")
+            result = SweepResult(failed={p.url: str(e) for p in products})
+        finally:
+            heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await heartbeat
+
+        self.jobs.complete(
+            token, [job.id for job in claimed if job.product_url not in result.failed]
+        )
+        for job in claimed:
+            if job.product_url in result.failed:
+                self._fail(token, job, result.failed[job.product_url])
+        return len(claimed)
+
+    async def run_until_empty(self) -> int:
+        """Work through everything that is due now; returns the number of jobs run"""
+        total = 0
+        while True:
+            claimed = await self.run_once()
+            if not claimed:
+                return total
+            total += claimed
+
+    async def run(self, stop: asyncio.Event, produce: bool = False) -> None:
+        """Process jobs until `stop` is set, queueing due checks if `produce`"""
+        next_produce = 0.0
+        produce_every = settings.SCHEDULER_TICK_MINUTES * 60
+        print(f"Worker {self.worker_id} started")
+        while not stop.is_set():
+            if produce and time.monotonic() >= next_produce:
+                self._produce(timedelta(seconds=produce_every))
+                next_produce = time.monotonic() + produce_every
+
+            try:
+                claimed = await self.run_once()
+            except Exception as e:
+                print(f"Worker {self.worker_id} error: {e}")
+                claimed = 0
+            if not claimed:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+        print(f"Worker {self.worker_id} stopped")
+
+    def _produce(self, window: timedelta) -> None:
+        try:
+            queued = enqueue_due_checks(self.price_service, self.jobs, window)
+            purged = self.jobs.purge_finished(
+                datetime.utcnow() - timedelta(hours=settings.WORKER_KEEP_FINISHED_HOURS)
+            )
+            print(f"Queued {queued} price checks, purged {purged} finished jobs")
+        except Exception as e:
+            print(f"Error queueing price checks: {e}")
+
+    def _fail(self, token: str, job: CheckJob, error: str) -> None:
+        if job.attempts >= self.max_attempts:
+            print(f"Giving up on {job.product_url} after {job.attempts} attempts: {error}")
+            self.jobs.fail(token, job.id, error)
+            return
+        delay = self.retry_delay * 2 ** (job.attempts - 1)
+        self.jobs.fail(token, job.id, error, datetime.utcnow() + timedelta(seconds=delay))
+
+    async def _heartbeat(self, token: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            if not self.jobs.heartbeat(token, self.lease):
+                print(f"Worker {self.worker_id} lost its lease on a batch")
+                return
@@ -0,0 +1,89 @@
+import csv
+import io
+from typing import BinaryIO, Iterator, Optional, Union
+
+from src.infrastructure.repositories.product_repository import (
+    PRICE_HISTORY_EXPORT_COLUMNS,
+    ProductRepository,
+)
+
+CHUNK_SIZE = 5000
+
+
+def iter_csv(
+    repository: ProductRepository,
+    product_url: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[str]:
+    """Yield price history as CSV text, one chunk of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(PRICE_HISTORY_EXPORT_COLUMNS)
+    for rows in repository.iter_price_history_rows(product_url, chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only, there was no history
+        yield buffer.getvalue()
+
+
+def write_csv(
+    repository: ProductRepository,
+    sink: Union[str, io.TextIOBase],
+    product_url: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """Stream price history as CSV into a path or text file object"""
+    if isinstance(sink, str):
+        with open(sink, "w", newline="", encoding="utf-8") as f:
+            write_csv(repository, f, product_url, chunk_size)
+        return
+    for chunk in iter_csv(repository, product_url, chunk_size):
+        sink.write(chunk)
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("product_url", pa.string()),
+            ("price", pa.float64()),
+            ("timestamp", pa.timestamp("us")),
+            ("product_name", pa.string()),
+            ("cabin_type", pa.string()),
+            ("is_lowest", pa.bool_()),
+        ]
+    )
+
+
+def write_parquet(
+    repository: ProductRepository,
+    sink: Union[str, BinaryIO],
+    product_url: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """Stream price history into a Parquet file, one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in repository.iter_price_history_rows(product_url, chunk_size):
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+
+
+def to_csv_bytes(repository: ProductRepository, product_url: Optional[str] = None) -> bytes:
+    """Export price history as CSV bytes, e.g. for a download button"""
+    return "".join(iter_csv(repository, product_url)).encode("utf-8")
+
+
+def to_parquet_bytes(repository: ProductRepository, product_url: Optional[str] = None) -> bytes:
+    """Export price history as Parquet bytes, e.g. for a download button"""
+    buffer = io.BytesIO()
+    write_parquet(repository, buffer, product_url)
+    return buffer.getvalue()
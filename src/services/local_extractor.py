@@ -0,0 +1,559 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from src.services.money import find_currency, normalize_currency, parse_price
+from src.services.scrape_cache import FETCH_HEADERS
+
+# Elements without an end tag
+_VOID_TAGS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+     "source", "track", "wbr"}
+)
+# Longer texts are not a price on their own
+MAX_PRICE_TEXT = 48
+# Longer texts are not a product name either
+MAX_TEXT = 160
+# Descriptions, reviews and related products nest deeper and differ between
+# products of one layout, so only elements this shallow make up a layout
+LAYOUT_DEPTH = 8
+# Generated ids ("price-8812") differ between products of the same site
+_GENERATED_ID = re.compile(r"\d")
+PRODUCT_TYPES = {"Product", "ProductGroup", "IndividualProduct"}
+OFFER_TYPES = {"Offer", "AggregateOffer"}
+
+
+def selector(tag: str, attrs: Dict[str, Optional[str]]) -> Optional[str]:
+    """CSS-like selector of an element: `tag#id`, `tag.class...` or `tag[itemprop="x"]`"""
+    element_id = attrs.get("id")
+    if element_id and not _GENERATED_ID.search(element_id):
+        return f"{tag}#{element_id}"
+    classes = (attrs.get("class") or "").split()
+    if classes:
+        return tag + "".join(f".{name}" for name in sorted(set(classes)))
+    if attrs.get("itemprop"):
+        return f'{tag}[itemprop="{attrs["itemprop"]}"]'
+    return None
+
+
+class PageParser(HTMLParser):
+    """One pass over a page, collecting what the extractors need.
+
+    - `json_ld`: bodies of `<script type="application/ld+json">`
+    - `meta`: `<meta>` contents by property/name, first one wins
+    - `itemprops`: microdata values (content, src or short text), first one wins
+    - `elements`: (selector, text) of elements with a short text
+    - `images`: (selector, src) of `<img>` elements
+    - `selector_counts`: how often each selector occurs on the page
+    - `layout`: selectors of the elements making up the page's layout
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.json_ld: List[str] = []
+        self.meta: Dict[str, str] = {}
+        self.itemprops: Dict[str, str] = {}
+        self.elements: List[Tuple[str, str]] = []
+        self.images: List[Tuple[str, str]] = []
+        self.selector_counts: Counter = Counter()
+        self.layout: set = set()
+        # Open elements: [tag, selector, itemprop, text parts, text length]
+        self._stack: List[list] = []
+        self._raw_tag: Optional[str] = None  # Inside <script> or <style>
+        self._script: Optional[List[str]] = None  # Body of an open JSON-LD script
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ("script", "style"):
+            self._raw_tag = tag
+            if tag == "script" and (attrs.get("type") or "").lower() == "application/ld+json":
+                self._script = []
+            return
+        itemprop = attrs.get("itemprop")
+        if tag == "meta":
+            key = attrs.get("property") or attrs.get("name") or itemprop
+            if key and attrs.get("content") is not None:
+                self.meta.setdefault(key.lower(), attrs["content"])
+        if itemprop:
+            value = attrs.get("content") or (attrs.get("src") if tag == "img" else None)
+            if value is not None:
+                self.itemprops.setdefault(itemprop, value)
+                itemprop = None
+        element_selector = selector(tag, attrs)
+        if element_selector:
+            self.selector_counts[element_selector] += 1
+            if len(self._stack) < LAYOUT_DEPTH:
+                self.layout.add(element_selector)
+            if tag == "img" and attrs.get("src"):
+                self.images.append((element_selector, attrs["src"]))
+        if tag in _VOID_TAGS:
+            return
+        self._stack.append([tag, element_selector, itemprop, [], 0])
+
+    def handle_data(self, data):
+        if self._raw_tag:
+            if self._script is not None:
+                self._script.append(data)
+            return
+        for element in self._stack:
+            if element[4] <= MAX_TEXT:
+                element[3].append(data)
+                element[4] += len(data)
+
+    def handle_endtag(self, tag):
+        if self._raw_tag:
+            if tag == self._raw_tag:
+                if self._script is not None:
+                    self.json_ld.append("".join(self._script))
+                self._raw_tag = self._script = None
+            return
+        # Close up to the innermost open element of this tag; stray end tags are ignored
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                while len(self._stack) > depth:
+                    self._finish(self._stack.pop())
+                return
+
+    def close(self):
+        super().close()
+        while self._stack:
+            self._finish(self._stack.pop())
+
+    def _finish(self, element: list) -> None:
+        _, element_selector, itemprop, parts, length = element
+        if length > MAX_TEXT:
+            return
+        text = " ".join("".join(parts).split())
+        if not text:
+            return
+        if element_selector:
+            self.elements.append((element_selector, text))
+        if itemprop and len(text) <= MAX_PRICE_TEXT:
+            self.itemprops.setdefault(itemprop, text)
+
+
+def parse_page(html: str) -> PageParser:
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def layout_fingerprint(page: PageParser) -> str:
+    """Short hash of the page's layout; equal for pages rendered from one template"""
+    digest = hashlib.sha1("\n".join(sorted(page.layout)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _walk(node: Any) -> Iterator[dict]:
+    """Every JSON object in a JSON-LD document, outermost first"""
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+
+
+def _types(node: dict) -> set:
+    types = node.get("@type")
+    return set(types) if isinstance(types, list) else {types}
+
+
+def _first(value: Any) -> Optional[str]:
+    """A URL from a JSON-LD image, which may be a string, a list or an ImageObject"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("url") or value.get("contentUrl")
+    return value if isinstance(value, str) else None
+
+
+def _offer_price(offer: dict) -> Tuple[Optional[float], Optional[str]]:
+    specification = offer.get("priceSpecification")
+    if isinstance(specification, list):
+        specification = specification[0] if specification else None
+    specification = specification if isinstance(specification, dict) else {}
+    currency = offer.get("priceCurrency") or specification.get("priceCurrency")
+    price = parse_price(
+        offer.get("price") or offer.get("lowPrice") or specification.get("price"), currency
+    )
+    return price, currency
+
+
+def from_json_ld(page: PageParser) -> Optional[dict]:
+    """Price of the first schema.org Product (or bare Offer) with one"""
+    offers = []
+    for block in page.json_ld:
+        try:
+            document = json.loads(block)
+        except ValueError:
+            continue
+        for node in _walk(document):
+            types = _types(node)
+            if types & PRODUCT_TYPES:
+                for offer in _walk(node.get("offers")):
+                    if _types(offer) & OFFER_TYPES or "price" in offer:
+                        price, currency = _offer_price(offer)
+                        if price:
+                            return {
+                                "price": price,
+                                "currency": currency,
+                                "name": node.get("name"),
+                                "main_image_url": _first(node.get("image")),
+                            }
+            elif types & OFFER_TYPES:
+                offers.append(node)
+    for offer in offers:
+        price, currency = _offer_price(offer)
+        if price:
+            return {"price": price, "currency": currency, "name": None, "main_image_url": None}
+    return None
+
+
+def from_microdata(page: PageParser) -> Optional[dict]:
+    currency = page.itemprops.get("priceCurrency")
+    price = parse_price(page.itemprops.get("price") or page.itemprops.get("lowPrice"), currency)
+    if not price:
+        return None
+    return {
+        "price": price,
+        "currency": currency,
+        "name": page.itemprops.get("name"),
+        "main_image_url": page.itemprops.get("image"),
+    }
+
+
+def from_open_graph(page: PageParser) -> Optional[dict]:
+    meta = page.meta
+    currency = meta.get("product:price:currency") or meta.get("og:price:currency")
+    price = parse_price(meta.get("product:price:amount") or meta.get("og:price:amount"), currency)
+    if not price:
+        return None
+    return {
+        "price": price,
+        "currency": currency,
+        "name": meta.get("og:title"),
+        "main_image_url": meta.get("og:image"),
+    }
+
+
+def _normalized(text: Optional[str]) -> str:
+    return " ".join((text or "").split()).casefold()
+
+
+def _by_selector(pairs: List[Tuple[str, str]]) -> Dict[str, str]:
+    """The value of the first element matching each selector"""
+    values: Dict[str, str] = {}
+    for element_selector, value in pairs:
+        values.setdefault(element_selector, value)
+    return values
+
+
+def _rarest(page: PageParser, candidates: List[Tuple[str, str]]) -> Optional[str]:
+    """Selector of the candidate rarest on the page, then with the shortest text.
+
+    A list of related products doesn't win over the product itself, and an
+    element beats the box around it: candidates come in the order elements
+    close, innermost first.
+    """
+    if not candidates:
+        return None
+    return min(
+        (page.selector_counts[element_selector], len(text), position, element_selector)
+        for position, (element_selector, text) in enumerate(candidates)
+    )[3]
+
+
+def learn_template(url: str, page: PageParser, details: dict) -> Optional[dict]:
+    """Where the page shows the product's price, name, currency and image.
+
+    `details` are the values extracted elsewhere (by Firecrawl). Returns None
+    if the page doesn't show the price. Fields are selectors, `meta:<key>`
+    for a `<meta>` tag or None; `currency_code` is the currency to assume
+    when the page shows none.
+    """
+    currency = normalize_currency(details.get("currency"))
+    price = parse_price(details.get("price"), currency)
+    if price is None:
+        return None
+
+    def shows_price(text: str) -> bool:
+        shown = parse_price(text, currency) if len(text) <= MAX_PRICE_TEXT else None
+        return shown is not None and abs(shown - price) < 0.005
+
+    price_selector = _rarest(page, [
+        (element_selector, text) for element_selector, text in page.elements
+        if shows_price(text)
+    ])
+    if price_selector is None:
+        return None
+    template = {
+        "price": price_selector,
+        "name": None,
+        "currency": None,
+        "main_image_url": None,
+        "currency_code": None,
+    }
+
+    name = _normalized(details.get("name"))
+    if name:
+        if _normalized(page.meta.get("og:title")) == name:
+            template["name"] = "meta:og:title"
+        else:
+            template["name"] = _rarest(page, [
+                (element_selector, text) for element_selector, text in page.elements
+                if _normalized(text) == name
+            ])
+
+    if currency:
+        if find_currency(_by_selector(page.elements).get(price_selector)) == currency:
+            template["currency"] = price_selector
+        else:
+            keys = [key for key, value in page.meta.items() if value.strip().upper() == currency]
+            template["currency"] = f"meta:{keys[0]}" if keys else None
+            template["currency_code"] = currency
+
+    image = details.get("main_image_url")
+    if image:
+        image = urljoin(url, image)
+        if page.meta.get("og:image") and urljoin(url, page.meta["og:image"]) == image:
+            template["main_image_url"] = "meta:og:image"
+        else:
+            template["main_image_url"] = _rarest(page, [
+                (element_selector, src) for element_selector, src in page.images
+                if urljoin(url, src) == image
+            ])
+    return template
+
+
+def from_template(page: PageParser, template: dict) -> Optional[dict]:
+    """The product as shown where `template` says, or None if the price isn't there"""
+    texts = _by_selector(page.elements)
+    images = _by_selector(page.images)
+
+    def read(field: str, values: Dict[str, str]) -> Optional[str]:
+        locator = template.get(field)
+        if not locator:
+            return None
+        if locator.startswith("meta:"):
+            return page.meta.get(locator[len("meta:"):])
+        return values.get(locator)
+
+    price_text = read("price", texts)
+    if price_text is None or len(price_text) > MAX_PRICE_TEXT:
+        return None
+    currency = find_currency(read("currency", texts)) or template.get("currency_code")
+    price = parse_price(price_text, currency)
+    if not price:
+        return None
+    return {
+        "price": price,
+        "currency": currency,
+        "name": read("name", texts),
+        "main_image_url": read("main_image_url", images),
+    }
+
+
+# Structured data first: it is published for machines and rarely wrong
+EXTRACTORS: List[Tuple[str, Callable[[PageParser], Optional[dict]]]] = [
+    ("json-ld", from_json_ld),
+    ("microdata", from_microdata),
+    ("open-graph", from_open_graph),
+]
+
+
+class TemplateStore:
+    """Extraction templates per domain and page layout fingerprint.
+
+    A redesigned page gets a new fingerprint, so a template never reads a
+    layout it wasn't learned on. Templates of layouts a domain no longer
+    serves are dropped once `max_per_domain` newer ones were learned, or when
+    unused for `max_age_days`. A template whose price element is missing from
+    a page of its own layout is dropped right away.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_per_domain: int = 5, max_age_days: float = 30):
+        self.path = path
+        self.max_per_domain = max_per_domain
+        self.max_age = max_age_days * 86400
+        # domain -> fingerprint -> {"fields": {...}, "hits": n, "last_used": timestamp}
+        self.templates: Dict[str, Dict[str, dict]] = {}
+        # Extraction runs in worker threads while the sweep learns new templates
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(layouts) for layouts in self.templates.values())
+
+    def get(self, domain: str, fingerprint: str) -> Optional[dict]:
+        """Fields of the template for this layout, if one was learned"""
+        with self._lock:
+            template = self.templates.get(domain, {}).get(fingerprint)
+            return dict(template["fields"]) if template else None
+
+    def hit(self, domain: str, fingerprint: str) -> None:
+        with self._lock:
+            template = self.templates.get(domain, {}).get(fingerprint)
+            if template:
+                template["hits"] += 1
+                template["last_used"] = time.time()
+
+    def put(self, domain: str, fingerprint: str, fields: dict) -> None:
+        with self._lock:
+            layouts = self.templates.setdefault(domain, {})
+            previous = layouts.pop(fingerprint, None)
+            layouts[fingerprint] = {
+                "fields": fields,
+                "hits": previous["hits"] if previous else 0,
+                "last_used": time.time(),
+            }
+            while len(layouts) > self.max_per_domain:
+                del layouts[min(layouts, key=lambda key: layouts[key]["last_used"])]
+
+    def invalidate(self, domain: str, fingerprint: str) -> None:
+        with self._lock:
+            layouts = self.templates.get(domain, {})
+            layouts.pop(fingerprint, None)
+            if not layouts:
+                self.templates.pop(domain, None)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop templates unused for `max_age_days`; returns how many"""
+        cutoff = (now or time.time()) - self.max_age
+        dropped = 0
+        with self._lock:
+            for domain in list(self.templates):
+                layouts = self.templates[domain]
+                for fingerprint in [k for k, t in layouts.items() if t["last_used"] < cutoff]:
+                    del layouts[fingerprint]
+                    dropped += 1
+                if not layouts:
+                    del self.templates[domain]
+        return dropped
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.templates = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable extraction templates {self.path}: {e}")
+            return
+        self.prune()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Several worker processes may save at once; each writes its own file
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            templates = json.dumps(self.templates)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(templates)
+        os.replace(tmp_path, self.path)
+
+
+class LocalExtractor:
+    """Reads prices from a page's own markup before paying for an LLM extraction.
+
+    Tries schema.org JSON-LD offers, microdata and OpenGraph product tags,
+    then a template learned from an earlier Firecrawl extraction of a page
+    with the same domain and layout (see `learn`). Results look like a
+    Firecrawl scrape, with the extractor that matched under `metadata`. A
+    miss returns None.
+    """
+
+    def __init__(
+        self,
+        templates_path: Optional[str] = None,
+        max_templates_per_domain: int = 5,
+        template_max_age_days: float = 30,
+        fetch_timeout: float = 10.0,
+        fetch: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.templates = TemplateStore(templates_path, max_templates_per_domain, template_max_age_days)
+        self.fetch_timeout = fetch_timeout
+        self._fetch = fetch
+        self._http = requests.Session()
+        self._http.headers.update(FETCH_HEADERS)
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["LocalExtractor"]:
+        """The extractor configured by the LOCAL_EXTRACT_* settings, or None when disabled"""
+        if not settings.LOCAL_EXTRACT_ENABLED:
+            return None
+        return cls(
+            templates_path=settings.LOCAL_EXTRACT_TEMPLATES_PATH,
+            max_templates_per_domain=settings.LOCAL_EXTRACT_TEMPLATES_PER_DOMAIN,
+            template_max_age_days=settings.LOCAL_EXTRACT_TEMPLATE_MAX_AGE_DAYS,
+        )
+
+    @staticmethod
+    def domain(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def fetch(self, url: str) -> Optional[str]:
+        """The page's HTML, or None if it can't be fetched"""
+        if self._fetch is not None:
+            return self._fetch(url)
+        try:
+            response = self._http.get(url, timeout=self.fetch_timeout)
+        except requests.RequestException as e:
+            print(f"Page fetch failed for {url}: {e}")
+            return None
+        return response.text if response.ok else None
+
+    def extract(self, url: str, html: str) -> Optional[dict]:
+        """Price, currency, name and image read from the page, or None on a miss"""
+        page = parse_page(html)
+        for name, extractor in EXTRACTORS:
+            found = extractor(page)
+            if found:
+                return {"extract": found, "metadata": {"extractor": name, "sourceURL": url}}
+
+        domain, fingerprint = self.domain(url), layout_fingerprint(page)
+        template = self.templates.get(domain, fingerprint)
+        if template is None:
+            return None
+        found = from_template(page, template)
+        if found is None:
+            if template["price"] not in page.selector_counts:
+                # The layout changed below the fingerprint's depth
+                self.templates.invalidate(domain, fingerprint)
+            return None
+        self.templates.hit(domain, fingerprint)
+        return {
+            "extract": found,
+            "metadata": {"extractor": "template", "layout": fingerprint, "sourceURL": url},
+        }
+
+    def learn(self, url: str, html: str, details: dict) -> Optional[dict]:
+        """Learn a template for this page's layout from values extracted elsewhere.
+
+        `details` holds the price and, if known, the name, currency and image
+        URL. Returns the learned template, or None if the page doesn't show
+        the price.
+        """
+        page = parse_page(html)
+        template = learn_template(url, page, details)
+        if template is not None:
+            self.templates.put(self.domain(url), layout_fingerprint(page), template)
+        return template
+
+    def save(self) -> None:
+        self.templates.save()
@@ -0,0 +1,121 @@
+import re
+from typing import Any, Dict, Optional
+
+# Active ISO 4217 codes. Most have two minor units (cents); the rest are
+# listed in _MINOR_UNITS.
+ISO_4217 = frozenset(
+    """
+    AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BHD BIF BMD BND BOB BOV
+    BRL BSD BTN BWP BYN BZD CAD CDF CHE CHF CHW CLF CLP CNY COP COU CRC CUP CVE CZK
+    DJF DKK DOP DZD EGP ERN ETB EUR FJD FKP GBP GEL GHS GIP GMD GNF GTQ GYD HKD HNL
+    HTG HUF IDR ILS INR IQD IRR ISK JMD JOD JPY KES KGS KHR KMF KPW KRW KWD KYD KZT
+    LAK LBP LKR LRD LSL LYD MAD MDL MGA MKD MMK MNT MOP MRU MUR MVR MWK MXN MXV MYR
+    MZN NAD NGN NIO NOK NPR NZD OMR PAB PEN PGK PHP PKR PLN PYG QAR RON RSD RUB RWF
+    SAR SBD SCR SDG SEK SGD SHP SLE SOS SRD SSP STN SVC SYP SZL THB TJS TMT TND TOP
+    TRY TTD TWD TZS UAH UGX USD USN UYI UYU UYW UZS VED VES VND VUV WST XAF XCD XCG
+    XOF XPF YER ZAR ZMW ZWG
+    """.split()
+)
+_MINOR_UNITS = {
+    **dict.fromkeys(
+        ("BIF", "CLP", "DJF", "GNF", "ISK", "JPY", "KMF", "KRW", "PYG", "RWF", "UGX",
+         "UYI", "VND", "VUV", "XAF", "XOF", "XPF"),
+        0,
+    ),
+    **dict.fromkeys(("BHD", "IQD", "JOD", "KWD", "LYD", "OMR", "TND"), 3),
+    "CLF": 4,
+    "UYW": 4,
+}
+# Symbols and local abbreviations, as shops write them. Ambiguous ones map
+# to their most common currency; "$" means USD.
+CURRENCY_SYMBOLS: Dict[str, str] = {
+    "$": "USD", "US$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "円": "JPY",
+    "元": "CNY", "CN¥": "CNY", "RMB": "CNY", "₹": "INR", "Rs": "INR", "₩": "KRW",
+    "₽": "RUB", "₺": "TRY", "₪": "ILS", "₫": "VND", "₴": "UAH", "₦": "NGN",
+    "₱": "PHP", "฿": "THB", "₸": "KZT", "₼": "AZN", "₾": "GEL", "R$": "BRL",
+    "C$": "CAD", "CA$": "CAD", "A$": "AUD", "AU$": "AUD", "NZ$": "NZD",
+    "HK$": "HKD", "S$": "SGD", "MX$": "MXN", "NT$": "TWD", "zł": "PLN",
+    "Kč": "CZK", "Ft": "HUF", "lei": "RON", "DT": "TND", "د.ت": "TND",
+    "DH": "MAD", "د.م.": "MAD", "DA": "DZD", "د.ج": "DZD", "E£": "EGP",
+    "ج.م": "EGP", "ر.س": "SAR", "د.إ": "AED", "FCFA": "XOF", "CFA": "XOF",
+}
+_SYMBOLS_BY_UPPER = {symbol.upper(): code for symbol, code in CURRENCY_SYMBOLS.items()}
+
+# Digit groups joined by single separators; spaces only group thousands ("1 299,00")
+_NUMBER = re.compile(r"\d+(?:[.,']\d+|[ \u00a0\u202f]\d{3}(?!\d))*")
+_GROUPING = re.compile(r"[ '\u00a0\u202f]")
+
+
+def _token_pattern(token: str) -> str:
+    """`token` as a regex; letters at its ends must not continue a word"""
+    pattern = re.escape(token)
+    if token[0].isalpha():
+        pattern = r"(?<![^\W\d_])" + pattern
+    if token[-1].isalpha():
+        pattern += r"(?![^\W\d_])"
+    return pattern
+
+
+# Case-sensitive, so "all" is not ALL (lek); longest first, so "R$" wins over "$"
+_CURRENCY = re.compile(
+    "|".join(
+        _token_pattern(token)
+        for token in sorted(ISO_4217 | CURRENCY_SYMBOLS.keys(), key=len, reverse=True)
+    )
+)
+
+
+def minor_units(currency: Optional[str]) -> int:
+    """Decimal places of a currency's amounts: 2 for USD, 0 for JPY, 3 for TND"""
+    return _MINOR_UNITS.get((currency or "").upper(), 2)
+
+
+def normalize_currency(value: Optional[str]) -> Optional[str]:
+    """ISO code of a currency code or symbol ("$" is USD), or None if unknown"""
+    token = (value or "").strip().upper()
+    if token in ISO_4217:
+        return token
+    return _SYMBOLS_BY_UPPER.get(token)
+
+
+def find_currency(text: Optional[str]) -> Optional[str]:
+    """ISO code of the first currency code or symbol in `text`"""
+    if not text:
+        return None
+    match = _CURRENCY.search(str(text))
+    return normalize_currency(match.group()) if match else None
+
+
+def parse_price(value: Any, currency: Optional[str] = None) -> Optional[float]:
+    """A positive price from a number or a text like "$1,299.99", "1.299,00 €" or "TND 1 299,000".
+
+    With both separators the last one is the decimal point. A lone separator
+    that repeats or is followed by exactly three digits groups thousands,
+    unless the currency (given, or found in the text) has three decimals.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else None
+    text = str(value or "")
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    number = _GROUPING.sub("", match.group())
+    decimal = max(number.rfind("."), number.rfind(","))
+    if decimal != -1:
+        separator = number[decimal]
+        other = "," if separator == "." else "."
+        digits_after = len(number) - decimal - 1
+        if other not in number and (
+            number.count(separator) > 1
+            or (digits_after == 3 and minor_units(currency or find_currency(text)) != 3)
+        ):
+            number = number.replace(separator, "")
+        else:
+            number = number[:decimal].replace(".", "").replace(",", "") + "." + number[decimal + 1:]
+    try:
+        price = float(number)
+    except ValueError:
+        return None
+    return price if price > 0 else None
@@ -1,51 +1,194 @@
-import aiohttp
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING, Deque, List, Optional
+
 from src.config import settings
+from src.infrastructure.metrics import metrics
 
+if TYPE_CHECKING:
+    import aiohttp
 
-async def send_price_alert(
+# Discord limits per webhook message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_DESCRIPTION_CHARS = 4096
+
+
+def price_alert_embed(
     product_name: str, old_price: float, new_price: float, url: str
-):
-    """Send a price drop alert to Discord"""
+) -> dict:
+    """Build the Discord embed of a price drop alert"""
     drop_percentage = ((old_price - new_price) / old_price) * 100
+    return {
+        "title": "Price Drop Alert! 🎉",
+        "description": f"**{product_name}**\nPrice dropped by {drop_percentage:.1f}%!\n"
+        f"Old price: ${old_price:.2f}\n"
+        f"New price: ${new_price:.2f}\n"
+        f"[View Product]({url})",
+        "color": 3066993,
+    }
 
-    message = {
-        "embeds": [
-            {
-                "title": "Price Drop Alert! 🎉",
-                "description": f"**{product_name}**\nPrice dropped by {drop_percentage:.1f}%!\n"
-                f"Old price: ${old_price:.2f}\n"
-                f"New price: ${new_price:.2f}\n"
-                f"[View Product]({url})",
-                "color": 3066993,
-            }
-        ]
+
+def price_error_embed(product_name: str, url: str, error) -> dict:
+    """Build the Discord embed of a price update error"""
+    return {
+        "title": "Price Update Error",
+        "description": f"**{product_name}**\n Got an error while updating the price\n"
+        f"[View Product]({url})\n"
+        f"Error: {error}\n",
+        "color": 3066993,
     }
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            await session.post(settings.DISCORD_WEBHOOK_URL, json=message)
-    except Exception as e:
-        print(f"Error sending Discord notification: {e}")
 
-async def send_price_error(product_name: str, url: str, error: str):
-    message = {
-        "embeds": [
-            {
-                "title": "Price Update Error",
-                "description": f"**{product_name}**\n Got an error while updating the price\n"
-                f"[View Product]({url})\n"
-                f"Error: {error}\n",  # Make sure you have the correct format and commas
-                "color": 3066993,
+def _embed_size(embed: dict) -> int:
+    return len(embed.get("title", "")) + len(embed.get("description", ""))
+
+
+class DiscordNotifier:
+    """Queues Discord embeds and delivers them in packed webhook messages.
+
+    One pooled HTTP session is kept for the notifier's lifetime, up to ten
+    embeds go out per request and 429 responses are retried after the delay
+    Discord asks for. Use it as an async context manager; leaving the block
+    flushes whatever is still queued.
+    """
+
+    def __init__(
+        self,
+        webhook_url: Optional[str] = None,
+        max_retries: int = 5,
+        session: Optional["aiohttp.ClientSession"] = None,
+    ):
+        self.webhook_url = webhook_url or settings.DISCORD_WEBHOOK_URL
+        self.max_retries = max_retries
+        self.sent_messages = 0
+        self._queue: Deque[dict] = deque()
+        self._session = session
+        self._owns_session = session is None
+        self._send_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "DiscordNotifier":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        try:
+            await self.flush()
+        finally:
+            await self.close()
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def add(self, embed: dict) -> None:
+        """Queue an embed for the next flush"""
+        if len(embed.get("description", "")) > MAX_DESCRIPTION_CHARS:
+            embed = {
+                **embed,
+                "description": embed["description"][: MAX_DESCRIPTION_CHARS - 1] + "…",
             }
-        ]
-    }
+        self._queue.append(embed)
+
+    def add_price_alert(
+        self, product_name: str, old_price: float, new_price: float, url: str
+    ) -> None:
+        self.add(price_alert_embed(product_name, old_price, new_price, url))
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(settings.DISCORD_WEBHOOK_URL, json=message) as response:
-                if response.status == 204:  # No Content status for successful POST
-                    print(f"Error notification sent for {product_name}")
-                else:
-                    print(f"Failed to send error notification. Status code: {response.status}")
-    except Exception as e:
-        print(f"Error sending Discord notification: {e}")
\ No newline at end of file
+    def add_price_error(self, product_name: str, url: str, error) -> None:
+        self.add(price_error_embed(product_name, url, error))
+
+    async def send_full_batches(self) -> None:
+        """Send queued embeds while a full message worth is waiting"""
+        while len(self._queue) >= MAX_EMBEDS_PER_MESSAGE:
+            await self._send_next_message()
+
+    async def flush(self) -> None:
+        """Send everything that is queued"""
+        while self._queue:
+            await self._send_next_message()
+
+    async def close(self) -> None:
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    def _next_message(self) -> List[dict]:
+        embeds, size = [], 0
+        while self._queue and len(embeds) < MAX_EMBEDS_PER_MESSAGE:
+            embed_size = _embed_size(self._queue[0])
+            if embeds and size + embed_size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            embeds.append(self._queue.popleft())
+            size += embed_size
+        return embeds
+
+    async def _send_next_message(self) -> None:
+        async with self._send_lock:
+            embeds = self._next_message()
+            if embeds:
+                await self._post({"embeds": embeds})
+
+    @metrics.timed("discord.post")
+    async def _post(self, message: dict) -> bool:
+        if self._session is None:
+            # aiohttp is slow to import and only needed once there is something to send
+            import aiohttp
+
+            self._session = aiohttp.ClientSession()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._session.post(self.webhook_url, json=message) as response:
+                    if response.status == 429:
+                        metrics.increment("discord.rate_limited")
+                        retry_after = await self._retry_after(response)
+                        print(f"Discord rate limit hit, retrying in {retry_after:.2f}s")
+                        await asyncio.sleep(retry_after)
+                        continue
+                    if response.status in (200, 204):
+                        self.sent_messages += 1
+                        metrics.increment("discord.messages")
+                        metrics.increment("discord.embeds", len(message.get("embeds", ())))
+                        return True
+                    metrics.increment("discord.failures")
+                    print(f"Failed to send Discord notification. Status code: {response.status}")
+                    return False
+            except Exception as e:
+                if attempt == self.max_retries:
+                    metrics.increment("discord.failures")
+                    print(f"Error sending Discord notification: {e}")
+                    return False
+                await asyncio.sleep(2**attempt)
+        print("Giving up on Discord notification after repeated rate limiting")
+        return False
+
+    async def _retry_after(self, response: "aiohttp.ClientResponse") -> float:
+        """Seconds Discord wants us to wait, from the headers or the JSON body"""
+        header = response.headers.get("Retry-After") or response.headers.get(
+            "X-RateLimit-Reset-After"
+        )
+        if header:
+            return float(header)
+        try:
+            return float((await response.json()).get("retry_after", 1.0))
+        except Exception:
+            return 1.0
+
+
+async def send_embeds(embeds: List[dict]) -> None:
+    """Deliver a few embeds right away, packed into as few messages as possible"""
+    async with DiscordNotifier() as notifier:
+        for embed in embeds:
+            notifier.add(embed)
+
+
+async def send_price_alert(
+    product_name: str, old_price: float, new_price: float, url: str
+):
+    """Send a price drop alert to Discord"""
+    await send_embeds([price_alert_embed(product_name, old_price, new_price, url)])
+
+
+async def send_price_error(product_name: str, url: str, error: str):
+    """Send a price update error to Discord"""
+    await send_embeds([price_error_embed(product_name, url, error)])
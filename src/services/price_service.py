@@ -1,84 +1,256 @@
 #price_service
-from typing import List
+from datetime import datetime, timedelta
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple, Union
 from firecrawl import FirecrawlApp
 
 from src.config import settings
-from src.domain.models import Product, ProductCreate, PriceHistoryCreate,PriceHistory
+from src.domain.models import Product, ProductCreate, PriceHistoryCreate, PriceHistory, SweepProduct
+from src.infrastructure.database.async_session import supports_async
+from src.infrastructure.metrics import metrics
+from src.infrastructure.repositories.async_product_repository import (
+    AsyncProductRepository,
+    open_async_repository,
+)
 from src.infrastructure.repositories.product_repository import ProductRepository
+from src.services.batch_extractor import extract_prices
+from src.services.check_engine import CheckEngine, SweepResult
+from src.services.local_extractor import LocalExtractor
+from src.services.scheduler import AdaptiveScheduler, compute_signals
+from src.services.scrape_cache import ScrapeCache
 import os
 import asyncio
 
 from dotenv import load_dotenv
-import time
-from src.services.notifications import send_price_error,send_price_alert
+from src.services.notifications import price_alert_embed, price_error_embed, send_embeds
 load_dotenv()
 
 
 class PriceService:
-    def __init__(self, product_repository: ProductRepository):
+    def __init__(
+        self,
+        product_repository: ProductRepository,
+        firecrawl: Optional[FirecrawlApp] = None,
+        async_repository: Optional[AsyncProductRepository] = None,
+    ):
         self.repository = product_repository
-        self.firecrawl = FirecrawlApp(api_key=os.getenv('FIRECRAWL_API_KEY'))
+        # Used by sweeps so database calls don't block the event loop; when
+        # missing, each sweep opens its own (see CHECK_ASYNC_DB)
+        self.async_repository = async_repository
+        # The app passes in the one client it caches per server
+        self.firecrawl = firecrawl or FirecrawlApp(api_key=os.getenv('FIRECRAWL_API_KEY'))
+        self.api_key = self.firecrawl.api_key
+        # Kept across adaptive ticks, which carry over unspent budget
+        self.scheduler: Optional[AdaptiveScheduler] = None
 
-
-        
-    def update_price(self,product : Product )-> Product :
-            # Get latest price
-            params = {
+    @metrics.timed("firecrawl.scrape")
+    def scrape(self, product: Product) -> dict:
+        """Fetch the raw Firecrawl extraction for a product"""
+        params = {
             "formats": ["extract"],
             "extract": {
                 "schema": ProductCreate.model_json_schema(),
             }
         }
-            
-            scraped_data = self.firecrawl.scrape_url(product.url, params=params) # type: ignore
-            try :
-                new_price = float(scraped_data["extract"]["price"])
-                if not new_price : new_price = float(scraped_data["metadata"]["price"])
-            except Exception as e:
-                 asyncio.run(send_price_error(product.name,product.url,f"No price Found : {e}"))
-                 new_price=product.price
-            cabin_type = scraped_data["extract"].get("cabin_type")  # Extract cabin type from Firecrawl response
-            if product.price<new_price:
-                 asyncio.run(send_price_alert(product.name,product.price,new_price,product.url)) 
-            # Get all price history for the product
-            price_history = self.repository.get_price_history(product.url)
-
-            # Find the lowest price across all cabin types
-            lowest_price = min([ph.price for ph in price_history], default=new_price)
-
-            # Save new price history
-            price_history = PriceHistoryCreate(
-                product_url=product.url,
-                price=new_price,
-                product_name=product.name,
-                cabin_type=cabin_type,
-                is_lowest=(new_price <= lowest_price),  # Mark as lowest if applicable
+        return self.firecrawl.scrape_url(product.url, params=params) # type: ignore
+
+    def scrape_cache_key(self, product: Product) -> str:
+        """Key of a product's extraction in the scrape cache"""
+        return ScrapeCache.key(product.url, product.prompt, ProductCreate.model_json_schema())
+
+    @metrics.timed("firecrawl.extract_batch")
+    def extract_batch(self, products: List[Product]) -> dict:
+        """Extract prices for products sharing a prompt in one Firecrawl request"""
+        return extract_prices(self.firecrawl, products)
+
+    @metrics.timed("check.parse")
+    def parse_scrape(
+        self, product: Product, scraped_data: dict
+    ) -> Tuple[float, Optional[str], Optional[str]]:
+        """Return (new_price, cabin_type, error) from a scrape result.
+
+        When no price can be read the previous price is kept and the error
+        message is returned so the caller can report it.
+        """
+        error = None
+        try :
+            new_price = float(scraped_data["extract"]["price"])
+            if not new_price : new_price = float(scraped_data["metadata"]["price"])
+        except Exception as e:
+            error = str(e)
+            new_price = product.price
+        cabin_type = (scraped_data.get("extract") or {}).get("cabin_type")  # Extract cabin type from Firecrawl response
+        return new_price, cabin_type, error
+
+    @metrics.timed("check.build_update")
+    def build_price_update(
+        self, product: Product, new_price: float, cabin_type: Optional[str] = None
+    ) -> PriceHistoryCreate:
+        """Build the price history entry for a new price and apply it to the product"""
+        if isinstance(product, SweepProduct):
+            # Loaded with the product, no query needed
+            return self._price_update(product, new_price, cabin_type, product.min_price)
+        stats = self.repository.get_price_stats(product.url)
+        return self._price_update(product, new_price, cabin_type, stats.min_price if stats else None)
+
+    async def build_price_update_async(
+        self, product: Product, new_price: float, cabin_type: Optional[str] = None
+    ) -> PriceHistoryCreate:
+        """`build_price_update` reading the stats through the async repository, if any"""
+        if self.async_repository is None or isinstance(product, SweepProduct):
+            return self.build_price_update(product, new_price, cabin_type)
+        with metrics.span("check.build_update"):
+            stats = await self.async_repository.get_price_stats(product.url)
+            return self._price_update(
+                product, new_price, cabin_type, stats.min_price if stats else None
             )
-            self.repository.add_price_history(price_history)
 
-            # Update product price in database
-            product.price = new_price
-            self.repository.update(product)
-            return product
+    def _price_update(
+        self,
+        product: Union[Product, SweepProduct],
+        new_price: float,
+        cabin_type: Optional[str],
+        min_price: Optional[float],
+    ) -> PriceHistoryCreate:
+        # The lowest price across all cabin types, from the running stats
+        lowest_price = new_price if min_price is None else min_price
+
+        product.price = new_price
+        return PriceHistoryCreate(
+            product_url=product.url,
+            price=new_price,
+            product_name=product.name,
+            cabin_type=cabin_type,
+            is_lowest=(new_price <= lowest_price),  # Mark as lowest if applicable
+        )
+
+    @metrics.timed("check.persist")
+    def save_price_updates(self, updates: List[PriceHistoryCreate]) -> int:
+        """Persist a batch of price updates in a single transaction"""
+        return self.repository.apply_price_updates(updates)
+
+    async def save_price_updates_async(self, updates: List[PriceHistoryCreate]) -> int:
+        """`save_price_updates` through the async repository, if any"""
+        if self.async_repository is None:
+            return self.save_price_updates(updates)
+        with metrics.span("check.persist"):
+            return await self.async_repository.apply_price_updates(updates)
 
-            
+    def record_price(
+        self, product: Product, new_price: float, cabin_type: Optional[str] = None
+    ) -> Product:
+        """Store a new price history entry and update the product"""
+        self.save_price_updates([self.build_price_update(product, new_price, cabin_type)])
+        return product
 
-    def check_prices(self) -> List[Product]:
+    @metrics.timed("price_service.update_price")
+    def update_price(self,product : Product )-> Product :
+        """Scrape and record the latest price of a single product"""
+        scraped_data = self.scrape(product)
+        new_price, cabin_type, error = self.parse_scrape(product, scraped_data)
+        embeds = []
+        if error:
+            embeds.append(price_error_embed(product.name,product.url,f"No price Found : {error}"))
+        if new_price<product.price:
+            embeds.append(price_alert_embed(product.name,product.price,new_price,product.url))
+        if embeds:
+            # One event loop and one HTTP session for all notifications
+            asyncio.run(send_embeds(embeds))
+        return self.record_price(product, new_price, cabin_type)
+
+    async def check_prices(self, batch: Optional[bool] = None) -> List[SweepProduct]:
         """Check prices for all tracked products and send alerts if needed"""
-        products = self.repository.get_all()
-        updated_products = []
+        return await self.check_products(self.repository.get_sweep_products(), batch=batch)
+
+    async def check_due_prices(
+        self,
+        window: Optional[timedelta] = None,
+        scheduler: Optional[AdaptiveScheduler] = None,
+        batch: Optional[bool] = None,
+    ) -> List[SweepProduct]:
+        """Check only the products the adaptive scheduler says are due"""
+        return await self.check_products(self.due_products(window, scheduler), batch=batch)
+
+    def due_products(
+        self, window: Optional[timedelta] = None, scheduler: Optional[AdaptiveScheduler] = None
+    ) -> List[SweepProduct]:
+        """Products the adaptive scheduler wants checked now, most overdue first.
+
+        `window` is the time until the next call; it caps how many products
+        fit in the scrapes-per-hour budget on this call.
+        """
+        window = window or timedelta(minutes=settings.SCHEDULER_TICK_MINUTES)
+        if scheduler is None:
+            if self.scheduler is None:
+                self.scheduler = AdaptiveScheduler()
+            scheduler = self.scheduler
+        products = {p.url: p for p in self.repository.get_sweep_products()}
+        now = datetime.utcnow()
+        signals = compute_signals(
+            self.repository.get_recent_price_history(settings.SCHEDULER_HISTORY_POINTS),
+            now,
+            settings.PRICE_DROP_THRESHOLD,
+        )
+        due = scheduler.due(signals, list(products), now, window)
+        print(f"{len(due)} of {len(products)} products due for a price check")
+        return [products[url] for url in due]
+
+    async def check_products(
+        self, products: List[Union[Product, SweepProduct]], batch: Optional[bool] = None
+    ) -> List[Union[Product, SweepProduct]]:
+        """Check prices for the given products and send alerts if needed"""
+        if not products:
+            return []
+        return (await self.run_checks(products, batch=batch)).updated_products
+
+    @metrics.timed("check.sweep")
+    async def run_checks(
+        self,
+        products: List[Union[Product, SweepProduct]],
+        batch: Optional[bool] = None,
+        **engine_options,
+    ) -> SweepResult:
+        """Run the check engine over products; `engine_options` go to `CheckEngine`"""
+        if batch is None:
+            batch = settings.CHECK_BATCH_MODE
+        scrape_cache = None
+        if settings.SCRAPE_CACHE_ENABLED:
+            scrape_cache = ScrapeCache(
+                path=settings.SCRAPE_CACHE_PATH,
+                ttl=settings.SCRAPE_CACHE_TTL_HOURS * 3600,
+                max_entries=settings.SCRAPE_CACHE_MAX_ENTRIES,
+            )
+        local_extractor = LocalExtractor.from_settings(settings)
+        async with self.use_async_repository():
+            engine = CheckEngine(
+                self, scrape_cache=scrape_cache, local_extractor=local_extractor, **engine_options
+            )
+            return await engine.run(products, batch=batch)
+
+    @asynccontextmanager
+    async def use_async_repository(self) -> AsyncIterator[None]:
+        """Keep an async repository on the same database open for the block.
 
-        for product in products:
+        Sweeps run inside the block share it; does nothing when one is set
+        already, CHECK_ASYNC_DB is off or the database is in-memory SQLite.
+        Sweeps fall back to the sync session when the async driver (aiosqlite,
+        asyncpg) is not installed or can't connect.
+        """
+        db_url = self.repository.session.get_bind().url
+        if (
+            self.async_repository is not None
+            or not settings.CHECK_ASYNC_DB
+            or not supports_async(db_url)
+        ):
+            yield
+            return
+        stack = AsyncExitStack()
+        try:
+            self.async_repository = await stack.enter_async_context(open_async_repository(db_url))
+        except Exception as e:
+            print(f"Async database unavailable, using the sync session: {e}")
+        async with stack:
             try:
-                # Get latest price
-                
-                updated_product= self.update_price(product)
-                updated_products.append(updated_product)
-                # make a buffer between each request to deal with rate limiter
-                time.sleep(10)
-            except Exception as e:
-                asyncio.run(send_price_error(product.name,product.url,e))
-                print(f"Error checking price for {product.url}: {e}")
-                continue
-
-        return updated_products
\ No newline at end of file
+                yield
+            finally:
+                self.async_repository = None
@@ -1,22 +1,75 @@
 from typing import Tuple, Optional, Dict, Any
 from datetime import datetime
-from urllib.parse import urlparse
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse
 import re
 from dotenv import load_dotenv
 from firecrawl import FirecrawlApp
 from src.domain.models import ProductCreate, PriceHistoryCreate
+from src.infrastructure.metrics import metrics
 from src.infrastructure.repositories.product_repository import ProductRepository
+from src.services.export import to_csv_bytes, to_parquet_bytes
+from src.services.local_extractor import LocalExtractor
+from src.services.money import normalize_currency, parse_price
 import os
-import pandas as pd
 
 
 load_dotenv()
 
+# Key patterns of each product field, most telling first
+FIELD_PATTERNS = {
+    "name": ("name", "title", "product"),
+    "price": ("price", "amount", "cost"),
+    "currency": ("currency", "curr", "symbol"),
+    "main_image_url": ("image", "img", "photo", "picture"),
+}
+_COMPILED_FIELD_PATTERNS = tuple(
+    (field, tuple(re.compile(pattern, re.IGNORECASE) for pattern in patterns))
+    for field, patterns in FIELD_PATTERNS.items()
+)
+
+
+@lru_cache(maxsize=4096)
+def classify_key(key: str) -> Tuple[Tuple[str, int], ...]:
+    """(field, rank of the first matching pattern) of each field `key` may hold.
+
+    Scraped dicts reuse a handful of keys, so each is only classified once.
+    """
+    matches = []
+    for field, patterns in _COMPILED_FIELD_PATTERNS:
+        rank = next((rank for rank, pattern in enumerate(patterns) if pattern.search(key)), None)
+        if rank is not None:
+            matches.append((field, rank))
+    return tuple(matches)
+
+
+def match_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """The value of each field in one scan over `data`.
+
+    A field takes the value of the first key matching its best-ranked
+    pattern, as if each pattern were tried over all keys in turn.
+    """
+    best: Dict[str, Tuple[int, Any]] = {}
+    for key, value in data.items():
+        for field, rank in classify_key(key):
+            if field not in best or rank < best[field][0]:
+                best[field] = (rank, value)
+    return {field: value for field, (_, value) in best.items()}
+
 
 class ProductService:
-    def __init__(self, product_repository: ProductRepository):
+    def __init__(
+        self,
+        product_repository: ProductRepository,
+        firecrawl: Optional[FirecrawlApp] = None,
+        local_extractor: Optional[LocalExtractor] = None,
+    ):
         self.repository = product_repository
-        self.firecrawl = FirecrawlApp(api_key=os.getenv('FIRECRAWL_API_KEY'))
+        # The app passes in the one client it caches per server
+        self.firecrawl = firecrawl or FirecrawlApp(api_key=os.getenv('FIRECRAWL_API_KEY'))
+        self.api_key = self.firecrawl.api_key
+        # Products whose page publishes structured data are added without Firecrawl
+        self.local_extractor = local_extractor
 
     def _validate_url(self, url: str) -> bool:
         """Validate URL format"""
@@ -29,9 +82,15 @@ class ProductService:
 
 
 
-    def get_csv_file(self ,product_url : str ):
-        return self.repository.get_csv_prices(product_url)
+    def get_csv_file(self, product_url: Optional[str] = None) -> bytes:
+        """Price history of a product (or of all products) as CSV"""
+        return to_csv_bytes(self.repository, product_url)
+
+    def get_parquet_file(self, product_url: Optional[str] = None) -> bytes:
+        """Price history of a product (or of all products) as Parquet"""
+        return to_parquet_bytes(self.repository, product_url)
 
+    @metrics.timed("product_service.add_product")
     async def add_product(self, url: str, prompt: str = None) -> Tuple[bool, str]:
         """Add a new product to track"""
         if not self._validate_url(url):
@@ -65,15 +124,32 @@ class ProductService:
             print(f"Error: {str(e)}")
             return False, f"Error adding product: {str(e)}"
 
+    @metrics.timed("product_service.scrape_product")
     async def _scrape_product(self, url: str, prompt: str ) -> ProductCreate:
         """Scrape product details from any e-commerce website"""
-
+        html = None
+        if not prompt and self.local_extractor is not None:
+            html, product = self.extract_locally(url)
+            if product is not None:
+                return product
+        product = self.extract_with_firecrawl(url, prompt, html)
+        if html:
+            self.local_extractor.save()
+        return product
+
+    def extract_with_firecrawl(self, url: str, prompt: str = None, html: Optional[str] = None) -> ProductCreate:
+        """Extract product details with Firecrawl's LLM extraction.
+
+        The page's `html`, if already fetched, teaches the local extractor a
+        template for the page's layout (saved by the caller).
+        """
         params = {
             'prompt': prompt,
             'schema': ProductCreate.model_json_schema(),
         }
 
-        data = self.firecrawl.extract([url],params)
+        with metrics.span("firecrawl.extract"):
+            data = self.firecrawl.extract([url],params)
         product_data = data["data"]
 
 
@@ -87,63 +163,61 @@ class ProductService:
         # Include the prompt field in the ProductCreate model
         product_data["prompt"] = prompt
 
-
-        return ProductCreate(**product_data)
+        product = ProductCreate(**product_data)
+        if html:
+            # Later products of this shop and layout are read from their pages
+            self.local_extractor.learn(url, html, product.model_dump())
+        return product
+
+    def extract_locally(self, url: str) -> Tuple[Optional[str], Optional[ProductCreate]]:
+        """(page HTML, product read from it), if the page names the product and its price"""
+        with metrics.span("product_service.local_extract"):
+            html = self.local_extractor.fetch(url)
+            found = self.local_extractor.extract(url, html) if html else None
+        details = (found or {}).get("extract") or {}
+        if not (details.get("name") and details.get("price") and details.get("currency")):
+            return html, None
+        return html, ProductCreate(
+            url=url,
+            name=details["name"],
+            price=details["price"],
+            currency=self._normalize_currency(details["currency"]),
+            main_image_url=urljoin(url, details.get("main_image_url") or ""),
+            check_date=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        )
 
     def _extract_product_details(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract product details from a dictionary using a generalized approach"""
         product_data = {}
-
-        # Helper function to find a value by key pattern
-        def find_value_by_pattern(patterns, default=None):
-            for pattern in patterns:
-                for key, value in data.items():
-                    if re.search(pattern, key, re.IGNORECASE):
-                        return value
-            return default
+        fields = match_fields(data)
 
         # Extract product name
-        product_data["name"] = find_value_by_pattern(
-            ["name", "title", "product"], default="Unknown Product"
-        )
-
-        # Extract product price
-        price = find_value_by_pattern(["price", "amount", "cost"])
-        if price:
-            try:
-                # Remove currency symbols and commas, then convert to float
-                price = float(re.sub(r"[^\d.]", "", str(price)))
-                product_data["price"] = price
-            except (ValueError, TypeError):
-                print(f"Warning: Invalid price value '{price}'. Skipping.")
+        product_data["name"] = fields.get("name", "Unknown Product")
 
         # Extract currency
-        currency = find_value_by_pattern(["currency", "curr", "symbol"])
+        currency = fields.get("currency")
         if currency:
             # Normalize currency to a 3-letter code (e.g., USD, EUR)
             currency = self._normalize_currency(currency)
         product_data["currency"] = currency or "USD"  # Default to USD
 
+        # Extract product price; "1.299,00 €" and "TND 1 299,000" depend on the currency
+        price = fields.get("price")
+        if price:
+            parsed = parse_price(price, currency)
+            if parsed is not None:
+                product_data["price"] = parsed
+            else:
+                print(f"Warning: Invalid price value '{price}'. Skipping.")
+
         # Extract main image URL
-        product_data["main_image_url"] = find_value_by_pattern(
-            ["image", "img", "photo", "picture"], default=""
-        )
+        product_data["main_image_url"] = fields.get("main_image_url", "")
 
         return product_data
 
     def _normalize_currency(self, currency: str) -> str:
         """Normalize currency to a 3-letter code (e.g., USD, EUR)"""
-        currency = currency.upper()
-        # Map common currency symbols to codes
-        currency_map = {
-            "$": "USD",
-            "€": "EUR",
-            "£": "GBP",
-            "¥": "JPY",
-            "₹": "INR",
-            "TND": "TND",  # Add more mappings as needed
-        }
-        return currency_map.get(currency, currency)
+        return normalize_currency(currency) or currency.upper()
 
     def remove_product(self, url: str) -> None:
         """Remove a product and its price history"""
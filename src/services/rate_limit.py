@@ -0,0 +1,62 @@
+import asyncio
+import time
+from typing import Callable, Dict, Hashable
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until `tokens` are available and take them.
+
+        Requests larger than the bucket wait for a full bucket and leave it in
+        debt, so the long-run rate still holds for later callers.
+        """
+        needed = min(tokens, self.capacity)
+        # The lock keeps waiters in FIFO order so nobody starves
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+
+
+class KeyedRateLimiter:
+    """One token bucket per key (API key, domain, ...), created on first use"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    def bucket(self, key: Hashable) -> TokenBucket:
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return self._buckets[key]
+
+    async def acquire(self, key: Hashable, tokens: float = 1.0) -> None:
+        await self.bucket(key).acquire(tokens)
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Optional, Tuple
+
+import requests
+
+# Parts of a page that change on every request without the product changing
+_VOLATILE_MARKUP = re.compile(
+    r"<style\b.*?</style>|<!--.*?-->|<noscript\b.*?</noscript>",
+    re.IGNORECASE | re.DOTALL,
+)
+_SCRIPT = re.compile(r"<script\b([^>]*)>(.*?)</script>", re.IGNORECASE | re.DOTALL)
+# JSON-LD and hydration data often hold the price, so they stay in the hash
+_DATA_SCRIPT_TYPE = re.compile(r"""type\s*=\s*["']?application/(?:ld\+)?json""", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; automated-price-tracking/0.1)",
+    "Accept": "text/html,application/xhtml+xml",
+}
+
+
+@dataclass
+class PageFingerprint:
+    """What a cheap fetch tells us about a page"""
+
+    content_hash: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # The fetched page itself, for the local extractor; never stored
+    html: Optional[str] = field(default=None, repr=False, compare=False)
+
+
+@dataclass
+class CacheEntry:
+    payload: dict
+    content_hash: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+def content_hash(html: str) -> str:
+    """Hash of a page with code scripts, styles, comments and whitespace removed.
+
+    Only the bodies of JSON data scripts are kept, without their attributes
+    (which may hold a per-request nonce).
+    """
+    text = _SCRIPT.sub(
+        lambda m: m.group(2) if _DATA_SCRIPT_TYPE.search(m.group(1)) else "", html
+    )
+    text = _VOLATILE_MARKUP.sub("", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ScrapeCache:
+    """Extraction results keyed by URL, prompt and schema, with TTL + LRU eviction.
+
+    Before paying for a new extraction, `revalidate` does a plain conditional
+    GET of the page: a 304, or a body that hashes the same as when the entry
+    was stored, means the cached extraction is still good.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 24 * 3600,
+        max_entries: int = 10_000,
+        fetch_timeout: float = 10.0,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fetch_timeout = fetch_timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # Revalidation runs in worker threads while the sweep stores results
+        self._lock = threading.Lock()
+        self._http = requests.Session()
+        self._http.headers.update(FETCH_HEADERS)
+        if path:
+            self.load()
+
+    @staticmethod
+    def key(url: str, prompt: Optional[str], schema: dict) -> str:
+        raw = json.dumps([url, prompt or "", schema], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get a fresh entry, dropping it if it outlived the TTL"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, payload: dict, fingerprint: PageFingerprint) -> None:
+        """Store an extraction along with the page fingerprint it came from"""
+        entry = CacheEntry(
+            payload=payload,
+            content_hash=fingerprint.content_hash,
+            etag=fingerprint.etag,
+            last_modified=fingerprint.last_modified,
+            stored_at=time.time(),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def revalidate(self, key: str, url: str) -> Tuple[Optional[dict], PageFingerprint]:
+        """Return (cached payload or None, fingerprint of the current page).
+
+        The fingerprint of a miss should be stored with the new extraction via
+        `put`, so the next sweep can validate against it.
+        """
+        entry = self.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            response = self._http.get(url, headers=headers, timeout=self.fetch_timeout)
+        except requests.RequestException as e:
+            print(f"Cheap fetch failed for {url}: {e}")
+            self.misses += 1
+            return None, PageFingerprint()
+
+        if response.status_code == 304 and entry is not None:
+            self.hits += 1
+            return entry.payload, PageFingerprint(
+                entry.content_hash, entry.etag, entry.last_modified
+            )
+
+        fingerprint = PageFingerprint(
+            content_hash=content_hash(response.text) if response.ok else None,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            html=response.text if response.ok else None,
+        )
+        if (
+            entry is not None
+            and fingerprint.content_hash is not None
+            and fingerprint.content_hash == entry.content_hash
+        ):
+            self.hits += 1
+            return entry.payload, fingerprint
+
+        self.misses += 1
+        return None, fingerprint
+
+    def load(self) -> None:
+        """Load persisted entries, skipping expired ones"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw_entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable scrape cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, raw in raw_entries.items():
+            entry = CacheEntry(**raw)
+            if now - entry.stored_at <= self.ttl:
+                self._entries[key] = entry
+
+    def save(self) -> None:
+        """Persist entries, least recently used first"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Several worker processes may save at once; each writes its own file
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            raw_entries = {key: asdict(entry) for key, entry in self._entries.items()}
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(raw_entries, f)
+        os.replace(tmp_path, self.path)
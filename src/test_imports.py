@@ -1,9 +1,10 @@
 from src.infrastructure.repositories.product_repository import ProductRepository
-from src.infrastructure.database import SessionLocal
+from src.infrastructure.database import SessionLocal, init_db
 from src.domain.models import ProductCreate, PriceHistoryCreate
 from datetime import datetime
 
-# Create a session
+# Create the schema and a session
+init_db()
 session = SessionLocal()
 
 # Create repository
@@ -1,6 +1,167 @@
+import asyncio
 import os
 import sys
+import time
+from datetime import datetime
 
 # Add the src directory to Python path
 src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, src_path)
+
+# Settings are read on import; give the required ones harmless test values
+os.environ.setdefault("FIRECRAWL_API_KEY", "test-key")
+os.environ.setdefault("DISCORD_WEBHOOK_URL", "http://localhost/webhook")
+os.environ.setdefault("POSTGRES_URL", "")
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.domain.models import PriceHistoryCreate, Product, ProductCreate  # noqa: E402
+from src.infrastructure.database.models import Base  # noqa: E402
+from src.infrastructure.repositories.product_repository import ProductRepository  # noqa: E402
+
+
+@pytest.fixture
+def engine():
+    """An empty in-memory database; modules override it for a file database"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def repository(session):
+    return ProductRepository(session)
+
+
+def make_product(url, price=100.0, prompt=None):
+    return Product(
+        url=url,
+        name="Test Product",
+        price=price,
+        currency="USD",
+        check_date=datetime.now().isoformat(),
+        main_image_url="https://example.com/image.jpg",
+        prompt=prompt,
+    )
+
+
+def add_products(repository, count, price=100.0):
+    """Add products https://example.com/product/0, 1, ... named "Product 0", ..."""
+    urls = [f"https://example.com/product/{i}" for i in range(count)]
+    for i, url in enumerate(urls):
+        repository.add(
+            ProductCreate(
+                url=url,
+                name=f"Product {i}",
+                price=price,
+                currency="USD",
+                main_image_url="https://example.com/image.jpg",
+                check_date=datetime.now().isoformat(),
+            )
+        )
+    return urls
+
+
+class FakePriceService:
+    """Stands in for PriceService: slow scrapes, in-memory writes"""
+
+    api_key = "test-key"
+
+    def __init__(self, price=90.0, delay=0.05, failures=0, batch_misses=(), write_delay=0.0):
+        self.price = price
+        self.batch_misses = set(batch_misses)
+        self.batches = []
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+        self.scrapes = []  # URLs scraped, in order
+        self.active = 0
+        self.max_active = 0
+        self.recorded = []
+        self.writes = 0
+        self.write_delay = write_delay
+        self.writing = False
+        self.scrapes_while_writing = 0
+
+    def scrape(self, product):
+        self.calls += 1
+        self.scrapes.append(product.url)
+        self.active += 1
+        self.scrapes_while_writing += self.writing
+        self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("rate limited")
+            return {"extract": {"price": self.price}}
+        finally:
+            self.active -= 1
+
+    def extract_batch(self, products):
+        self.batches.append([product.url for product in products])
+        return {
+            product.url: {"extract": {"price": self.price}}
+            for product in products
+            if product.url not in self.batch_misses
+        }
+
+    def parse_scrape(self, product, scraped_data):
+        return float(scraped_data["extract"]["price"]), None, None
+
+    def build_price_update(self, product, new_price, cabin_type=None):
+        product.price = new_price
+        return PriceHistoryCreate(
+            product_url=product.url, price=new_price, product_name=product.name
+        )
+
+    async def build_price_update_async(self, product, new_price, cabin_type=None):
+        return self.build_price_update(product, new_price, cabin_type)
+
+    def save_price_updates(self, updates):
+        self.writes += 1
+        self.recorded.extend(update.product_url for update in updates)
+        return len(updates)
+
+    async def save_price_updates_async(self, updates):
+        self.writing = True
+        try:
+            await asyncio.sleep(self.write_delay)
+        finally:
+            self.writing = False
+        return self.save_price_updates(updates)
+
+
+class FakeNotifier:
+    """Records the alerts and errors a sweep queues"""
+
+    def __init__(self):
+        self.alerts = []
+        self.errors = []
+        self.flushes = 0
+        # Alerts queued by then, each time the sweep sent the full messages
+        self.batch_sends = []
+
+    def add_price_alert(self, product_name, old_price, new_price, url):
+        self.alerts.append(url)
+
+    def add_price_error(self, product_name, url, error):
+        self.errors.append(url)
+
+    async def send_full_batches(self):
+        self.batch_sends.append(len(self.alerts))
+
+    async def flush(self):
+        self.flushes += 1
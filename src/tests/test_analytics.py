@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import update
+
+from src.domain.models import PriceHistoryCreate
+from src.infrastructure.database.models import PriceHistory as DBPriceHistory
+from src.services.analytics import (
+    HistoryColumns,
+    compute_analytics,
+    get_price_analytics,
+    load_history_columns,
+)
+from src.tests.conftest import add_products
+
+START = datetime(2024, 1, 1)
+
+
+def random_rows(products=20, points=60, seed=3):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(products):
+        hours = np.sort(rng.uniform(0, 24 * 90, points))
+        prices = np.round(rng.uniform(50, 150, points), 2)
+        rows += [
+            (f"https://example.com/product/{i:02d}", START + timedelta(hours=float(h)), float(p))
+            for h, p in zip(hours, prices)
+        ]
+    return rows
+
+
+def test_matches_per_product_pandas():
+    rows = random_rows()
+    analytics = compute_analytics(HistoryColumns.from_rows(rows), window_days=7, low_days=30)
+    frame = pd.DataFrame(rows, columns=["product_url", "timestamp", "price"])
+
+    for url, group in frame.groupby("product_url"):
+        series = group.set_index("timestamp")["price"]
+        rows_of_product = analytics.history[analytics.history["product_url"] == url]
+        np.testing.assert_allclose(rows_of_product["rolling_min"], series.rolling("7D").min())
+        np.testing.assert_allclose(rows_of_product["rolling_max"], series.rolling("7D").max())
+        np.testing.assert_allclose(rows_of_product["rolling_mean"], series.rolling("7D").mean())
+        np.testing.assert_allclose(rows_of_product["pct_change"], series.pct_change())
+        np.testing.assert_allclose(rows_of_product["drawdown"], series / series.cummax() - 1)
+        np.testing.assert_array_equal(
+            rows_of_product["at_n_day_low"], series <= series.rolling("30D").min()
+        )
+
+        summary = analytics.summary.loc[url]
+        assert summary["min_price"] == series.min()
+        assert summary["max_price"] == series.max()
+        assert summary["mean_price"] == pytest.approx(series.mean())
+        assert summary["last_price"] == series.iloc[-1]
+        assert summary["observations"] == len(series)
+
+
+def test_time_weighted_price():
+    rows = [
+        ("a", START, 100.0),
+        ("a", START + timedelta(days=3), 50.0),  # Held for one day
+        ("a", START + timedelta(days=4), 80.0),
+        ("b", START, 10.0),
+    ]
+    summary = compute_analytics(HistoryColumns.from_rows(rows)).summary
+
+    assert summary.loc["a", "time_weighted_price"] == pytest.approx((100 * 3 + 50) / 4)
+    assert summary.loc["a", "mean_price"] == pytest.approx(230 / 3)
+    # A single observation is its own average
+    assert summary.loc["b", "time_weighted_price"] == 10.0
+
+
+def test_n_day_low_and_drawdown():
+    rows = [
+        ("a", START, 100.0),
+        ("a", START + timedelta(days=1), 120.0),
+        ("a", START + timedelta(days=40), 110.0),  # The older prices left the 30-day window
+        ("a", START + timedelta(days=41), 90.0),
+    ]
+    history = compute_analytics(HistoryColumns.from_rows(rows), low_days=30).history
+
+    assert history["at_n_day_low"].tolist() == [True, False, True, True]
+    assert history["drawdown"].tolist() == pytest.approx([0, 0, 110 / 120 - 1, 90 / 120 - 1])
+
+
+def test_empty_history():
+    analytics = compute_analytics(HistoryColumns.from_rows([]))
+    assert analytics.summary.empty
+
+
+@pytest.fixture
+def repository(repository):
+    for url in add_products(repository, 3):
+        repository.apply_price_updates(
+            [PriceHistoryCreate(product_url=url, price=p, product_name="P") for p in (100.0, 90.0)]
+        )
+    return repository
+
+
+def test_loads_history_in_chunks(repository):
+    columns = load_history_columns(repository, chunk_size=2)
+    assert len(columns) == 6
+    assert list(columns.urls) == [f"https://example.com/product/{i}" for i in range(3)]
+    assert columns.codes.tolist() == [0, 0, 1, 1, 2, 2]
+
+
+def test_analytics_cached_until_history_changes(repository):
+    first = get_price_analytics(repository)
+    assert get_price_analytics(repository) is first
+
+    repository.apply_price_updates(
+        [PriceHistoryCreate(product_url="https://example.com/product/0", price=80.0, product_name="P")]
+    )
+    second = get_price_analytics(repository)
+    assert second is not first
+    assert second.summary.loc["https://example.com/product/0", "last_price"] == 80.0
+
+
+def test_analytics_recomputed_after_compaction(repository):
+    # The two oldest rows become old enough to compact; the newest id stays
+    repository.session.execute(
+        update(DBPriceHistory).where(DBPriceHistory.id <= 2).values(timestamp=START)
+    )
+    repository.session.commit()
+    first = get_price_analytics(repository)
+
+    assert repository.compact_price_history(START + timedelta(days=1)) == 2
+
+    second = get_price_analytics(repository)
+    assert second is not first
+    assert "https://example.com/product/0" not in second.summary.index
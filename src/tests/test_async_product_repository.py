@@ -0,0 +1,152 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import make_url
+
+from src.config import settings
+from src.domain.models import PriceHistoryCreate, ProductCreate
+from src.infrastructure.database import async_session
+from src.infrastructure.database.async_session import get_async_db_url, supports_async
+from src.infrastructure.database.migrations import run_migrations
+from src.infrastructure.database.models import Base, DailyPriceRollup, PriceHistory as DBPriceHistory
+from src.infrastructure.repositories.async_product_repository import (
+    AsyncProductRepository,
+    open_async_repository,
+)
+from src.services.price_service import PriceService
+from src.services.rate_limit import KeyedRateLimiter
+from src.tests.conftest import FakeNotifier, add_products
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    # A file, so the sync and the async engine see the same database
+    return f"sqlite:///{tmp_path / 'prices.db'}"
+
+
+@pytest.fixture
+def engine(db_url):
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_async_db_url():
+    assert str(get_async_db_url("sqlite:///data/price_history.db")) == (
+        "sqlite+aiosqlite:///data/price_history.db"
+    )
+    assert str(get_async_db_url("postgresql://user@db.example.com/prices?sslmode=require")) == (
+        "postgresql+asyncpg://user@db.example.com/prices?ssl=require"
+    )
+    assert not supports_async("sqlite://")
+    assert supports_async("sqlite:///data/price_history.db")
+
+
+@pytest.mark.asyncio
+async def test_reads_match_sync_repository(repository, db_url):
+    urls = add_products(repository, 3)
+    repository.apply_price_updates([PriceHistoryCreate(product_url=urls[0], price=90.0, product_name="Product")])
+
+    async with open_async_repository(db_url) as async_repository:
+        assert await async_repository.get(urls[0]) == repository.get(urls[0])
+        assert await async_repository.get("https://example.com/missing") is None
+        assert await async_repository.get_all() == repository.get_all()
+        assert len(await async_repository.get_many(urls[:2])) == 2
+        assert await async_repository.get_price_stats(urls[0]) == repository.get_price_stats(urls[0])
+        assert await async_repository.get_all_price_stats() == repository.get_all_price_stats()
+
+
+@pytest.mark.asyncio
+async def test_writes_keep_stats_and_rollups(repository, db_url):
+    async with open_async_repository(db_url) as async_repository:
+        product = await async_repository.add(
+            ProductCreate(
+                url="https://example.com/product/0",
+                name="Product",
+                price=100.0,
+                currency="USD",
+                main_image_url="https://example.com/image.jpg",
+                check_date=datetime.now().isoformat(),
+            )
+        )
+        await async_repository.apply_price_updates(
+            [PriceHistoryCreate(product_url=product.url, price=price, product_name="Product") for price in (90.0, 80.0)]
+        )
+
+        stats = await async_repository.get_price_stats(product.url)
+        assert (stats.min_price, stats.last_price, stats.price_count) == (80.0, 80.0, 2)
+        assert (await async_repository.get(product.url)).price == 80.0
+        daily = repository.session.scalar(select(func.sum(DailyPriceRollup.count)))
+        assert daily == 2
+
+        await async_repository.delete(product.url)
+        assert await async_repository.get_all() == []
+
+
+@pytest.mark.asyncio
+async def test_sweep_writes_through_async_repository(repository, monkeypatch):
+    urls = add_products(repository, 4)
+    monkeypatch.setattr(settings, "SCRAPE_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "LOCAL_EXTRACT_ENABLED", False)
+    firecrawl = Mock(api_key="test-key")
+    firecrawl.scrape_url.return_value = {"extract": {"price": 80.0}}
+    writes = []
+    apply_price_updates = AsyncProductRepository.apply_price_updates
+
+    async def spy(self, batch):
+        writes.append(len(batch))
+        return await apply_price_updates(self, batch)
+
+    monkeypatch.setattr(AsyncProductRepository, "apply_price_updates", spy)
+    service = PriceService(repository, firecrawl)
+
+    result = await service.run_checks(
+        repository.get_all(),
+        max_retries=0,
+        write_batch_size=2,
+        notifier=FakeNotifier(),
+        key_limiter=KeyedRateLimiter(rate_per_minute=60_000, burst=100),
+        domain_limiter=KeyedRateLimiter(rate_per_minute=60_000, burst=100),
+    )
+
+    assert len(result.updated_products) == 4
+    assert writes == [2, 2]
+    assert service.async_repository is None  # Closed again after the sweep
+    repository.session.expire_all()
+    assert repository.session.scalar(select(func.count(DBPriceHistory.id))) == 4
+    assert {p.price for p in repository.get_many(urls)} == {80.0}
+
+
+@pytest.mark.asyncio
+async def test_sweep_falls_back_without_async_driver(repository, monkeypatch):
+    def missing_driver(*args, **kwargs):
+        raise ModuleNotFoundError("No module named 'aiosqlite'")
+
+    monkeypatch.setattr(async_session, "create_async_engine", missing_driver)
+    service = PriceService(repository, Mock(api_key="test-key"))
+
+    async with service.use_async_repository():
+        assert service.async_repository is None
+    assert service.async_repository is None
+
+
+@pytest.mark.asyncio
+async def test_sweep_falls_back_when_async_engine_cannot_connect(repository, monkeypatch, tmp_path):
+    def unreachable(db_url):
+        return make_url(f"sqlite+aiosqlite:///{tmp_path}/missing/prices.db")
+
+    monkeypatch.setattr(async_session, "get_async_db_url", unreachable)
+    service = PriceService(repository, Mock(api_key="test-key"))
+    [url] = add_products(repository, 1)
+
+    async with service.use_async_repository():
+        assert service.async_repository is None
+        await service.save_price_updates_async(
+            [PriceHistoryCreate(product_url=url, price=90.0, product_name="P")]
+        )
+
+    assert repository.get(url).price == 90.0
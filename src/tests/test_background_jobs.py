@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from src.presentation.background import DONE, FAILED, BackgroundJobs
+
+
+def wait_finished(jobs, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not jobs.get(job_id).finished:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return jobs.get(job_id)
+
+
+@pytest.fixture
+def jobs():
+    jobs = BackgroundJobs(max_workers=4)
+    yield jobs
+    jobs.shutdown()
+
+
+def test_job_result_is_tracked_by_id(jobs):
+    job_id = jobs.submit("scrape_a", "Scraping A", lambda: "New price $9.99")
+    job = wait_finished(jobs, job_id)
+
+    assert job.status == DONE
+    assert job.message == "New price $9.99"
+    assert job.label == "Scraping A"
+
+
+def test_failure_is_reported(jobs):
+    def fail():
+        raise RuntimeError("no price found")
+
+    job = wait_finished(jobs, jobs.submit("scrape_a", "Scraping A", fail))
+    assert job.status == FAILED
+    assert job.message == "no price found"
+
+
+def test_jobs_run_concurrently(jobs):
+    barrier = threading.Barrier(3, timeout=5)
+    job_ids = [jobs.submit(f"scrape_{i}", f"Scraping {i}", barrier.wait) for i in range(3)]
+
+    # Each job only returns once all three are running at the same time
+    assert all(wait_finished(jobs, job_id).status == DONE for job_id in job_ids)
+
+
+def test_same_key_is_not_submitted_twice(jobs):
+    release = threading.Event()
+    first = jobs.submit("scrape_a", "Scraping A", release.wait)
+
+    assert jobs.is_running("scrape_a")
+    assert jobs.submit("scrape_a", "Scraping A", release.wait) == first
+
+    release.set()
+    wait_finished(jobs, first)
+    assert not jobs.is_running("scrape_a")
+    assert jobs.submit("scrape_a", "Scraping A", lambda: "again") != first
+
+
+def test_cleanup_runs_in_the_job_thread():
+    cleaned = []
+    jobs = BackgroundJobs(thread_cleanup=lambda: cleaned.append(threading.current_thread().name))
+    try:
+        wait_finished(jobs, jobs.submit("a", "A", lambda: "ok"))
+    finally:
+        jobs.shutdown()
+    assert cleaned and cleaned[0].startswith("ui-job")
+
+
+def test_forget_and_prune_finished_jobs():
+    jobs = BackgroundJobs(max_workers=1, keep_finished=2)
+    try:
+        job_ids = [jobs.submit(str(i), str(i), lambda: "ok") for i in range(4)]
+        jobs.shutdown()
+        assert [jobs.get(job_id) is not None for job_id in job_ids] == [False, False, True, True]
+
+        jobs.forget(job_ids[2:])
+        assert jobs.get(job_ids[3]) is None
+    finally:
+        jobs.shutdown()
@@ -0,0 +1,84 @@
+import pytest
+from firecrawl import FirecrawlApp
+
+from src.benchmarks.fake_services import FakeServices
+from src.benchmarks.run import find_regressions, run_benchmarks
+from src.benchmarks.scenarios import SCENARIOS, BenchmarkOptions
+from src.benchmarks.synthetic import iter_price_history, make_products
+from src.services.batch_extractor import extract_prices
+from src.services.notifications import DiscordNotifier
+from src.tests.conftest import make_product
+
+
+@pytest.fixture
+def services():
+    with FakeServices(change_rate=1.0) as services:
+        yield services
+
+
+def test_fake_firecrawl_scrape_and_extract(services):
+    firecrawl = FirecrawlApp(api_key="test-key", api_url=services.firecrawl_url)
+    url = "https://shop.example.com/products/1"
+
+    first = firecrawl.scrape_url(url, params={"formats": ["extract"]})
+    second = firecrawl.scrape_url(url, params={"formats": ["extract"]})
+    assert first["extract"]["price"] > 0
+    assert second["extract"]["price"] != first["extract"]["price"]
+
+    products = [make_product(f"https://shop.example.com/products/{i}") for i in range(3)]
+    extracted = extract_prices(firecrawl, products)
+    assert set(extracted) == {product.url for product in products}
+    assert services.counts["/v1/scrape"] == 2
+    assert services.counts["/v1/extract"] == 1
+
+
+def test_fake_firecrawl_errors():
+    with FakeServices(error_rate=1.0) as services:
+        firecrawl = FirecrawlApp(api_key="test-key", api_url=services.firecrawl_url)
+        with pytest.raises(Exception, match="Simulated failure"):
+            firecrawl.scrape_url("https://shop.example.com/products/1")
+        assert services.counts["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stub_webhook_rate_limits(services):
+    services.discord_rate_limit_every = 2
+    async with DiscordNotifier(webhook_url=services.webhook_url) as notifier:
+        for i in range(25):
+            notifier.add_price_alert(f"Product {i}", 100.0, 90.0, "https://example.com")
+
+    assert notifier.sent_messages == 3
+    assert services.counts["discord_embeds"] == 25
+    assert services.counts["discord_rate_limited"] >= 1
+
+
+def test_synthetic_history_ends_at_current_price():
+    products = make_products(5, domains=2)
+    chunks = list(iter_price_history(products, points_per_product=40, chunk_size=30))
+
+    rows = [row for chunk in chunks for row in chunk]
+    assert len(rows) == 200
+    assert max(len(chunk) for chunk in chunks) == 30
+    for product in products:
+        history = [row for row in rows if row["product_url"] == product["url"]]
+        assert history[-1]["price"] == product["price"]
+        assert history == sorted(history, key=lambda row: row["timestamp"])
+
+
+def test_run_benchmarks_and_find_regressions():
+    options = BenchmarkOptions(repeat=2, sweep_products=10, latency=0.0)
+    document = run_benchmarks(list(SCENARIOS), products=20, history_rows=400, options=options)
+
+    results = document["results"]
+    assert set(results) == set(SCENARIOS)
+    assert results["sweep"]["checked"] == 10
+    assert results["export"]["csv"]["rows"] >= 400
+    assert results["repository"]["get"]["runs"] == 2
+
+    slower = {"sweep": {"seconds": 2.0, "products_per_second": 5.0, "checked": 10}}
+    baseline = {"sweep": {"seconds": 1.0, "products_per_second": 10.0, "checked": 20}}
+    assert find_regressions(slower, baseline, tolerance=0.2) == [
+        "sweep.seconds: 1.000 -> 2.000",
+        "sweep.products_per_second: 10.000 -> 5.000",
+    ]
+    assert find_regressions(baseline, baseline, tolerance=0.2) == []
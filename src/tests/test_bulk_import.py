@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.domain.models import ProductCreate
+from src.services.bulk_import import BulkImporter, ImportRow, read_rows
+from src.services.product_service import ProductService
+from src.services.rate_limit import KeyedRateLimiter
+
+
+class FakeFirecrawl:
+    """Extracts a product per URL, slowly, and fails for URLs containing "broken" """
+
+    api_key = "test-key"
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.extracts = []
+        self.running = self.max_running = 0
+        self._lock = threading.Lock()
+
+    def extract(self, urls, params):
+        with self._lock:
+            self.extracts.extend(urls)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            if "broken" in urls[0]:
+                raise RuntimeError("Extraction failed")
+            return {
+                "data": {
+                    "url": urls[0] + "?canonical",
+                    "name": f"Product {urls[0][-1]}",
+                    "price": "1.299,00 €",
+                    "currency": "EUR",
+                    "main_image_url": "https://shop.example.com/image.jpg",
+                }
+            }
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def make_importer(repository, firecrawl, chunk_size=4):
+    return BulkImporter(
+        ProductService(repository, firecrawl),
+        max_in_flight=4,
+        chunk_size=chunk_size,
+        key_limiter=KeyedRateLimiter(rate_per_minute=60_000, burst=100),
+        domain_limiter=KeyedRateLimiter(rate_per_minute=60_000, burst=100),
+    )
+
+
+def test_read_rows(tmp_path):
+    csv_path = tmp_path / "itineraries.csv"
+    csv_path.write_text(
+        "Title,Itinerary-Operator-URL,Map,prompt\n"
+        'Wild Antarctica,https://a.example.com/x ,https://img.example.com/m.jpg,\n'
+        '"Fly, the Drake",https://b.example.com/y,,Lowest suite price\n',
+        encoding="utf-8",
+    )
+    assert list(read_rows(str(csv_path))) == [
+        ImportRow(1, "https://a.example.com/x"),
+        ImportRow(2, "https://b.example.com/y", "Lowest suite price"),
+    ]
+
+    jsonl_path = tmp_path / "products.jsonl"
+    jsonl_path.write_text(
+        '"https://a.example.com/x"\n\n{"link": "https://b.example.com/y", "note": 1}\n',
+        encoding="utf-8",
+    )
+    assert [row.url for row in read_rows(str(jsonl_path), url_column="link")] == [
+        "https://a.example.com/x",
+        "https://b.example.com/y",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_skips_malformed_jsonl_lines(repository, tmp_path, capsys):
+    jsonl_path = tmp_path / "products.jsonl"
+    jsonl_path.write_text(
+        '{"url": "https://shop.example.com/p/1"}\n'
+        '{"url": "https://shop.example.com/p/2"\n'
+        "\n"
+        "42\n"
+        '"https://shop.example.com/p/3"\n',
+        encoding="utf-8",
+    )
+
+    rows = list(read_rows(str(jsonl_path)))
+    assert [(row.line, row.url) for row in rows] == [
+        (1, "https://shop.example.com/p/1"),
+        (2, ""),
+        (3, ""),
+        (4, "https://shop.example.com/p/3"),
+    ]
+    output = capsys.readouterr().out
+    assert "Skipping malformed line 2 of" in output
+    assert "Skipping malformed line 4 of" in output
+
+    result = await make_importer(repository, FakeFirecrawl()).run(read_rows(str(jsonl_path)))
+    assert (result.rows, result.added, result.invalid) == (4, 2, 2)
+
+
+@pytest.mark.asyncio
+async def test_import(repository):
+    repository.add(
+        ProductCreate(
+            url="https://shop.example.com/p/0",
+            name="Tracked",
+            price=5.0,
+            currency="USD",
+            main_image_url="https://shop.example.com/image.jpg",
+            check_date=datetime.now().isoformat(),
+        )
+    )
+    urls = [f"https://shop.example.com/p/{i}" for i in range(8)]
+    rows = [ImportRow(i + 1, url) for i, url in enumerate(urls)] + [
+        ImportRow(9, urls[3]),
+        ImportRow(10, "not a url"),
+        ImportRow(11, "https://shop.example.com/broken"),
+    ]
+    firecrawl = FakeFirecrawl()
+
+    result = await make_importer(repository, firecrawl).run(rows)
+
+    assert sorted(firecrawl.extracts) == sorted(urls[1:] + ["https://shop.example.com/broken"])
+    assert firecrawl.max_running > 1
+    assert (result.rows, result.added, result.existing, result.duplicates, result.invalid) == (
+        11, 7, 1, 1, 1
+    )
+    assert result.failed == [("https://shop.example.com/broken", "Extraction failed")]
+    # Imported under the URL of the file, with an initial price
+    product = repository.get(urls[5])
+    assert (product.name, product.price, product.currency) == ("Product 5", 1299.0, "EUR")
+    assert [h.price for h in repository.get_price_history(urls[5])] == [1299.0]
+    assert repository.get(urls[0]).name == "Tracked"
+
+
+@pytest.mark.asyncio
+async def test_import_resumes_from_checkpoint(repository, tmp_path):
+    checkpoint_path = str(tmp_path / "import.checkpoint.json")
+    urls = [f"https://shop.example.com/p/{i}" for i in range(7)]
+
+    def interrupted_rows():
+        for i, url in enumerate(urls[:5]):
+            yield ImportRow(i + 1, url)
+        raise KeyboardInterrupt
+
+    firecrawl = FakeFirecrawl(delay=0)
+    with pytest.raises(KeyboardInterrupt):
+        await make_importer(repository, firecrawl, chunk_size=2).run(
+            interrupted_rows(), checkpoint_path=checkpoint_path
+        )
+    with open(checkpoint_path) as f:
+        assert json.load(f)["rows_done"] == 4
+
+    result = await make_importer(repository, firecrawl, chunk_size=3).run(
+        [ImportRow(i + 1, url) for i, url in enumerate(urls)], checkpoint_path=checkpoint_path
+    )
+
+    assert sorted(firecrawl.extracts) == urls
+    assert (result.rows, result.added, result.resumed_rows) == (7, 7, 4)
+    assert repository.existing_urls(urls) == set(urls)
+    assert not (tmp_path / "import.checkpoint.json").exists()
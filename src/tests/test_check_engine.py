@@ -0,0 +1,205 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.batch_extractor import extract_prices, group_products
+from src.services.check_engine import CheckEngine
+from src.services.rate_limit import KeyedRateLimiter, TokenBucket
+from src.services.scrape_cache import PageFingerprint
+from src.tests.conftest import FakeNotifier, FakePriceService, make_product
+
+
+def fast_engine(service, **kwargs):
+    kwargs.setdefault("notifier", FakeNotifier())
+    return CheckEngine(
+        service,
+        key_limiter=KeyedRateLimiter(rate_per_minute=60_000, burst=100),
+        domain_limiter=KeyedRateLimiter(rate_per_minute=60_000, burst=100),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.perf_counter()
+    for _ in range(6):
+        await bucket.acquire()
+    # One token banked, five more at 50/sec
+    assert time.perf_counter() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_engine_runs_scrapes_concurrently():
+    service = FakePriceService(delay=0.1)
+    products = [make_product(f"https://shop{i}.example.com/p") for i in range(8)]
+
+    result = await fast_engine(service, max_in_flight=4).run(products)
+
+    assert len(result.updated_products) == 8
+    assert service.max_active == 4
+    # Two waves of four instead of eight serial scrapes
+    assert result.elapsed < 0.6
+    assert result.products_per_second > 0
+
+
+@pytest.mark.asyncio
+async def test_engine_retries_failed_scrapes():
+    service = FakePriceService(failures=2)
+
+    result = await fast_engine(service, max_retries=2, retry_backoff=0.01).run(
+        [make_product("https://example.com/p")]
+    )
+
+    assert service.calls == 3
+    assert len(result.updated_products) == 1
+    assert not result.failed
+
+
+@pytest.mark.asyncio
+async def test_engine_reports_exhausted_retries():
+    service = FakePriceService(failures=5)
+    notifier = FakeNotifier()
+
+    result = await fast_engine(
+        service, max_retries=1, retry_backoff=0.01, notifier=notifier
+    ).run([make_product("https://example.com/p")])
+
+    assert service.calls == 2
+    assert "https://example.com/p" in result.failed
+    assert not service.recorded
+    assert notifier.errors == ["https://example.com/p"]
+
+
+@pytest.mark.asyncio
+async def test_engine_queues_alerts_and_flushes_once():
+    products = [make_product(f"https://example.com/{i}", price=100.0) for i in range(3)]
+    notifier = FakeNotifier()
+
+    await fast_engine(FakePriceService(price=90.0), notifier=notifier).run(products)
+
+    assert len(notifier.alerts) == 3
+    assert notifier.flushes == 1
+
+
+@pytest.mark.asyncio
+async def test_engine_sends_full_alert_messages_after_each_write():
+    products = [make_product(f"https://example.com/{i}", price=100.0) for i in range(12)]
+    notifier = FakeNotifier()
+
+    await fast_engine(
+        FakePriceService(price=90.0), write_batch_size=5, notifier=notifier
+    ).run(products)
+
+    # Two full write batches during the sweep, then the rest at the end
+    assert len(notifier.batch_sends) == 3
+    assert notifier.batch_sends[0] >= 5
+    assert notifier.flushes == 1
+
+
+def test_group_products_by_prompt():
+    products = [make_product(f"https://example.com/{i}") for i in range(5)]
+    products[1].prompt = "cabin prices"
+    products[3].prompt = "cabin prices"
+
+    batches = group_products(products, batch_size=2)
+
+    assert [[p.url[-1] for p in batch] for batch in batches] == [
+        ["0", "2"],
+        ["4"],
+        ["1", "3"],
+    ]
+
+
+def test_extract_prices_splits_response_by_url():
+    products = [make_product(f"https://example.com/{i}") for i in range(3)]
+    firecrawl = Mock()
+    firecrawl.extract.return_value = {
+        "success": True,
+        "data": {
+            "products": [
+                {"url": "https://EXAMPLE.com/0/", "price": 10.5},
+                {"url": "https://example.com/1", "price": None},
+                {"url": "https://elsewhere.com/9", "price": 3.0},
+            ]
+        },
+    }
+
+    results = extract_prices(firecrawl, products)
+
+    assert firecrawl.extract.call_count == 1
+    assert results == {
+        "https://example.com/0": {"extract": {"price": 10.5, "cabin_type": None}}
+    }
+
+
+@pytest.mark.asyncio
+async def test_engine_batch_mode_falls_back_to_single_scrapes():
+    products = [make_product(f"https://example.com/{i}") for i in range(4)]
+    service = FakePriceService(batch_misses={"https://example.com/2"})
+
+    result = await fast_engine(service, batch_size=10).run(products, batch=True)
+
+    assert len(service.batches) == 1
+    assert service.calls == 1  # only the missed product is scraped singly
+    assert len(result.updated_products) == 4
+
+
+@pytest.mark.asyncio
+async def test_engine_writes_sweep_in_one_transaction():
+    products = [make_product(f"https://example.com/{i}") for i in range(5)]
+    service = FakePriceService(delay=0)
+
+    await fast_engine(service).run(products)
+
+    assert service.writes == 1
+    assert sorted(service.recorded) == sorted(p.url for p in products)
+
+
+@pytest.mark.asyncio
+async def test_engine_keeps_scraping_while_writing():
+    products = [make_product(f"https://example.com/{i}") for i in range(6)]
+    service = FakePriceService(delay=0.02, write_delay=0.2)
+
+    result = await fast_engine(service, max_in_flight=1, write_batch_size=2).run(products)
+
+    assert service.scrapes_while_writing > 0
+    assert service.writes == 3
+    assert sorted(service.recorded) == sorted(p.url for p in products)
+    assert len(result.updated_products) == 6
+
+
+class FakeScrapeCache:
+    """Every page counts as unchanged once it has been stored"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def revalidate(self, key, url):
+        return self.entries.get(key), PageFingerprint(content_hash=url)
+
+    def put(self, key, payload, fingerprint):
+        self.entries[key] = payload
+
+    def save(self):
+        pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch", [False, True])
+async def test_engine_reuses_cached_extractions(batch):
+    products = [make_product(f"https://example.com/{i}") for i in range(3)]
+    service = FakePriceService()
+    service.scrape_cache_key = lambda product: product.url
+    cache = FakeScrapeCache()
+
+    first = await fast_engine(service, scrape_cache=cache).run(products, batch=batch)
+    scrapes = service.calls + len(service.batches)
+    second = await fast_engine(service, scrape_cache=cache).run(products, batch=batch)
+
+    assert (first.cache_hits, first.cache_misses) == (0, 3)
+    assert (second.cache_hits, second.cache_misses) == (3, 0)
+    assert second.credits_saved >= 3
+    assert service.calls + len(service.batches) == scrapes
+    assert len(second.updated_products) == 3
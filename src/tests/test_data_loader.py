@@ -0,0 +1,77 @@
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import event
+
+from src.domain.models import PriceHistoryCreate
+from src.presentation import cache
+from src.presentation.data_loader import fetch_dashboard_data
+from src.tests.conftest import add_products
+
+
+@pytest.fixture
+def repository(repository):
+    for url in add_products(repository, 10):
+        for price in (100.0, 90.0, 95.0):
+            repository.add_price_history(
+                PriceHistoryCreate(product_url=url, price=price, product_name="P")
+            )
+    return repository
+
+
+def count_queries(engine):
+    queries = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: queries.append(args[2])
+    )
+    return queries
+
+
+@pytest.fixture
+def cached(repository, monkeypatch):
+    """The app's cached loader, reading through `repository`"""
+    monkeypatch.setattr(cache, "get_services", lambda: (Mock(repository=repository), None))
+    cache.invalidate_read_caches()
+    yield cache.get_dashboard_data
+    cache.invalidate_read_caches()
+
+
+def test_fetch_dashboard_data_uses_fixed_query_count(repository, engine):
+    queries = count_queries(engine)
+
+    data = fetch_dashboard_data(repository, points_per_product=2)
+
+    assert len(queries) == 3
+    assert len(data.products) == 10
+    frame = data.history["https://example.com/product/3"]
+    assert frame["price"].tolist() == [90.0, 95.0]
+    assert data.stats["https://example.com/product/3"].min_price == 90.0
+
+
+def test_dashboard_data_cached_until_next_write(cached, repository, engine):
+    cached(points_per_product=2)
+    queries = count_queries(engine)
+
+    cached(points_per_product=2)
+    assert queries == []
+
+    # A write moves ProductRepository.write_generation, which is part of the key
+    repository.add_price_history(
+        PriceHistoryCreate(
+            product_url="https://example.com/product/0", price=50.0, product_name="P"
+        )
+    )
+    queries.clear()
+    data = cached(points_per_product=2)
+    assert len(queries) == 3
+    assert data.history["https://example.com/product/0"]["price"].tolist() == [95.0, 50.0]
+
+
+def test_dashboard_data_reloaded_after_invalidation(cached, engine):
+    cached(points_per_product=2)
+    queries = count_queries(engine)
+
+    cache.invalidate_read_caches()
+    cached(points_per_product=2)
+
+    assert len(queries) == 3
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.presentation.components.price_chart import PriceChart
+from src.presentation.downsampling import (
+    downsample,
+    lttb,
+    minmax_buckets,
+    resolution_for_span,
+)
+
+
+@pytest.fixture
+def price_history():
+    rng = np.random.default_rng(42)
+    prices = 100 + np.cumsum(rng.normal(0, 1, 20_000))
+    prices[12_345] = prices.min() - 25  # a single sharp dip
+    return pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2024-01-01", periods=len(prices), freq="min"),
+            "price": prices,
+        }
+    )
+
+
+def test_lttb_keeps_endpoints_and_size():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 20)
+
+    selected = lttb(x, y, 100)
+
+    assert len(selected) == 100
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_lttb_returns_everything_when_small():
+    assert lttb(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_minmax_buckets_keep_extremes():
+    y = np.array([5, 1, 9, 3, 7, 2, 8, 4], dtype=float)
+
+    selected = minmax_buckets(y, 4)
+
+    assert y[selected].min() == 1
+    assert y[selected].max() == 9
+    assert len(selected) <= 4
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsample_keeps_lowest_point(price_history, method):
+    lowest = int(price_history["price"].to_numpy().argmin())
+
+    reduced = downsample(price_history, 300, method=method, keep_index=lowest)
+
+    assert len(reduced) <= 301
+    assert reduced["price"].min() == price_history["price"].min()
+    assert reduced["timestamp"].is_monotonic_increasing
+
+
+def test_resolution_for_span():
+    resolutions = [(timedelta(days=1), 50), (timedelta.max, 10)]
+
+    assert resolution_for_span(timedelta(hours=3), resolutions) == 50
+    assert resolution_for_span(timedelta(days=30), resolutions) == 10
+
+
+def test_price_chart_draws_downsampled_series(price_history):
+    fig = PriceChart(resolutions=[(timedelta.max, 200)]).create(price_history)
+
+    assert len(fig.data[0].y) <= 201
+    annotation = fig.layout.annotations[0]
+    assert annotation.y == price_history["price"].min()
@@ -0,0 +1,68 @@
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.infrastructure.database.models import PriceHistory as DBPriceHistory
+from src.infrastructure.repositories.product_repository import (
+    PRICE_HISTORY_EXPORT_COLUMNS,
+)
+from src.services.export import iter_csv, to_parquet_bytes, write_csv
+
+
+@pytest.fixture
+def repository(repository):
+    start = datetime(2024, 1, 1)
+    for url in ("https://example.com/a", "https://example.com/b"):
+        repository.session.add_all(
+            DBPriceHistory(
+                product_url=url,
+                price=10.0 + i,
+                product_name="P",
+                timestamp=start + timedelta(days=i),
+                is_lowest=i == 0,
+            )
+            for i in range(7)
+        )
+    repository.session.commit()
+    return repository
+
+
+def test_iter_csv_streams_in_chunks(repository):
+    chunks = list(iter_csv(repository, "https://example.com/a", chunk_size=3))
+
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert rows[0] == PRICE_HISTORY_EXPORT_COLUMNS
+    assert [row[2] for row in rows[1:]] == [str(10.0 + i) for i in range(7)]
+    assert rows[1][3] == "2024-01-01 00:00:00"
+    assert rows[1][6] == "True"
+
+
+def test_iter_csv_without_history_yields_header(repository):
+    assert list(iter_csv(repository, "https://example.com/missing")) == [
+        ",".join(PRICE_HISTORY_EXPORT_COLUMNS) + "\n"
+    ]
+
+
+def test_write_csv_all_products(repository):
+    sink = io.StringIO()
+
+    write_csv(repository, sink, chunk_size=4)
+
+    rows = list(csv.DictReader(io.StringIO(sink.getvalue())))
+    assert len(rows) == 14
+    assert {row["product_url"] for row in rows} == {
+        "https://example.com/a",
+        "https://example.com/b",
+    }
+
+
+def test_parquet_export(repository):
+    table = pq.read_table(io.BytesIO(to_parquet_bytes(repository)))
+
+    assert table.column_names == PRICE_HISTORY_EXPORT_COLUMNS
+    assert table.num_rows == 14
+    assert table.column("price").to_pylist()[:3] == [10.0, 11.0, 12.0]
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.infrastructure.database.models import Base, CheckJob as DBCheckJob
+from src.infrastructure.repositories.job_repository import DONE, FAILED, QUEUED, JobRepository
+from src.services.check_engine import SweepResult
+from src.services.check_worker import CheckWorker, job_key
+
+LEASE = timedelta(minutes=2)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file database so several connections see the same queue
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def jobs(session):
+    return JobRepository(session)
+
+
+def queue_products(jobs, count):
+    urls = [f"https://example.com/product/{i}" for i in range(count)]
+    jobs.enqueue((job_key(url, None), url) for url in urls)
+    return urls
+
+
+def expire_leases(session):
+    session.query(DBCheckJob).update({"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    session.commit()
+
+
+def test_enqueue_is_idempotent(jobs):
+    assert jobs.enqueue([("a", "https://example.com/a"), ("b", "https://example.com/b")]) == 2
+    assert jobs.enqueue([("a", "https://example.com/a"), ("c", "https://example.com/c")]) == 1
+    assert jobs.counts() == {QUEUED: 3}
+
+
+def test_job_key_changes_once_a_price_lands():
+    before = job_key("https://example.com/a", datetime(2024, 1, 1))
+    assert before == job_key("https://example.com/a", datetime(2024, 1, 1))
+    assert before != job_key("https://example.com/a", datetime(2024, 1, 2))
+
+
+def test_claims_never_overlap(jobs):
+    queue_products(jobs, 5)
+    _, first = jobs.claim("w1", 3, LEASE, max_attempts=3)
+    _, second = jobs.claim("w2", 3, LEASE, max_attempts=3)
+
+    assert len(first) == 3 and len(second) == 2
+    assert not {job.id for job in first} & {job.id for job in second}
+    assert jobs.claim("w3", 3, LEASE, max_attempts=3)[1] == []
+
+
+def test_concurrent_workers_claim_each_job_once(engine, jobs):
+    queue_products(jobs, 200)
+    claimed, lock = [], threading.Lock()
+
+    def work(worker_id):
+        repository = JobRepository(sessionmaker(bind=engine)())
+        while True:
+            token, batch = repository.claim(worker_id, 7, LEASE, max_attempts=3)
+            if not batch:
+                break
+            with lock:
+                claimed.extend(job.id for job in batch)
+            repository.complete(token, [job.id for job in batch])
+        repository.session.close()
+
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == 200
+    assert len(set(claimed)) == 200
+    assert jobs.counts() == {DONE: 200}
+
+
+def test_expired_lease_is_taken_over(session, jobs):
+    queue_products(jobs, 1)
+    old_token, _ = jobs.claim("w1", 1, LEASE, max_attempts=3)
+    expire_leases(session)
+
+    new_token, reclaimed = jobs.claim("w2", 1, LEASE, max_attempts=3)
+
+    assert reclaimed[0].worker_id == "w2"
+    assert reclaimed[0].attempts == 2
+    # The first worker finishing late doesn't touch the new lease
+    assert jobs.complete(old_token, [reclaimed[0].id]) == 0
+    assert jobs.heartbeat(old_token, LEASE) == 0
+    assert jobs.complete(new_token, [reclaimed[0].id]) == 1
+
+
+def test_heartbeat_keeps_the_lease(session, jobs):
+    queue_products(jobs, 1)
+    token, _ = jobs.claim("w1", 1, LEASE, max_attempts=3)
+    expire_leases(session)
+
+    assert jobs.heartbeat(token, LEASE) == 1
+    assert jobs.claim("w2", 1, LEASE, max_attempts=3)[1] == []
+
+
+def test_failed_job_is_retried_then_releases_its_key(jobs):
+    (url,) = queue_products(jobs, 1)
+    token, (job,) = jobs.claim("w1", 1, LEASE, max_attempts=2)
+    jobs.fail(token, job.id, "boom", retry_at=datetime.utcnow() - timedelta(seconds=1))
+
+    token, (job,) = jobs.claim("w1", 1, LEASE, max_attempts=2)
+    assert job.attempts == 2
+    jobs.fail(token, job.id, "boom")
+
+    assert jobs.counts() == {FAILED: 1}
+    # The product can be queued again under the same key
+    assert jobs.enqueue([(job_key(url, None), url)]) == 1
+
+
+def test_abandoned_job_fails_after_max_attempts(session, jobs):
+    queue_products(jobs, 1)
+    jobs.claim("w1", 1, LEASE, max_attempts=1)
+    expire_leases(session)
+
+    assert jobs.claim("w2", 1, LEASE, max_attempts=1)[1] == []
+    assert jobs.counts() == {FAILED: 1}
+
+
+class FakeProductRepository:
+    def get_sweep_products(self, urls):
+        return [type("Product", (), {"url": url})() for url in urls]
+
+
+class FakePriceService:
+    def __init__(self, failing=()):
+        self.repository = FakeProductRepository()
+        self.failing = set(failing)
+        self.checked = []
+
+    async def run_checks(self, products, batch=None, **engine_options):
+        self.checked.extend(product.url for product in products)
+        return SweepResult(
+            updated_products=[p for p in products if p.url not in self.failing],
+            failed={p.url: "no price" for p in products if p.url in self.failing},
+        )
+
+
+@pytest.mark.asyncio
+async def test_worker_completes_and_requeues(jobs):
+    urls = queue_products(jobs, 4)
+    service = FakePriceService(failing=[urls[0]])
+    worker = CheckWorker(service, jobs, worker_id="w1", batch_size=10, retry_delay=3600)
+
+    assert await worker.run_until_empty() == 4
+    assert sorted(service.checked) == sorted(urls)
+    assert jobs.counts() == {DONE: 3, QUEUED: 1}
+
+
+@pytest.mark.asyncio
+async def test_worker_run_stops_on_event(jobs):
+    queue_products(jobs, 3)
+    service = FakePriceService()
+    worker = CheckWorker(service, jobs, worker_id="w1", batch_size=2, poll_interval=0.01)
+    stop = asyncio.Event()
+
+    async def stop_when_drained():
+        while len(service.checked) < 3:
+            await asyncio.sleep(0.01)
+        stop.set()
+
+    await asyncio.wait_for(asyncio.gather(worker.run(stop), stop_when_drained()), 5)
+    assert jobs.counts() == {DONE: 3}
@@ -0,0 +1,237 @@
+import json
+import time
+
+import pytest
+
+from src.config import settings
+from src.services.check_engine import CheckEngine
+from src.services.local_extractor import LocalExtractor
+from src.services.product_service import ProductService
+from src.services.rate_limit import KeyedRateLimiter
+from src.tests.conftest import FakeNotifier, FakePriceService, make_product
+
+JSON_LD_PAGE = """<html><head><script type="application/ld+json">{}</script></head>
+<body><h1>Widget</h1></body></html>""".format(
+    json.dumps(
+        {
+            "@context": "https://schema.org",
+            "@graph": [
+                {"@type": "BreadcrumbList", "itemListElement": []},
+                {
+                    "@type": "Product",
+                    "name": "Widget",
+                    "image": [{"@type": "ImageObject", "url": "https://shop.example.com/w.jpg"}],
+                    "offers": {"@type": "AggregateOffer", "lowPrice": "19.99", "priceCurrency": "EUR"},
+                },
+            ],
+        }
+    )
+)
+MICRODATA_PAGE = """<div itemscope itemtype="https://schema.org/Product">
+<h1 itemprop="name">Lamp</h1><img itemprop="image" src="/lamp.jpg">
+<div itemprop="offers" itemscope><span itemprop="price">1.045,50 €</span>
+<meta itemprop="priceCurrency" content="EUR"></div></div>"""
+OPEN_GRAPH_PAGE = """<head><meta property="og:title" content="Chair">
+<meta property="product:price:amount" content="89.00">
+<meta property="product:price:currency" content="GBP"></head>"""
+
+
+def test_structured_data():
+    extractor = LocalExtractor()
+
+    found = extractor.extract("https://shop.example.com/widget", JSON_LD_PAGE)
+    assert found["metadata"]["extractor"] == "json-ld"
+    assert found["extract"] == {
+        "price": 19.99,
+        "currency": "EUR",
+        "name": "Widget",
+        "main_image_url": "https://shop.example.com/w.jpg",
+    }
+
+    found = extractor.extract("https://shop.example.com/lamp", MICRODATA_PAGE)
+    assert found["metadata"]["extractor"] == "microdata"
+    assert (found["extract"]["price"], found["extract"]["currency"]) == (1045.5, "EUR")
+    assert found["extract"]["main_image_url"] == "/lamp.jpg"
+
+    found = extractor.extract("https://shop.example.com/chair", OPEN_GRAPH_PAGE)
+    assert found["metadata"]["extractor"] == "open-graph"
+    assert (found["extract"]["price"], found["extract"]["name"]) == (89.0, "Chair")
+
+    assert extractor.extract("https://shop.example.com/x", shop_page(1, "$24.00")) is None
+
+
+SHOP_PAGE = """<html><body><nav class="menu">Home</nav><main class="{main}">
+<h1 class="title">{name}</h1><img class="hero" src="/img/{sku}.jpg">
+<div class="buy-box"><span class="price now">{price}</span><button>Add</button></div>
+<ul><li><span class="price">$5.00</span></li><li><span class="price">{price}</span></li></ul>
+</main></body></html>"""
+
+
+def shop_page(sku, price, name="Desk Lamp", main="product"):
+    return SHOP_PAGE.format(sku=sku, price=price, name=name, main=main)
+
+
+def test_templates(tmp_path):
+    templates_path = str(tmp_path / "templates.json")
+    extractor = LocalExtractor(templates_path=templates_path)
+    details = {
+        "price": 24.0,
+        "name": "Desk Lamp",
+        "currency": "USD",
+        "main_image_url": "https://shop.example.com/img/1.jpg",
+    }
+
+    # The related product showing the same price must not be learned
+    template = extractor.learn("https://shop.example.com/1", shop_page(1, "$24.00"), details)
+    assert template == {
+        "price": "span.now.price",
+        "name": "h1.title",
+        "currency": "span.now.price",
+        "main_image_url": "img.hero",
+        "currency_code": None,
+    }
+    assert extractor.learn("https://shop.example.com/1", shop_page(1, "$24.00"), {"price": 99.0}) is None
+    extractor.save()
+
+    reloaded = LocalExtractor(templates_path=templates_path)
+    found = reloaded.extract("https://shop.example.com/2", shop_page(2, "$31.50", name="Desk Fan"))
+    assert found["metadata"]["extractor"] == "template"
+    assert found["extract"] == {
+        "price": 31.5,
+        "currency": "USD",
+        "name": "Desk Fan",
+        "main_image_url": "/img/2.jpg",
+    }
+    # Templates are per domain and per layout
+    assert reloaded.extract("https://other.example.com/2", shop_page(2, "$31.50")) is None
+    assert reloaded.extract("https://shop.example.com/2", shop_page(2, "$31.50", main="pdp")) is None
+    # A sold out product is a miss, but keeps the template
+    assert reloaded.extract("https://shop.example.com/3", shop_page(3, "Sold out")) is None
+    assert len(reloaded.templates) == 1
+
+
+def test_from_settings(tmp_path, monkeypatch):
+    templates_path = str(tmp_path / "templates.json")
+    monkeypatch.setattr(settings, "LOCAL_EXTRACT_TEMPLATES_PATH", templates_path)
+    monkeypatch.setattr(settings, "LOCAL_EXTRACT_TEMPLATES_PER_DOMAIN", 2)
+    monkeypatch.setattr(settings, "LOCAL_EXTRACT_ENABLED", True)
+
+    templates = LocalExtractor.from_settings(settings).templates
+    assert (templates.path, templates.max_per_domain) == (templates_path, 2)
+
+    monkeypatch.setattr(settings, "LOCAL_EXTRACT_ENABLED", False)
+    assert LocalExtractor.from_settings(settings) is None
+
+
+def test_template_without_currency_on_page():
+    extractor = LocalExtractor()
+    extractor.learn(
+        "https://shop.example.tn/1", shop_page(1, "45,90"), {"price": 45.9, "currency": "TND"}
+    )
+    found = extractor.extract("https://shop.example.tn/2", shop_page(2, "89,50"))
+    assert (found["extract"]["price"], found["extract"]["currency"]) == (89.5, "TND")
+
+
+def test_template_invalidation():
+    extractor = LocalExtractor(max_templates_per_domain=2)
+    url = "https://shop.example.com/1"
+    nested = "<div>" * 8 + '<span class="price now">$24.00</span>' + "</div>" * 8
+    extractor.learn(url, f"<main class='product'>{nested}</main>", {"price": 24.0})
+
+    # Same layout by fingerprint, but the price element is gone
+    moved = nested.replace('class="price now"', 'class="amount"')
+    assert extractor.extract(url, f"<main class='product'>{moved}</main>") is None
+    assert len(extractor.templates) == 0
+
+    # Layouts a domain no longer serves make way for new ones
+    for main in ("a", "b", "c"):
+        extractor.learn(url, shop_page(1, "$24.00", main=main), {"price": 24.0})
+    assert len(extractor.templates) == 2
+    assert extractor.extract(url, shop_page(1, "$24.00", main="a")) is None
+    assert extractor.extract(url, shop_page(1, "$24.00", main="c")) is not None
+
+    # Unused templates expire
+    assert extractor.templates.prune(now=time.time() + 31 * 86400) == 2
+    assert len(extractor.templates) == 0
+
+
+def engine_for(service, pages):
+    return CheckEngine(
+        service,
+        notifier=FakeNotifier(),
+        local_extractor=LocalExtractor(fetch=pages.get),
+        key_limiter=KeyedRateLimiter(rate_per_minute=60_000, burst=100),
+        domain_limiter=KeyedRateLimiter(rate_per_minute=60_000, burst=100),
+    )
+
+
+@pytest.mark.asyncio
+async def test_engine_uses_firecrawl_only_on_a_miss():
+    pages = {
+        "https://shop.example.com/structured": OPEN_GRAPH_PAGE.replace("GBP", "USD"),
+        "https://shop.example.com/plain": shop_page(1, "$24.00"),
+        "https://shop.example.com/prompted": OPEN_GRAPH_PAGE.replace("GBP", "USD"),
+        "https://shop.example.com/pounds": OPEN_GRAPH_PAGE,
+    }
+    products = [
+        make_product("https://shop.example.com/structured"),
+        make_product("https://shop.example.com/plain"),
+        make_product("https://shop.example.com/prompted", prompt="Business class fare"),
+        make_product("https://shop.example.com/pounds"),
+    ]
+    # Firecrawl answers 24.00 for every product
+    service = FakePriceService(price=24.0, delay=0)
+    engine = engine_for(service, pages)
+
+    result = await engine.run(products)
+
+    # Custom prompts and pages in another currency go to Firecrawl
+    assert sorted(service.scrapes) == [
+        "https://shop.example.com/plain",
+        "https://shop.example.com/pounds",
+        "https://shop.example.com/prompted",
+    ]
+    assert (result.local_hits, result.local_misses) == (1, 2)
+    assert products[0].price == 89.0
+
+    # The plain page taught the engine where its price is
+    service.scrapes.clear()
+    result = await engine.run([make_product("https://shop.example.com/plain")])
+    assert service.scrapes == []
+    assert result.local_hits == 1
+
+
+class FakeFirecrawl:
+    api_key = "test-key"
+
+    def __init__(self):
+        self.extracts = []
+
+    def extract(self, urls, params):
+        self.extracts.extend(urls)
+        return {
+            "data": {
+                "url": urls[0],
+                "name": "Desk Lamp",
+                "price": 24.0,
+                "currency": "USD",
+                "main_image_url": "https://shop.example.com/img/1.jpg",
+            }
+        }
+
+
+@pytest.mark.asyncio
+async def test_added_products_teach_templates():
+    pages = {
+        "https://shop.example.com/1": shop_page(1, "$24.00"),
+        "https://shop.example.com/2": shop_page(2, "$31.50", name="Desk Fan"),
+    }
+    firecrawl = FakeFirecrawl()
+    service = ProductService(None, firecrawl, LocalExtractor(fetch=pages.get))
+
+    await service._scrape_product("https://shop.example.com/1", None)
+    product = await service._scrape_product("https://shop.example.com/2", None)
+
+    assert firecrawl.extracts == ["https://shop.example.com/1"]
+    assert (product.name, product.price, product.currency) == ("Desk Fan", 31.5, "USD")
+    assert product.main_image_url == "https://shop.example.com/img/2.jpg"
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import random
+
+import pytest
+import requests
+
+from src.infrastructure.metrics import Histogram, Metrics, serve_metrics
+
+
+@pytest.fixture
+def registry():
+    return Metrics(enabled=True)
+
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    rng = random.Random(0)
+    samples = sorted(rng.uniform(0.001, 1.0) for _ in range(10_000))
+    for sample in samples:
+        histogram.observe(sample)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = samples[int(q * len(samples)) - 1]
+        # Buckets are 25% apart, interpolation does much better than that
+        assert histogram.quantile(q) == pytest.approx(exact, rel=0.1)
+    assert histogram.quantile(1.0) == samples[-1]
+
+
+def test_spans_and_timed_functions(registry):
+    @registry.timed("sync")
+    def double(x):
+        return 2 * x
+
+    @registry.timed("async")
+    async def triple(x):
+        await asyncio.sleep(0)
+        return 3 * x
+
+    @registry.timed("failing")
+    def fail():
+        raise ValueError("boom")
+
+    assert double(2) == 4
+    assert asyncio.run(triple(2)) == 6
+    with pytest.raises(ValueError):
+        fail()
+    with registry.span("block"):
+        pass
+    registry.increment("checks", 3)
+
+    snapshot = registry.snapshot()
+    assert set(snapshot["spans"]) == {"async", "block", "failing", "sync"}
+    assert snapshot["spans"]["failing"]["count"] == 1
+    assert snapshot["spans"]["failing"]["errors"] == 1
+    assert snapshot["spans"]["sync"]["errors"] == 0
+    assert snapshot["spans"]["sync"]["p99"] <= snapshot["spans"]["sync"]["max"]
+    assert snapshot["counters"] == {"checks": 3.0}
+
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics(enabled=False)
+
+    @registry.timed("sync")
+    def double(x):
+        return 2 * x
+
+    assert double(2) == 4
+    with registry.span("block"):
+        pass
+    registry.increment("checks")
+    assert registry.snapshot() == {"spans": {}, "counters": {}}
+
+    registry.enabled = True
+    double(2)
+    assert registry.snapshot()["spans"]["sync"]["count"] == 1
+
+
+def test_prometheus_text(registry):
+    for seconds in (0.002, 0.02, 0.2):
+        registry.observe("repository.get_all", seconds)
+    registry.increment("discord.messages", 2)
+
+    text = registry.to_prometheus()
+    lines = text.splitlines()
+    assert "# TYPE price_tracker_span_seconds histogram" in lines
+    assert 'price_tracker_span_seconds_bucket{span="repository.get_all",le="+Inf"} 3' in lines
+    assert 'price_tracker_span_seconds_count{span="repository.get_all"} 3' in lines
+    assert 'price_tracker_span_errors_total{span="repository.get_all"} 0' in lines
+    assert "price_tracker_discord_messages_total 2.0" in lines
+
+    buckets = [
+        int(line.rsplit(" ", 1)[1])
+        for line in lines
+        if line.startswith("price_tracker_span_seconds_bucket")
+    ]
+    assert buckets == sorted(buckets)
+
+
+def test_serve_metrics():
+    registry = Metrics(enabled=False)
+    server = serve_metrics(0, host="127.0.0.1", registry=registry)
+    try:
+        assert registry.enabled
+        registry.observe("firecrawl.scrape", 0.5)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        text = requests.get(f"{base_url}/metrics", timeout=5)
+        assert text.headers["Content-Type"].startswith("text/plain")
+        assert 'span="firecrawl.scrape"' in text.text
+
+        snapshot = json.loads(requests.get(f"{base_url}/metrics.json", timeout=5).text)
+        assert snapshot["spans"]["firecrawl.scrape"]["count"] == 1
+        assert requests.get(f"{base_url}/other", timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,55 @@
+import pytest
+
+from src.services.money import find_currency, minor_units, normalize_currency, parse_price
+
+
+@pytest.mark.parametrize(
+    "text, currency, price",
+    [
+        ("$1,299.99", None, 1299.99),
+        ("1.299,00 €", None, 1299.0),
+        ("1 299,50 EUR", None, 1299.5),
+        ("1 299,50 €", None, 1299.5),
+        ("TND 1 299,000", None, 1299.0),
+        ("1.299,500 DT", None, 1299.5),
+        ("45,900", "TND", 45.9),
+        ("45,900", None, 45900.0),
+        ("R$ 1.299,90", None, 1299.9),
+        ("¥1,299", None, 1299.0),
+        ("19.99", None, 19.99),
+        ("1,299", None, 1299.0),
+        ("€ 5,5", None, 5.5),
+        ("CHF 1'299.00", None, 1299.0),
+        (42, None, 42.0),
+        ("Free", None, None),
+        ("0.00", None, None),
+        (None, None, None),
+    ],
+)
+def test_parse_price(text, currency, price):
+    assert parse_price(text, currency) == price
+
+
+@pytest.mark.parametrize(
+    "text, currency",
+    [
+        ("$19.99", "USD"),
+        ("R$ 19,99", "BRL"),
+        ("19,99 zł", "PLN"),
+        ("1 299,000 DT", "TND"),
+        ("Price: 45 GBP", "GBP"),
+        ("All items", None),
+        ("SKU ABCDE", None),
+        ("", None),
+    ],
+)
+def test_find_currency(text, currency):
+    assert find_currency(text) == currency
+
+
+def test_normalize_currency():
+    assert normalize_currency(" usd ") == "USD"
+    assert normalize_currency("€") == "EUR"
+    assert normalize_currency("dt") == "TND"
+    assert normalize_currency("XYZ") is None
+    assert (minor_units("JPY"), minor_units("tnd"), minor_units("EUR"), minor_units(None)) == (0, 3, 2, 2)
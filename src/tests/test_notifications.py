@@ -0,0 +1,68 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.services.notifications import DiscordNotifier
+
+
+@pytest_asyncio.fixture
+async def discord():
+    """Fake webhook: rate limits the first request, then accepts everything"""
+    received = []
+    state = {"limited": False}
+
+    async def webhook(request):
+        if not state["limited"]:
+            state["limited"] = True
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": 0.05},
+                status=429,
+            )
+        received.append(await request.json())
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_post("/webhook", webhook)
+    server = TestServer(app)
+    await server.start_server()
+    yield server.make_url("/webhook"), received
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_notifier_packs_embeds_and_honors_rate_limits(discord):
+    url, received = discord
+
+    async with DiscordNotifier(webhook_url=str(url)) as notifier:
+        for i in range(23):
+            notifier.add_price_alert(f"Product {i}", 100.0, 90.0, f"https://example.com/{i}")
+
+    assert [len(message["embeds"]) for message in received] == [10, 10, 3]
+    assert notifier.sent_messages == 3
+    assert notifier.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_notifier_respects_message_size_limit(discord):
+    url, received = discord
+
+    async with DiscordNotifier(webhook_url=str(url)) as notifier:
+        for i in range(4):
+            notifier.add_price_error(f"Product {i}", "https://example.com", "x" * 2500)
+
+    assert [len(message["embeds"]) for message in received] == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_send_full_batches_leaves_remainder_queued(discord):
+    url, received = discord
+    notifier = DiscordNotifier(webhook_url=str(url))
+    for i in range(12):
+        notifier.add_price_alert("Product", 100.0, 90.0, "https://example.com")
+
+    await notifier.send_full_batches()
+
+    assert [len(message["embeds"]) for message in received] == [10]
+    assert notifier.pending == 2
+    await notifier.close()
@@ -0,0 +1,268 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, delete, func, select, text
+
+from src.config import settings
+from src.domain.models import PriceHistory, PriceHistoryCreate, PriceRollup
+from src.infrastructure.database import migrations
+from src.infrastructure.database.migrations import run_migrations
+from src.infrastructure.database.models import (
+    Base,
+    DailyPriceRollup,
+    HourlyPriceRollup,
+    PriceHistory as DBPriceHistory,
+    PriceStats as DBPriceStats,
+    SchemaMigration,
+)
+from src.infrastructure.database.partitions import (
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+    next_month,
+    partition_name,
+)
+from src.infrastructure.database.rollups import merge_rollups
+from src.infrastructure.repositories.product_repository import DAILY, HOURLY, RAW
+from src.tests.conftest import add_products
+
+URL = "https://example.com/product/0"
+
+
+@pytest.fixture
+def repository(repository):
+    add_products(repository, 1)
+    return repository
+
+
+def history_rows(start, count, step):
+    """Prices 100, 101, ... every `step` from `start`"""
+    return [
+        {"product_url": URL, "product_name": "P", "price": 100.0 + i, "timestamp": start + step * i}
+        for i in range(count)
+    ]
+
+
+def add_history(session, rows, rollups=True):
+    session.execute(DBPriceHistory.__table__.insert(), rows)
+    if rollups:
+        merge_rollups(session.connection(), rows)
+    session.commit()
+
+
+def rollups(session, model):
+    return [
+        PriceRollup.model_validate(r)
+        for r in session.query(model).order_by(model.product_url, model.bucket_start)
+    ]
+
+
+def test_merge_in_any_order_matches_one_batch(session):
+    rows = history_rows(datetime(2024, 1, 1), 10, timedelta(minutes=15))
+    merge_rollups(session.connection(), rows[5:])
+    merge_rollups(session.connection(), rows[:5])
+    session.commit()
+
+    (first_hour, *_), daily = rollups(session, HourlyPriceRollup), rollups(session, DailyPriceRollup)
+    assert (first_hour.open_price, first_hour.close_price, first_hour.count) == (100.0, 103.0, 4)
+    assert len(daily) == 1
+    day = daily[0]
+    assert (day.open_price, day.close_price) == (100.0, 109.0)
+    assert (day.min_price, day.max_price, day.count) == (100.0, 109.0, 10)
+    assert day.mean_price == pytest.approx(104.5)
+
+
+def test_price_updates_maintain_rollups(repository, session):
+    for price in (30.0, 10.0, 20.0):
+        repository.apply_price_updates(
+            [PriceHistoryCreate(product_url=URL, price=price, product_name="P")]
+        )
+    (day,) = rollups(session, DailyPriceRollup)
+    assert (day.open_price, day.close_price, day.min_price, day.count) == (30.0, 20.0, 10.0, 3)
+
+
+def test_rebuild_matches_write_time_rollups(repository, session):
+    add_history(session, history_rows(datetime(2024, 1, 1), 100, timedelta(hours=5)))
+    expected = rollups(session, HourlyPriceRollup), rollups(session, DailyPriceRollup)
+    session.query(DailyPriceRollup).delete()
+    session.commit()
+
+    assert repository.rebuild_rollups() == 100
+    assert (rollups(session, HourlyPriceRollup), rollups(session, DailyPriceRollup)) == expected
+
+
+def test_compaction_keeps_rollups_and_stats(repository, session):
+    start = datetime.utcnow() - timedelta(days=60)
+    add_history(session, history_rows(start, 60 * 4, timedelta(hours=6)))
+    expected_days = len({(start + timedelta(hours=6) * i).date() for i in range(240)})
+    cutoff = datetime.combine((datetime.utcnow() - timedelta(days=30)).date(), datetime.min.time())
+    # Stale rollups, as if the rows were written before rollups existed
+    session.query(DailyPriceRollup).filter(DailyPriceRollup.bucket_start < cutoff).delete()
+    session.commit()
+
+    removed = repository.compact_price_history(datetime.utcnow() - timedelta(days=30))
+
+    oldest_raw = session.query(DBPriceHistory.timestamp).order_by(DBPriceHistory.timestamp).first()[0]
+    assert removed > 0
+    assert oldest_raw >= cutoff
+    assert session.query(DBPriceHistory).count() == 240 - removed
+    assert len(rollups(session, DailyPriceRollup)) == expected_days
+    assert sum(day.count for day in rollups(session, DailyPriceRollup)) == 240
+
+    # Stats can still be rebuilt from the rollups after the raw rows are gone
+    session.query(DBPriceStats).delete()
+    session.commit()
+    repository.backfill_price_stats()
+    stats = repository.get_price_stats(URL)
+    assert (stats.min_price, stats.max_price, stats.price_count) == (100.0, 339.0, 240)
+    assert stats.last_price == 339.0
+
+
+def test_expire_hourly_rollups(repository, session):
+    add_history(session, history_rows(datetime(2024, 1, 1), 48, timedelta(hours=1)))
+    assert repository.expire_hourly_rollups(datetime(2024, 1, 2, 12)) == 24
+    assert len(rollups(session, DailyPriceRollup)) == 2
+
+
+def test_get_price_history_picks_granularity(repository, session):
+    now = datetime.utcnow()
+    add_history(session, history_rows(now - timedelta(days=365), 365 * 4, timedelta(hours=6)))
+
+    assert repository.pick_granularity(URL, now - timedelta(days=7)) == RAW
+    assert repository.pick_granularity(URL, now - timedelta(days=90)) == HOURLY
+    assert repository.pick_granularity(URL) == DAILY
+
+    week = repository.get_price_history(URL, start=now - timedelta(days=7))
+    assert all(isinstance(entry, PriceHistory) for entry in week)
+    year = repository.get_price_history(URL)
+    assert all(isinstance(entry, PriceRollup) for entry in year)
+    assert len(year) in (365, 366)
+    assert [entry.timestamp for entry in year] == sorted(entry.timestamp for entry in year)
+
+    forced = repository.get_price_history(URL, start=now - timedelta(days=7), granularity=DAILY)
+    assert all(isinstance(entry, PriceRollup) for entry in forced)
+
+
+def test_compacted_ranges_read_from_rollups(repository, session, monkeypatch):
+    monkeypatch.setattr(settings, "PRICE_HISTORY_RETENTION_DAYS", 30)
+    now = datetime.utcnow()
+    add_history(session, history_rows(now - timedelta(days=40), 10, timedelta(hours=1)))
+
+    # Short, but older than the raw entries that are kept
+    assert repository.pick_granularity(URL, now - timedelta(days=40), now - timedelta(days=39)) == HOURLY
+    assert repository.pick_granularity(URL, now - timedelta(days=1)) == RAW
+
+
+def test_delete_removes_rollups(repository, session):
+    add_history(session, history_rows(datetime(2024, 1, 1), 3, timedelta(hours=1)))
+    repository.delete(URL)
+    assert rollups(session, HourlyPriceRollup) == []
+    assert rollups(session, DailyPriceRollup) == []
+
+
+def test_partition_names():
+    assert partition_name(date(2024, 3, 1)) == "price_history_y2024m03"
+    assert next_month(date(2024, 12, 1)) == date(2025, 1, 1)
+
+
+def test_declined_migration_stays_pending(engine, monkeypatch):
+    opted_in = []
+    monkeypatch.setattr(
+        migrations, "MIGRATIONS", [("0100_opt_in", lambda engine: None if opted_in else False)]
+    )
+
+    assert run_migrations(engine) == []
+    opted_in.append(True)
+    assert run_migrations(engine) == ["0100_opt_in"]
+    assert run_migrations(engine) == []
+
+
+@pytest.fixture
+def pg_engine():
+    """A scratch Postgres database from TEST_POSTGRES_URL, emptied before and after"""
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(url)
+
+    def drop_tables():
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS price_history_unpartitioned"))
+        Base.metadata.drop_all(engine)
+
+    drop_tables()
+    yield engine
+    drop_tables()
+    engine.dispose()
+
+
+PARTITION_MIGRATION = "0002_partition_price_history_by_month"
+
+
+def test_partition_populated_postgres_history(pg_engine, monkeypatch):
+    Base.metadata.create_all(pg_engine)
+    now = datetime.utcnow()
+    timestamps = [datetime(2024, 1, 15), datetime(2024, 1, 31, 23), datetime(2024, 3, 2), now]
+    with pg_engine.begin() as conn:
+        conn.execute(
+            DBPriceHistory.__table__.insert(),
+            [
+                {"product_url": URL, "product_name": "P", "price": 100.0 + i, "timestamp": t}
+                for i, t in enumerate(timestamps)
+            ],
+        )
+
+    # Nothing is converted until it's asked for
+    monkeypatch.setattr(settings, "PARTITION_PRICE_HISTORY", False)
+    assert PARTITION_MIGRATION not in run_migrations(pg_engine)
+    with pg_engine.connect() as conn:
+        assert not is_partitioned(conn)
+
+    monkeypatch.setattr(settings, "PARTITION_PRICE_HISTORY", True)
+    assert run_migrations(pg_engine) == [PARTITION_MIGRATION]
+    assert run_migrations(pg_engine) == []
+
+    with pg_engine.begin() as conn:
+        assert is_partitioned(conn)
+        months = [month for month, _ in list_partitions(conn)]
+        assert months[:3] == [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)]
+        assert conn.scalar(text("SELECT count(*) FROM price_history_default")) == 0
+        rows = conn.execute(
+            select(DBPriceHistory.id, DBPriceHistory.price, DBPriceHistory.timestamp).order_by(
+                DBPriceHistory.id
+            )
+        ).all()
+        assert [(price, timestamp) for _, price, timestamp in rows] == [
+            (100.0 + i, t) for i, t in enumerate(timestamps)
+        ]
+        # The id sequence moved to the new table and keeps counting
+        new_id = conn.scalar(
+            DBPriceHistory.__table__.insert()
+            .values(product_url=URL, product_name="P", price=1.0, timestamp=now)
+            .returning(DBPriceHistory.id)
+        )
+        assert new_id > rows[-1].id
+        assert ensure_partitions(conn) == []
+
+
+def test_partition_migration_reruns_idempotently(pg_engine, monkeypatch):
+    monkeypatch.setattr(settings, "PARTITION_PRICE_HISTORY", True)
+    Base.metadata.create_all(pg_engine)
+    with pg_engine.begin() as conn:
+        conn.execute(
+            DBPriceHistory.__table__.insert(),
+            [{"product_url": URL, "product_name": "P", "price": 1.0, "timestamp": datetime(2024, 5, 1)}],
+        )
+    assert PARTITION_MIGRATION in run_migrations(pg_engine)
+    with pg_engine.connect() as conn:
+        partitions = list_partitions(conn)
+
+    # As if a second process ran the conversion before either recorded it
+    with pg_engine.begin() as conn:
+        conn.execute(delete(SchemaMigration).where(SchemaMigration.name == PARTITION_MIGRATION))
+    assert run_migrations(pg_engine) == [PARTITION_MIGRATION]
+
+    with pg_engine.connect() as conn:
+        assert list_partitions(conn) == partitions
+        assert conn.scalar(select(func.count()).select_from(DBPriceHistory)) == 1
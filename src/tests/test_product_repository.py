@@ -0,0 +1,283 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, select
+
+from src.domain.models import PriceHistoryCreate, ProductCreate, SweepProduct
+from src.infrastructure.database.migrations import run_migrations
+from src.infrastructure.database.models import PriceHistory as DBPriceHistory, PriceStats as DBPriceStats
+from src.services.price_service import PriceService
+from src.tests.conftest import add_products
+
+
+def test_apply_price_updates(repository):
+    urls = add_products(repository, 3)
+    batch = [
+        PriceHistoryCreate(product_url=url, price=50.0 + i, product_name="P")
+        for i, url in enumerate(urls)
+    ]
+
+    assert repository.apply_price_updates(batch) == 3
+
+    for i, url in enumerate(urls):
+        assert repository.get(url).price == 50.0 + i
+        history = repository.get_price_history(url)
+        assert [h.price for h in history] == [50.0 + i]
+
+
+def test_apply_price_updates_skips_deleted_products(repository):
+    urls = add_products(repository, 3)
+    batch = [PriceHistoryCreate(product_url=url, price=50.0, product_name="P") for url in urls]
+    # Removed from the dashboard after its scrape, before the batch is written
+    repository.delete(urls[1])
+
+    assert repository.apply_price_updates(batch) == 3
+
+    assert repository.get(urls[1]) is None
+    assert [repository.get(url).price for url in (urls[0], urls[2])] == [50.0, 50.0]
+
+
+def test_apply_price_updates_single_commit(repository, engine):
+    urls = add_products(repository, 20)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(conn))
+
+    repository.apply_price_updates(
+        [PriceHistoryCreate(product_url=url, price=10.0, product_name="P") for url in urls]
+    )
+
+    assert len(commits) == 1
+
+
+def test_apply_price_updates_rolls_back_on_error(repository, monkeypatch):
+    urls = add_products(repository, 1)
+
+    def fail(*args):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(repository, "_bulk_update_prices", fail)
+    with pytest.raises(RuntimeError):
+        repository.apply_price_updates(
+            [PriceHistoryCreate(product_url=urls[0], price=10.0, product_name="P")]
+        )
+
+    assert repository.get(urls[0]).price == 100.0
+    assert repository.get_price_history(urls[0]) == []
+
+
+def test_price_stats_follow_new_history(repository):
+    urls = add_products(repository, 2)
+    repository.add_price_history(
+        PriceHistoryCreate(product_url=urls[0], price=80.0, product_name="P")
+    )
+    repository.apply_price_updates(
+        [
+            PriceHistoryCreate(product_url=urls[0], price=120.0, product_name="P"),
+            PriceHistoryCreate(product_url=urls[0], price=90.0, product_name="P"),
+            PriceHistoryCreate(product_url=urls[1], price=70.0, product_name="P"),
+        ]
+    )
+
+    stats = repository.get_price_stats(urls[0])
+    assert (stats.min_price, stats.max_price, stats.last_price, stats.price_count) == (
+        80.0,
+        120.0,
+        90.0,
+        3,
+    )
+    assert repository.get_price_stats(urls[1]).price_count == 1
+    assert set(repository.get_all_price_stats()) == set(urls)
+
+
+def test_backfill_price_stats(repository, session):
+    urls = add_products(repository, 2)
+    for price in (30.0, 10.0, 20.0):
+        repository.add_price_history(
+            PriceHistoryCreate(product_url=urls[0], price=price, product_name="P")
+        )
+    expected = repository.get_price_stats(urls[0])
+    session.query(DBPriceStats).delete()
+    session.commit()
+
+    assert repository.backfill_price_stats() == 1
+
+    stats = repository.get_price_stats(urls[0])
+    assert stats == expected
+    assert repository.get_price_stats(urls[1]) is None
+
+
+def test_delete_removes_price_stats(repository):
+    urls = add_products(repository, 1)
+    repository.add_price_history(
+        PriceHistoryCreate(product_url=urls[0], price=10.0, product_name="P")
+    )
+
+    repository.delete(urls[0])
+
+    assert repository.get_price_stats(urls[0]) is None
+
+
+def add_history(session, url, count, start=datetime(2024, 1, 1)):
+    session.add_all(
+        DBPriceHistory(
+            product_url=url,
+            price=float(i),
+            product_name="P",
+            timestamp=start + timedelta(hours=i // 2),  # pairs share a timestamp
+        )
+        for i in range(count)
+    )
+    session.commit()
+
+
+def test_get_price_history_page_walks_all_rows(repository, session):
+    url = add_products(repository, 1)[0]
+    add_history(session, url, 25)
+
+    prices, after = [], None
+    while True:
+        page = repository.get_price_history_page(url, after=after, limit=4)
+        if not page:
+            break
+        assert len(page) <= 4
+        prices.extend(h.price for h in page)
+        after = (page[-1].timestamp, page[-1].id)
+
+    assert prices == [float(i) for i in range(25)]
+
+
+def test_get_price_history_range(repository, session):
+    url = add_products(repository, 1)[0]
+    add_history(session, url, 10)
+
+    history = repository.get_price_history_range(
+        url, start=datetime(2024, 1, 1, 1), end=datetime(2024, 1, 1, 3)
+    )
+
+    assert [h.price for h in history] == [2.0, 3.0, 4.0, 5.0]
+
+
+def test_history_queries_use_composite_index(engine):
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT * FROM price_history "
+            "WHERE product_url = 'x' ORDER BY timestamp"
+        ).all()
+    detail = " ".join(row[-1] for row in plan)
+    assert "ix_price_history_product_url_timestamp" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_run_migrations_upgrades_old_schema():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE price_history (id INTEGER PRIMARY KEY, product_url VARCHAR, "
+            "price FLOAT, timestamp DATETIME, product_name VARCHAR, "
+            "cabin_type VARCHAR, is_lowest BOOLEAN)"
+        )
+        conn.exec_driver_sql(
+            "CREATE INDEX ix_price_history_product_url ON price_history (product_url)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO price_history (product_url, price, timestamp, product_name, is_lowest) "
+            "VALUES ('x', 90.0, '2024-01-01 00:00:00', 'P', 1), "
+            "('x', 80.0, '2024-01-02 00:00:00', 'P', 1), ('x', 85.0, '2024-01-03 00:00:00', 'P', 0)"
+        )
+
+    assert run_migrations(engine) == [
+        "0001_price_history_url_timestamp_index",
+        "0002_partition_price_history_by_month",
+        "0003_backfill_price_rollups",
+        "0004_backfill_price_stats",
+    ]
+    assert run_migrations(engine) == []
+    indexes = {index["name"] for index in inspect(engine).get_indexes("price_history")}
+    assert indexes == {"ix_price_history_product_url_timestamp"}
+    with engine.connect() as conn:
+        stats = conn.execute(select(DBPriceStats)).one()
+    assert (stats.min_price, stats.max_price, stats.last_price, stats.price_count) == (
+        80.0,
+        90.0,
+        85.0,
+        3,
+    )
+
+
+def test_get_recent_price_history(repository, session):
+    urls = add_products(repository, 2)
+    add_history(session, urls[0], 6)
+    add_history(session, urls[1], 2)
+
+    rows = repository.get_recent_price_history(points_per_product=3)
+
+    assert [(url, price) for url, _, price, _ in rows] == [
+        (urls[0], 3.0),
+        (urls[0], 4.0),
+        (urls[0], 5.0),
+        (urls[1], 0.0),
+        (urls[1], 1.0),
+    ]
+    since = repository.get_recent_price_history(since=datetime(2024, 1, 1, 2))
+    assert [price for _, _, price, _ in since] == [4.0, 5.0]
+
+
+def test_add_many(repository, session):
+    urls = add_products(repository, 1)
+    products = [
+        ProductCreate(
+            url=url,
+            name="Imported",
+            price=price,
+            currency="USD",
+            main_image_url="https://example.com/image.jpg",
+            check_date=datetime.now().isoformat(),
+        )
+        for url, price in [
+            (urls[0], 1.0), ("https://example.com/new/1", 20.0), ("https://example.com/new/2", 30.0)
+        ]
+    ]
+
+    assert repository.existing_urls([p.url for p in products]) == {urls[0]}
+    repository.add_many(products)
+
+    # An existing product is kept as it was
+    assert repository.get(urls[0]).name == "Product 0"
+    assert repository.existing_urls([p.url for p in products]) == {p.url for p in products}
+    assert [h.price for h in repository.get_price_history("https://example.com/new/1")] == [20.0]
+    stats = repository.get_price_stats("https://example.com/new/2")
+    assert (stats.price_count, stats.min_price) == (1, 30.0)
+
+
+def test_get_sweep_products(repository):
+    urls = add_products(repository, 3)
+    repository.apply_price_updates(
+        [PriceHistoryCreate(product_url=urls[0], price=price, product_name="P") for price in (80.0, 90.0)]
+    )
+
+    products = {p.url: p for p in repository.get_sweep_products()}
+    assert set(products) == set(urls)
+    assert isinstance(products[urls[0]], SweepProduct)
+    assert (products[urls[0]].price, products[urls[0]].min_price) == (90.0, 80.0)
+    assert products[urls[0]].last_checked == repository.get_price_stats(urls[0]).last_timestamp
+    # No history yet
+    assert (products[urls[1]].min_price, products[urls[1]].last_checked) == (None, None)
+
+    assert [p.url for p in repository.get_sweep_products(urls[1:2])] == urls[1:2]
+    assert repository.get_sweep_products([]) == []
+
+
+def test_price_update_of_sweep_product_skips_stats_query(repository, engine):
+    urls = add_products(repository, 1)
+    repository.apply_price_updates([PriceHistoryCreate(product_url=urls[0], price=80.0, product_name="P")])
+    service = PriceService(repository, Mock(api_key="test-key"))
+    [product] = repository.get_sweep_products()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    update = service.build_price_update(product, 85.0)
+
+    assert statements == []
+    assert not update.is_lowest
+    assert product.price == 85.0
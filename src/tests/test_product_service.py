@@ -2,13 +2,14 @@ import pytest
 from unittest.mock import Mock, patch
 from sqlalchemy import text
 from src.infrastructure.repositories.product_repository import ProductRepository
-from src.infrastructure.database import SessionLocal
+from src.infrastructure.database import SessionLocal, init_db
 from src.services.product_service import ProductService
 from src.domain.models import ProductCreate
 
 
 @pytest.fixture(autouse=True)
 def cleanup_database():
+    init_db()
     session = SessionLocal()
     try:
         # Delete all existing products and price history
@@ -72,3 +73,30 @@ async def test_add_product(service):
     success, message = await service.add_product(test_url)
     assert not success
     assert message == "Product already being tracked!"
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (
+            {"product_name": "Lamp", "price": "1.299,00 €", "currency": "€", "img": "/l.jpg"},
+            {"name": "Lamp", "price": 1299.0, "currency": "EUR", "main_image_url": "/l.jpg"},
+        ),
+        (
+            {"title": "Router", "amount": "TND 1 299,000", "currency_symbol": "DT"},
+            {"name": "Router", "price": 1299.0, "currency": "TND", "main_image_url": ""},
+        ),
+        # "name" beats "title", and a later "price" key beats an earlier "cost"
+        (
+            {"title": "Shown title", "cost": "5", "name": "Lamp", "price": 7},
+            {"name": "Lamp", "price": 7.0, "currency": "USD", "main_image_url": ""},
+        ),
+        (
+            {"price": "call us"},
+            {"name": "Unknown Product", "currency": "USD", "main_image_url": ""},
+        ),
+    ],
+)
+def test_extract_product_details(repository, data, expected):
+    service = ProductService(repository, firecrawl=Mock())
+    assert service._extract_product_details(data) == expected
@@ -0,0 +1,120 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services.scheduler import AdaptiveScheduler, compute_signals
+
+NOW = datetime(2024, 6, 1)
+
+
+def history(url, prices, step=timedelta(hours=6), end=NOW):
+    start = end - step * (len(prices) - 1)
+    return [(url, start + step * i, price, None) for i, price in enumerate(prices)]
+
+
+@pytest.fixture
+def scheduler():
+    return AdaptiveScheduler(
+        budget_per_hour=2,
+        min_interval=timedelta(minutes=30),
+        max_interval=timedelta(days=7),
+    )
+
+
+def test_signals_tell_volatile_from_flat_products():
+    rows = history("flat", [100.0] * 20) + history("volatile", [100, 90, 100, 85, 95] * 4)
+    signals = compute_signals(sorted(rows), NOW, drop_threshold=0.05)
+
+    assert signals["volatile"].change_rate > signals["flat"].change_rate
+    assert signals["volatile"].alert_proximity == 1.0
+    assert signals["flat"].alert_proximity == 0.0
+    assert signals["flat"].volatility == 0.0
+    assert signals["volatile"].weight > signals["flat"].weight
+
+
+def test_recent_change_raises_weight():
+    old_change = history("old", [100.0, 99.0] + [99.0] * 18)
+    new_change = history("new", [100.0] * 19 + [99.0])
+    signals = compute_signals(sorted(old_change + new_change), NOW, drop_threshold=0.05)
+
+    assert signals["new"].hours_since_change == 0
+    assert signals["new"].weight > signals["old"].weight
+
+
+def test_intervals_spend_the_budget(scheduler):
+    rows = []
+    for i in range(5):
+        rows += history(f"flat-{i}", [100.0] * 20)
+        rows += history(f"volatile-{i}", [100, 90, 100, 85, 95] * 4)
+    intervals = scheduler.intervals(compute_signals(sorted(rows), NOW, 0.05))
+
+    assert intervals["volatile-0"] < intervals["flat-0"]
+    checks_per_hour = sum(timedelta(hours=1) / interval for interval in intervals.values())
+    assert checks_per_hour == pytest.approx(2)
+
+
+def test_due_is_capped_and_puts_new_products_first(scheduler):
+    rows = [row for i in range(10) for row in history(f"p{i}", [100.0, 90.0], end=NOW - timedelta(days=8))]
+    signals = compute_signals(sorted(rows), NOW, 0.05)
+    urls = ["new"] + [f"p{i}" for i in range(10)]
+
+    due = scheduler.due(signals, urls, NOW, window=timedelta(hours=2))
+
+    assert due[0] == "new"
+    assert len(due) == 4
+
+
+def test_nothing_due_right_after_a_check(scheduler):
+    signals = compute_signals(history("p", [100.0, 100.0]), NOW, 0.05)
+    assert scheduler.due(signals, ["p"], NOW, window=timedelta(hours=1)) == []
+
+
+def simulate(pick, hours=24 * 21, seed=7):
+    """Count price changes seen by checking `pick(rows, urls, now)` products every hour"""
+    rng = random.Random(seed)
+    # A few products change every few hours, most about every two weeks
+    change_every = {f"fast-{i}": 4 for i in range(4)}
+    change_every.update({f"slow-{i}": 24 * 14 for i in range(16)})
+    prices = {url: 100.0 for url in change_every}
+    seen = dict(prices)
+    rows = [(url, NOW, price, None) for url, price in prices.items()]
+    caught = 0
+
+    for hour in range(1, hours + 1):
+        now = NOW + timedelta(hours=hour)
+        for url, every in change_every.items():
+            if rng.random() < 1 / every:
+                prices[url] = round(prices[url] * rng.uniform(0.85, 1.1), 2)
+        for url in pick(sorted(rows), list(change_every), now, hour):
+            if prices[url] != seen[url]:
+                caught += 1
+                seen[url] = prices[url]
+            rows.append((url, now, prices[url], None))
+    return caught
+
+
+def test_adaptive_catches_more_changes_for_the_same_budget(scheduler):
+    def adaptive(rows, urls, now, hour):
+        signals = compute_signals(rows, now, 0.05)
+        return scheduler.due(signals, urls, now, window=timedelta(hours=1))
+
+    def uniform(rows, urls, now, hour):
+        # The same 2 scrapes per hour, round robin
+        return [urls[(2 * hour + i) % len(urls)] for i in range(2)]
+
+    assert simulate(adaptive) > 1.3 * simulate(uniform)
+
+
+def test_due_carries_fractional_budget_between_ticks():
+    scheduler = AdaptiveScheduler(budget_per_hour=10)
+    # Long overdue products, more than any tick can take
+    rows = [row for i in range(50) for row in history(f"p{i}", [100.0, 90.0], end=NOW - timedelta(days=30))]
+    signals = compute_signals(sorted(rows), NOW, 0.05)
+    urls = [f"p{i}" for i in range(50)]
+
+    per_tick = [
+        len(scheduler.due(signals, urls, NOW, window=timedelta(minutes=15))) for _ in range(8)
+    ]
+
+    assert per_tick == [2, 3, 2, 3, 2, 3, 2, 3]
@@ -0,0 +1,126 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.services.scrape_cache import PageFingerprint, ScrapeCache, content_hash
+
+
+class Page:
+    body = "<html><body><h1>Widget</h1><p>$10</p></body></html>"
+    etag = '"v1"'
+    gets = 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        Page.gets += 1
+        if self.path == "/etag" and self.headers.get("If-None-Match") == Page.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = Page.body.encode()
+        if self.path == "/dynamic":
+            body += f"<script>var now = {time.time()};</script>".encode()
+        self.send_response(200)
+        if self.path == "/etag":
+            self.send_header("ETag", Page.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_page():
+    Page.body = "<html><body><h1>Widget</h1><p>$10</p></body></html>"
+    Page.etag = '"v1"'
+
+
+PAYLOAD = {"extract": {"price": 10.0}}
+
+
+def test_content_hash_ignores_scripts_and_whitespace():
+    assert content_hash("<p>$10</p>\n<script>var t = 1;</script>") == content_hash(
+        "<p>$10</p>   <script>var t = 2;</script>"
+    )
+    assert content_hash("<p>$10</p>") != content_hash("<p>$11</p>")
+
+
+def test_content_hash_keeps_json_data_scripts():
+    def page(price, nonce):
+        return (
+            f'<p>Product</p><script nonce="{nonce}" type="application/ld+json">'
+            f'{{"@type": "Product", "offers": {{"price": "{price}"}}}}</script>'
+        )
+
+    assert content_hash(page("10.00", "a")) == content_hash(page("10.00", "b"))
+    assert content_hash(page("10.00", "a")) != content_hash(page("9.00", "a"))
+    assert content_hash('<script type="application/json">{"price": 10}</script>') != content_hash(
+        '<script type="application/json">{"price": 9}</script>'
+    )
+
+
+def test_revalidate_with_etag(base_url):
+    cache = ScrapeCache()
+    key = ScrapeCache.key(f"{base_url}/etag", None, {})
+
+    cached, fingerprint = cache.revalidate(key, f"{base_url}/etag")
+    assert cached is None and fingerprint.etag == '"v1"'
+    cache.put(key, PAYLOAD, fingerprint)
+
+    assert cache.revalidate(key, f"{base_url}/etag")[0] == PAYLOAD
+
+    Page.etag, Page.body = '"v2"', "<p>$12</p>"
+    assert cache.revalidate(key, f"{base_url}/etag")[0] is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_revalidate_with_content_hash(base_url):
+    cache = ScrapeCache()
+    url = f"{base_url}/dynamic"
+    key = ScrapeCache.key(url, "prompt", {})
+    cache.put(key, PAYLOAD, cache.revalidate(key, url)[1])
+
+    assert cache.revalidate(key, url)[0] == PAYLOAD
+
+    Page.body = "<html><body><h1>Widget</h1><p>$9</p></body></html>"
+    assert cache.revalidate(key, url)[0] is None
+
+
+def test_ttl_and_lru_eviction():
+    cache = ScrapeCache(ttl=60, max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, PAYLOAD, PageFingerprint())
+    cache.get("a")
+    cache.put("c", PAYLOAD, PageFingerprint())
+
+    assert cache.get("b") is None  # least recently used
+    assert cache.get("a") is not None
+
+    cache._entries["a"].stored_at -= 120
+    assert cache.get("a") is None
+
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ScrapeCache(path=path)
+    cache.put("a", PAYLOAD, PageFingerprint(content_hash="h", etag='"e"'))
+    cache.save()
+
+    reloaded = ScrapeCache(path=path)
+
+    entry = reloaded.get("a")
+    assert entry.payload == PAYLOAD
+    assert (entry.content_hash, entry.etag) == ("h", '"e"')
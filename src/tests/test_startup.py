@@ -0,0 +1,12 @@
+import pytest
+
+from src.benchmarks.startup import import_report
+
+
+@pytest.mark.parametrize("module", ["src.check_prices", "src.worker", "src.import_products"])
+def test_entry_points_import_lightly(module):
+    report = import_report(module)
+    # No heavy libraries, no database connection and no files just from importing
+    assert report["heavy_modules"] == []
+    assert not report["engine_created"]
+    assert report["created_files"] == []
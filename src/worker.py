@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+from src.config import settings
+from src.infrastructure.database import SessionLocal, init_db
+from src.infrastructure.metrics import serve_metrics
+from src.infrastructure.repositories.job_repository import JobRepository
+from src.infrastructure.repositories.product_repository import ProductRepository
+from src.services.check_worker import CheckWorker, enqueue_checks
+from src.services.price_service import PriceService
+from src.services.rate_limit import KeyedRateLimiter
+
+
+async def run_worker(processes: int, produce: bool):
+    # Product writes and the queue's lease updates use separate sessions
+    session, job_session = SessionLocal(), SessionLocal()
+    # Rate limits are per process, so split the budget between the processes
+    worker = CheckWorker(
+        PriceService(ProductRepository(session)),
+        JobRepository(job_session),
+        key_limiter=KeyedRateLimiter(
+            settings.FIRECRAWL_RATE_PER_MINUTE / processes, settings.FIRECRAWL_BURST
+        ),
+        domain_limiter=KeyedRateLimiter(
+            settings.DOMAIN_RATE_PER_MINUTE / processes, settings.DOMAIN_BURST
+        ),
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        # One async engine for all the sweeps of this process
+        async with worker.price_service.use_async_repository():
+            await worker.run(stop, produce=produce)
+    finally:
+        session.close()
+        job_session.close()
+
+
+def worker_process(processes: int, produce: bool, metrics_port: int = 0):
+    if metrics_port:
+        serve_metrics(metrics_port)
+    asyncio.run(run_worker(processes, produce))
+
+
+def enqueue_all():
+    """Queue a check of every product"""
+    session = SessionLocal()
+    try:
+        price_service = PriceService(ProductRepository(session))
+        queued = enqueue_checks(
+            price_service, JobRepository(session), price_service.repository.get_sweep_products()
+        )
+        print(f"Queued {queued} price checks")
+    except Exception as e:
+        print(f"Error queueing price checks: {e}")
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run price check workers")
+    parser.add_argument(
+        "--processes", type=int, default=1, help="Worker processes to start on this host"
+    )
+    parser.add_argument(
+        "--no-produce",
+        action="store_true",
+        help="Only process jobs, don't queue the checks the adaptive scheduler finds due",
+    )
+    parser.add_argument(
+        "--enqueue-all", action="store_true", help="Queue a check of every product and exit"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="Serve per-stage timings on this port, the next ports for further processes",
+    )
+    args = parser.parse_args()
+    # Schema upkeep happens once here, not in every worker process
+    init_db()
+
+    if args.enqueue_all:
+        enqueue_all()
+        return
+
+    # One producer per host is enough; producers on other hosts are harmless
+    # because queueing is idempotent
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=worker_process,
+            args=(
+                args.processes,
+                index == 0 and not args.no_produce,
+                args.metrics_port + index if args.metrics_port else 0,
+            ),
+        )
+        for index in range(args.processes)
+    ]
+
+    def stop_workers(signum, frame):
+        # Workers treat SIGTERM as a request to stop after their current batch
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+
+    for process in workers:
+        process.start()
+    signal.signal(signal.SIGINT, stop_workers)
+    signal.signal(signal.SIGTERM, stop_workers)
+    for process in workers:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()